@@ -185,11 +185,10 @@ int afedri_read_rx_udp(complex * samp)	// Read samples from UDP
 	static unsigned short seq0;	// must be 8 bits
 	unsigned short seq_curr = 0;
 #ifdef MS_WINDOWS
-	__int32 i, count, nSamples, xr, xi, index;
+	__int32 i, count, nSamples;
 #else
-	int32_t i, count, nSamples, xr, xi, index;
+	int32_t i, count, nSamples;
 #endif
-	unsigned char * ptxr, * ptxi;
 	static complex dc_average = 0;		// Average DC component in samples
 	static complex dc_sum = 0;
 	static int dc_count = 0;
@@ -248,26 +247,8 @@ int afedri_read_rx_udp(complex * samp)	// Read samples from UDP
 	//	quisk_set_key_down(buf[1] & 0x01);	// bit zero is key state
 	//	if (buf[1] & 0x02)					// bit one is ADC overrange
 	//		quisk_sound_state.overrange++;
-		index = FIRST_IQ_DATA_IDX;
-		ptxr = (unsigned char *)&xr;
-		ptxi = (unsigned char *)&xi;
-		// convert 24-bit samples to 32-bit samples; int must be 32 bits.
-			while (index < bytes) 
-			{
-				xr = xi = 0;
-				memcpy (ptxr + 2, buf + index, 2);
-				index += 2;
-				memcpy (ptxi + 2, buf + index, 2);
-				index += 2;
-				samp[nSamples++] = (xr + xi * I) * rx_udp_gain_correct;
-				xr = xi = 0;
-				memcpy (ptxr + 2, buf + index, 2);
-				index += 2;
-				memcpy (ptxi + 2, buf + index, 2);
-				index += 2;
-				samp[nSamples++] = (xr + xi * I) * rx_udp_gain_correct;;
-	//if (nSamples == 2) printf("%12d %12d\n", xr, xi);
-			}
+		// convert the little-endian 16-bit samples to 32-bit samples
+		nSamples += quisk_unpack_iq(samp + nSamples, buf + FIRST_IQ_DATA_IDX, (bytes - FIRST_IQ_DATA_IDX) / 4, 2, 0, 0, rx_udp_gain_correct);
 	}
 	if (quisk_is_key_down()) {
 		dc_key_delay = 0;
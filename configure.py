@@ -3,7 +3,7 @@ from __future__ import print_function
 from __future__ import absolute_import
 from __future__ import division
 
-import sys, wx, wx.lib, os, re, pickle, traceback, json
+import sys, wx, wx.lib, os, re, pickle, traceback, json, threading, time, copy
 # Quisk will alter quisk_conf_defaults to include the user's config file.
 import quisk_conf_defaults as conf
 import _quisk as QS
@@ -36,6 +36,9 @@ except:
 # Increasing the software version will display a message to re-read the soapy device.
 soapy_software_version = 3
 
+# Increasing the cache version will discard the cached result of ParseConfig().
+config_cache_version = 1
+
 def FormatKhz(dnum):	# Round to 3 decimal places; remove ending ".000"
   t = "%.3f" % dnum
   if t[-4:] == '.000':
@@ -49,12 +52,87 @@ def SortKey(x):
     k = 0.0
   return k
 
+class StateWriter(threading.Thread):
+  """Write state files in a background thread so that a slow disk does not block the GUI.
+
+  Each file is written to a temporary file and then renamed, so a crash never leaves a partial file.
+  If a file is saved again before it is written, only the newest data is written."""
+  def __init__(self):
+    threading.Thread.__init__(self)
+    self.daemon = True
+    self.cond = threading.Condition()
+    self.pending = {}		# The data and binary flag waiting to be written, indexed by path
+    self.busy = False
+  def Save(self, path, data, binary):
+    self.cond.acquire()
+    self.pending[path] = (data, binary)
+    self.cond.notify_all()
+    self.cond.release()
+  def Flush(self, timeout):	# Wait until all files are written
+    end = time.time() + timeout
+    self.cond.acquire()
+    while self.pending or self.busy:
+      remain = end - time.time()
+      if remain <= 0:
+        break
+      self.cond.wait(remain)
+    self.cond.release()
+  def run(self):
+    while True:
+      self.cond.acquire()
+      while not self.pending:
+        self.cond.wait()
+      pending = self.pending
+      self.pending = {}
+      self.busy = True
+      self.cond.release()
+      for path in pending:
+        data, binary = pending[path]
+        self.WriteFile(path, data, binary)
+      self.cond.acquire()
+      self.busy = False
+      self.cond.notify_all()
+      self.cond.release()
+  def WriteFile(self, path, data, binary):
+    tmp_path = path + '.tmp'
+    try:
+      fp = open(tmp_path, "wb" if binary else "w")
+      try:
+        fp.write(data)
+        fp.flush()
+        os.fsync(fp.fileno())
+      finally:
+        fp.close()
+      if hasattr(os, 'replace'):
+        os.replace(tmp_path, path)
+      else:		# Python 2 can not rename over an existing file on Windows
+        if sys.platform == 'win32' and os.path.isfile(path):
+          os.remove(path)
+        os.rename(tmp_path, path)
+    except:
+      traceback.print_exc()
+
+state_writer = None
+
+def SaveStateFile(path, data, binary=False):	# Write the state file in the background
+  global state_writer
+  if state_writer is None:
+    state_writer = StateWriter()
+    state_writer.start()
+  state_writer.Save(path, data, binary)
+
+def FlushStateFiles(timeout=5.0):	# Wait for state files to be written
+  if state_writer is not None:
+    state_writer.Flush(timeout)
+
 class Configuration:
-  def __init__(self, app, AskMe):	# Called first
+  def __init__(self, app, AskMe, headless=False):	# Called first
+    # If headless is True there is no wx.App, so messages go to stderr instead of dialogs.
     global application, local_conf, Settings, noname_enable, platform_ignore, platform_accept
     Settings = ["ConfigFileRadio", "ConfigFileRadio", [], []]
     application = app
     local_conf = self
+    self.headless = headless
     noname_enable = []
     if sys.platform == 'win32':
       platform_ignore = 'lin_'
@@ -64,12 +142,16 @@ class Configuration:
       platform_ignore = 'win_'
     self.sections = []
     self.receiver_data = []
+    self.saved_items = {}		# The value and JSON text of each saved radio item, indexed by (radio name, item name)
     self.StatePath = conf.settings_file_path
     if not self.StatePath:
       self.StatePath = os.path.join(conf.DefaultConfigDir, "quisk_settings.json")
     self.ReadState()
     if AskMe == 'Same':
       pass
+    elif (AskMe or Settings[0] == "Ask me") and headless:
+      sys.stderr.write('The radio is set to "Ask me", but there is no GUI to ask.  Start the GUI program and choose a radio.\n')
+      sys.exit(1)
     elif AskMe or Settings[0] == "Ask me":
       choices = Settings[2] + ["ConfigFileRadio"]
       dlg = wx.SingleChoiceDialog(None, "", "Start Quisk with this Radio",
@@ -113,9 +195,12 @@ class Configuration:
       self.InitSoapyNames(radio_dict)
       if radio_dict.get("soapy_file_version", 0) < soapy_software_version:
         text = "Your SoapySDR device parameters are out of date. Please go to the radio configuration screen and re-read the device parameters."
-        dlg = wx.MessageDialog(None, text, 'Please Re-Read Device', wx.OK|wx.ICON_INFORMATION)
-        dlg.ShowModal()
-        dlg.Destroy()
+        if self.headless:
+          sys.stderr.write(text + '\n')
+        else:
+          dlg = wx.MessageDialog(None, text, 'Please Re-Read Device', wx.OK|wx.ICON_INFORMATION)
+          dlg.ShowModal()
+          dlg.Destroy()
     else:
       radio_dict["use_soapy"] = '0'
     if radio_type not in ("HiQSDR", "Hermes", "Red Pitaya", "Odyssey", "Odyssey2"):
@@ -199,7 +284,9 @@ class Configuration:
       conf.__dict__.update(conf.color_scheme_B)
     elif conf.color_scheme == 'C':
       conf.__dict__.update(conf.color_scheme_C)
-    if errors:
+    if errors and self.headless:
+      sys.stderr.write(errors)
+    elif errors:
       dlg = wx.MessageDialog(None, errors,
         'Update Settings', wx.OK|wx.ICON_ERROR)
       ret = dlg.ShowModal()
@@ -238,6 +325,9 @@ class Configuration:
       return False
     path = self.GetRadioDict()["hardware_file_name"]
     path = self.NormPath(path)
+    if not os.path.isfile(path) and self.headless:
+      sys.stderr.write("Failure for hardware file %s!\n" % path)
+      sys.exit(1)
     if not os.path.isfile(path):
       dlg = wx.MessageDialog(None,
         "Failure for hardware file %s!" % path,
@@ -432,14 +522,23 @@ class Configuration:
   def SaveState(self):
     if not self.settings_changed:
       return
-    try:
-      fp = open(self.StatePath, "w")
-    except:
-      traceback.print_exc()
-      return
-    json.dump(Settings, fp, indent=2)
-    fp.close()
+    SaveStateFile(self.StatePath, self.DumpSettings())
     self.settings_changed = False
+  def DumpSettings(self):
+    # Return Settings as JSON text with one line for each radio item.  Large items such as the band and
+    # calibration tables are written compactly on their line.  Only items that changed are converted again.
+    radios = []
+    for name, radio_dict in zip(Settings[2], Settings[3]):
+      items = []
+      for key, value in radio_dict.items():
+        saved = self.saved_items.get((name, key))
+        if saved is None or type(saved[0]) is not type(value) or saved[0] != value:
+          saved = (copy.deepcopy(value), "%s: %s" % (json.dumps(key), json.dumps(value)))
+          self.saved_items[(name, key)] = saved
+        items.append("      " + saved[1])
+      radios.append("    {\n%s\n    }" % ",\n".join(items))
+    return "[\n  %s,\n  %s,\n  %s,\n  [\n%s\n  ]\n]\n" % (json.dumps(Settings[0]), json.dumps(Settings[1]),
+        json.dumps(Settings[2]), ",\n".join(radios))
   def ParseConfig(self):
     # ParseConfig() fills self.sections, self.receiver_data, and
     # self.format4name with the items that Configuration understands.
@@ -458,22 +557,66 @@ class Configuration:
     #     Then some help text starting with "# "
     #     Then a list of possible value#explain with the default first
     #     Then a blank line to end.
-    self.format4name = {}
-    self.format4name['hardware_file_type'] = 'text'
-    self._ParserConf('quisk_conf_defaults.py')
+    #
+    # The result is cached in quisk_config_cache.pkl next to the settings file.  The cache is keyed by the
+    # size and modification time of each source file, and is used when no source file has changed.
+    # Dict and list items are taken from conf after the cache is read, because the user may change them.
+    filenames = ['quisk_conf_defaults.py']
     # Read any user-defined radio types
-    for dirname in os.listdir('.'):
+    for dirname in sorted(os.listdir('.')):
       if not os.path.isdir(dirname) or dirname[-3:] != 'pkg':
         continue
       if dirname in ('freedvpkg', 'sdriqpkg', 'soapypkg'):
         continue
       filename = os.path.join(dirname, 'quisk_hardware.py')
-      if not os.path.isfile(filename):
-        continue
+      if os.path.isfile(filename):
+        filenames.append(filename)
+    key = [config_cache_version, sys.version_info[0]]
+    for filename in filenames:
+      st = os.stat(filename)
+      key.append((filename, st.st_size, st.st_mtime))
+    cache_path = os.path.join(os.path.dirname(self.StatePath), "quisk_config_cache.pkl")
+    if not self.ReadConfigCache(cache_path, key):
+      self.sections = []
+      self.receiver_data = []
+      self.format4name = {}
+      self.format4name['hardware_file_type'] = 'text'
+      self.conf_objects = []
+      for filename in filenames:
+        try:
+          self._ParserConf(filename)
+        except:
+          traceback.print_exc()
+      self.WriteConfigCache(cache_path, key)
+    for value_list, index, data_name, expln in self.conf_objects:	# Dicts and lists are Python objects
+      value = getattr(conf, data_name)
+      if expln:
+        value = "%s # %s" % (value, expln)
+      value_list[index] = value
+  def ReadConfigCache(self, path, key):
+    try:
+      fp = open(path, "rb")
       try:
-        self._ParserConf(filename)
-      except:
-        traceback.print_exc()
+        data = pickle.load(fp)
+      finally:
+        fp.close()
+      if data[0] != key:
+        return False
+      self.sections, self.receiver_data, self.format4name, self.conf_objects = data[1:]
+    except:
+      return False
+    return True
+  def WriteConfigCache(self, path, key):
+    # Pickle keeps the value lists in conf_objects shared with the sections.
+    data = (key, self.sections, self.receiver_data, self.format4name, self.conf_objects)
+    try:
+      fp = open(path, "wb")
+      try:
+        pickle.dump(data, fp, 2)
+      finally:
+        fp.close()
+    except:
+      traceback.print_exc()
   def _ParserConf(self, filename):
     re_AeqB = re.compile("^#?(\w+)\s*=\s*([^#]+)#*(.*)")		# item values "a = b"
     section = None
@@ -525,10 +668,10 @@ class Configuration:
         expln = mo.group(3).strip()
         if value[0] in ('"', "'"):
           value = value[1:-1]
-        elif value == '{':		# item is a dictionary
-          value = getattr(conf, data_name)
-        elif value == '[':		# item is a list
-          value = getattr(conf, data_name)
+        elif value in ('{', '['):		# item is a dictionary or list; filled in by ParseConfig()
+          self.conf_objects.append((value_list, len(value_list), data_name, expln))
+          value_list.append(None)
+          continue
         if expln:
           value_list.append("%s # %s" % (value, expln))
         else:
@@ -1578,6 +1721,7 @@ class RadioHardware(RadioHardwareBase):		# The Hardware page in the second-level
 
 class RadioHardwareSoapySDR(RadioHardwareBase):	# The Hardware page in the second-level notebook for the SoapySDR radios
   name_text = {
+'soapy_float_decim_rx' : 'Rx float decimation',
 'soapy_gain_mode_rx' : 'Rx gain mode',
 'soapy_setAntenna_rx' : 'Rx antenna name',
 'soapy_setBandwidth_rx' : 'Rx bandwidth kHz',
@@ -1590,6 +1734,10 @@ class RadioHardwareSoapySDR(RadioHardwareBase):	# The Hardware page in the secon
 }
 
   help_text = {
+'soapy_float_decim_rx' : 'Decimate the Rx samples by this factor in single precision before Quisk processes them. \
+This reduces the CPU load for high sample rates. The sample rate and graph width are divided by this factor. \
+The factor is reduced if necessary so that the sample rate after decimation is at least 48000 sps.',
+
 'soapy_gain_mode_rx' : 'Choose "total" to set the total gain, "detailed" to set multiple gain elements individually, \
 or "automatic" for automatic gain control. The "detailed" or "automatic" may not be available depending on your hardware.',
 
@@ -1678,6 +1826,14 @@ or "automatic" for automatic gain control. The "detailed" or "automatic" may not
       cb.quisk_data_name = name
       self.NextCol()
 
+    name = 'soapy_float_decim_rx'
+    decim = radio_dict.get(name, '1')
+    txt, cb, btn = self.AddTextComboHelp(self.col, self.name_text[name], decim, ['1', '2', '4', '8', '16', '32'],
+        self.help_text[name], True, border=self.border)
+    cb.handler = self.OnChange
+    cb.quisk_data_name = name
+    self.NextCol()
+
     len_gain_names = len(radio_dict.get('soapy_listGainsValues_rx', ()))
     name = 'soapy_gain_mode_rx'
     gain_mode = radio_dict[name]
@@ -1,8 +1,11 @@
 from __future__ import absolute_import
+from __future__ import print_function
 # This code was contributed by Christof, DJ4CM.  Many Thanks!!
 
 import threading
 import time
+import bisect
+import heapq
 import telnetlib
 import quisk_conf_defaults as conf
 
@@ -37,26 +40,33 @@ class DxEntry:
     else:
       return False
     
+  def getKey(self):
+    # Spots of the same DX on the same frequency rounded to 1 kHz are joined
+    return (self.dx, (self.freq + 500) // 1000)
+
   def join (self, element):
-    for i in range (0, len(element.info)):
-      self.info.insert(0, element.info[i])
-    length = len(self.info)
+    # Replace the info list so that other threads always see a complete list
+    info = element.info + self.info
     # limit to max history
-    if length > 3:
-      del (self.info[length-1])
+    self.info = info[0:3]
     self.timestamp = max (self.timestamp, element.timestamp)  
     
   def isExpired(self):
     return time.time()-self.timestamp > conf.dxClExpireTime * 60
     
   def parseMessage(self, message):  
+    if message.lstrip()[0:2].lower() != 'dx':	# quick test to reject other lines
+      return False
     words = message.split()
     sTime = ''
     locator = ''
     comment = ''
-    if len(words) > 3 and words[0].lower() == 'dx' and words[1].lower() == 'de':
+    if len(words) > 4 and words[0].lower() == 'dx' and words[1].lower() == 'de':
       spotter = words[2].strip(':')
-      self.freq = int(float(words[3])*1000)
+      try:
+        self.freq = int(float(words[3])*1000)
+      except ValueError:
+        return False
       self.dx = words[4]
       for index in range (5, len(words)):
         word = words[index]
@@ -80,14 +90,23 @@ class DxEntry:
     return False   
   
 class DxCluster(threading.Thread):
-  def __init__(self):
+  def __init__(self, replayFile=''):
     self.do_init = 1
     threading.Thread.__init__(self)
     self.doQuit = threading.Event()
-    self.dxSpots = []
+    self.replayFile = replayFile	# read spots from this file instead of the server
+    self.dxSpots = {}		# the spots indexed by DxEntry.getKey()
     self.doQuit.clear()
+    self.lock = threading.Lock()	# protects dxSpots, the frequency index and the expire heap
+    self.spotFreqs = []		# sorted frequencies of the spots in spotIndex
+    self.spotIndex = []		# the spots sorted by frequency
+    self.expireHeap = []	# heap of (timestamp, key) to find expired spots
+    self.listener = None
     
   def run(self):
+    if self.replayFile:
+      self.replay()
+      return
     self.telnetInit()
     self.telnetConnect()
     while not self.doQuit.isSet():
@@ -122,19 +141,95 @@ class DxCluster(threading.Thread):
   def telnetRead(self):
     message = self.tn.read_until(b'\n', 60).decode(encoding='utf-8', errors='replace')
     if self.doQuit.isSet() == False:
-      dxEntry = DxEntry();
-      if dxEntry.parseMessage(message):
-        for i, listElement in enumerate(self.dxSpots):
-          if (listElement.equal(dxEntry)):
-            listElement.join (dxEntry)
-            return
-          if listElement.isExpired():
-            del (self.dxSpots[i])
-        self.dxSpots.append(dxEntry)
+      if self.addMessage(message):
         if self.listener:
           self.listener()
+      elif self.expire() and self.listener:
+        self.listener()
+
+  def addMessage(self, message):
+    # Add a spot from a line of cluster text.  Return True if the spots changed.
+    dxEntry = DxEntry();
+    if not dxEntry.parseMessage(message):
+      return False
+    key = dxEntry.getKey()
+    with self.lock:
+      self.expire(locked=True)
+      listElement = self.dxSpots.get(key)
+      if listElement:
+        listElement.join (dxEntry)
+      else:
+        self.dxSpots[key] = dxEntry
+        self.addIndex(dxEntry)
+      heapq.heappush(self.expireHeap, (dxEntry.timestamp, key))
+    return True
+
+  def expire(self, locked=False):
+    # Remove expired spots.  Return True if any were removed.
+    if not locked:
+      with self.lock:
+        return self.expire(locked=True)
+    limit = time.time() - conf.dxClExpireTime * 60
+    removed = False
+    heap = self.expireHeap
+    while heap and heap[0][0] < limit:
+      timestamp, key = heapq.heappop(heap)
+      listElement = self.dxSpots.get(key)
+      if listElement and listElement.isExpired():	# else the spot was renewed and has a later heap entry
+        del self.dxSpots[key]
+        self.removeIndex(listElement)
+        removed = True
+    return removed
+
+  def replay(self):
+    # Read spots from a file of captured cluster text.  This is used to test busy spot rates.
+    try:
+      fp = open(self.replayFile, 'rb')
+    except IOError:
+      print ("Can not open the DX cluster replay file", self.replayFile)
+      return
+    count = 0
+    for line in fp:
+      if self.doQuit.isSet():
+        break
+      if self.addMessage(line.decode(encoding='utf-8', errors='replace')):
+        count += 1
+        if count % 100 == 0 and self.listener:
+          self.listener()
+    fp.close()
+    if self.listener:
+      self.listener()
+
+  def addIndex(self, entry):
+    # Insert the spot into the frequency index.  Call with the lock held.
+    i = bisect.bisect_right(self.spotFreqs, entry.freq)
+    self.spotFreqs.insert(i, entry.freq)
+    self.spotIndex.insert(i, entry)
+
+  def removeIndex(self, entry):
+    # Remove the spot from the frequency index.  Call with the lock held.
+    i = bisect.bisect_left(self.spotFreqs, entry.freq)
+    while i < len(self.spotFreqs) and self.spotFreqs[i] == entry.freq:
+      if self.spotIndex[i] is entry:
+        del self.spotFreqs[i]
+        del self.spotIndex[i]
+        return
+      i += 1
+
+  def getSpots(self, freq1, freq2):
+    # Return a list of the spots with freq1 < frequency < freq2, sorted by frequency.
+    # The list is a snapshot; the info of each spot is replaced, never changed, when a spot is joined.
+    with self.lock:
+      lo = bisect.bisect_right(self.spotFreqs, freq1)
+      hi = bisect.bisect_left(self.spotFreqs, freq2)
+      return self.spotIndex[lo:hi]
+
+  def getCount(self):
+    return len(self.dxSpots)
         
   def getHost(self):
+    if self.replayFile:
+      return self.replayFile
     return self.tn.host + ':' + str(self.tn.port)
         
   def stop(self):
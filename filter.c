@@ -2,6 +2,7 @@
 #include <stdlib.h>
 #include <math.h>
 #include <complex.h>	// Use native C99 complex type for fftw3
+#include <fftw3.h>
 #include "quisk.h"
 #include "filter.h"
 #include "filters.h"
@@ -10,13 +11,16 @@ void quisk_filt_cInit(struct quisk_cFilter * filter, double * coefs, int taps)
 {	// Prepare a new filter using coefs and taps.  Samples are complex.
 	filter->dCoefs = coefs;
 	filter->cpxCoefs = NULL;
-	filter->cSamples = (complex double *)malloc(taps * sizeof(complex double));
-	memset(filter->cSamples, 0, taps * sizeof(complex double));
+	// The sample history is stored twice so the newest nTaps samples are always contiguous.
+	filter->cSamples = (complex double *)malloc(2 * taps * sizeof(complex double));
+	memset(filter->cSamples, 0, 2 * taps * sizeof(complex double));
 	filter->ptcSamp = filter->cSamples;
 	filter->nTaps = taps;
 	filter->decim_index = 0;
 	filter->cBuf = NULL;
 	filter->nBuf = 0;
+	filter->polyCoefs = NULL;
+	filter->polyInterp = 0;
 }
 
 void quisk_filt_dInit(struct quisk_dFilter * filter, double * coefs, int taps)
@@ -105,12 +109,58 @@ complex double quisk_cC_out(complex double sample, struct quisk_cFilter * filter
 }
 #endif
 
+static complex double * cFilterPut(struct quisk_cFilter * filter, complex double sample)
+{	// Save a sample in the mirrored history and return a pointer to its upper copy.
+	// The samples ptSample[0], ptSample[-1], ... ptSample[1 - nTaps] are the newest to oldest.
+	complex double * ptSample;
+
+	ptSample = filter->ptcSamp;
+	ptSample[0] = ptSample[filter->nTaps] = sample;
+	return ptSample + filter->nTaps;
+}
+
+static void cFilterAdvance(struct quisk_cFilter * filter)
+{
+	if (++filter->ptcSamp >= filter->cSamples + filter->nTaps)
+		filter->ptcSamp = filter->cSamples;
+}
+
+static complex double cFilterDot(complex double * ptSample, double * ptCoef, int taps)
+{	// Multiply samples right to left by coefficients left to right.  There is no wrap around.
+	int k;
+	double re, im;
+
+	re = im = 0;
+	for (k = 0; k < taps; k++) {
+		re += creal(ptSample[-k]) * ptCoef[k];
+		im += cimag(ptSample[-k]) * ptCoef[k];
+	}
+	return re + I * im;
+}
+
+static double * cFilterPolyphase(struct quisk_cFilter * filter, int interp)
+{	// Return the polyphase branches of dCoefs for interpolation by interp.
+	// Branch j starts at j * (nTaps / interp) and holds dCoefs[j], dCoefs[j + interp], ...
+	int j, k, nPhase;
+
+	if (filter->polyInterp != interp) {
+		nPhase = filter->nTaps / interp;
+		if (filter->polyCoefs)
+			free(filter->polyCoefs);
+		filter->polyCoefs = (double *)malloc(interp * nPhase * sizeof(double));
+		for (j = 0; j < interp; j++)
+			for (k = 0; k < nPhase; k++)
+				filter->polyCoefs[j * nPhase + k] = filter->dCoefs[j + k * interp];
+		filter->polyInterp = interp;
+	}
+	return filter->polyCoefs;
+}
+
 int quisk_cInterpolate(complex double * cSamples, int count, struct quisk_cFilter * filter, int interp)
 {	// This uses the double coefficients of filter (not the complex).  Samples are complex.
-	int i, j, k, nOut;
-	double * ptCoef;
+	int i, j, nOut, nPhase;
+	double * poly;
 	complex double * ptSample;
-	complex double csample;
 
 	if (count > filter->nBuf) {	// increase size of sample buffer
 		filter->nBuf = count * 2;
@@ -119,24 +169,16 @@ int quisk_cInterpolate(complex double * cSamples, int count, struct quisk_cFilte
 		filter->cBuf = (complex double *)malloc(filter->nBuf * sizeof(complex double));
 	}
 	memcpy(filter->cBuf, cSamples, count * sizeof(complex double));
+	poly = cFilterPolyphase(filter, interp);
+	nPhase = filter->nTaps / interp;
 	nOut = 0;
 	for (i = 0; i < count; i++) {
-		// Put samples into buffer left to right.  Use samples right to left.
-		*filter->ptcSamp = filter->cBuf[i];
+		ptSample = cFilterPut(filter, filter->cBuf[i]);
 		for (j = 0; j < interp; j++) {
-			ptSample = filter->ptcSamp;
-			ptCoef = filter->dCoefs + j;
-			csample = 0;
-			for (k = 0; k < filter->nTaps / interp; k++, ptCoef += interp) {
-				csample += *ptSample  *  *ptCoef;
-				if (--ptSample < filter->cSamples)
-					ptSample = filter->cSamples + filter->nTaps - 1;
-			}
 			if (nOut < SAMP_BUFFER_SIZE * 8 / 10)
-				cSamples[nOut++] = csample * interp;
+				cSamples[nOut++] = cFilterDot(ptSample, poly + j * nPhase, nPhase) * interp;
 		}
-		if (++filter->ptcSamp >= filter->cSamples + filter->nTaps)
-			filter->ptcSamp = filter->cSamples;
+		cFilterAdvance(filter);
 	}
 	return nOut;
 }
@@ -149,10 +191,15 @@ int quisk_dInterpolate(double * dSamples, int count, struct quisk_dFilter * filt
 	double dsample;
 
 	if (count > filter->nBuf) {	// increase size of sample buffer
-		filter->nBuf = count * 2;
 		if (filter->dBuf)
 			free(filter->dBuf);
-		filter->dBuf = (double *)malloc(filter->nBuf * sizeof(double));
+		filter->dBuf = (double *)malloc(count * 2 * sizeof(double));
+		if ( ! filter->dBuf) {
+			filter->nBuf = 0;
+			printf("Failure to allocate the half band filter buffer\n");
+			return 0;
+		}
+		filter->nBuf = count * 2;
 	}
 	memcpy(filter->dBuf, dSamples, count * sizeof(double));
 	nOut = 0;
@@ -179,28 +226,18 @@ int quisk_dInterpolate(double * dSamples, int count, struct quisk_dFilter * filt
 
 int quisk_cDecimate(complex double * cSamples, int count, struct quisk_cFilter * filter, int decim)
 {	// This uses the double coefficients of filter (not the complex).
-	int i, k, nOut;
+	// Only the samples that are kept are calculated.
+	int i, nOut;
 	complex double * ptSample;
-	double * ptCoef;
-	complex double csample;
 
 	nOut = 0;
 	for (i = 0; i < count; i++) {
-		*filter->ptcSamp = cSamples[i];
+		ptSample = cFilterPut(filter, cSamples[i]);
 		if (++filter->decim_index >= decim) {
 			filter->decim_index = 0;		// output a sample
-			csample = 0;
-			ptSample = filter->ptcSamp;
-			ptCoef = filter->dCoefs;
-			for (k = 0; k < filter->nTaps; k++, ptCoef++) {
-				csample += *ptSample  *  *ptCoef;
-				if (--ptSample < filter->cSamples)
-					ptSample = filter->cSamples + filter->nTaps - 1;
-			}
-			cSamples[nOut++] = csample;
+			cSamples[nOut++] = cFilterDot(ptSample, filter->dCoefs, filter->nTaps);
 		}
-		if (++filter->ptcSamp >= filter->cSamples + filter->nTaps)
-			filter->ptcSamp = filter->cSamples;
+		cFilterAdvance(filter);
 	}
 	return nOut;
 }
@@ -214,21 +251,16 @@ int quisk_cCDecimate(complex double * cSamples, int count, struct quisk_cFilter
 
 	nOut = 0;
 	for (i = 0; i < count; i++) {
-		*filter->ptcSamp = cSamples[i];
+		ptSample = cFilterPut(filter, cSamples[i]);
 		if (++filter->decim_index >= decim) {
 			filter->decim_index = 0;		// output a sample
 			csample = 0;
-			ptSample = filter->ptcSamp;
 			ptCoef = filter->cpxCoefs;
-			for (k = 0; k < filter->nTaps; k++, ptCoef++) {
-				csample += *ptSample  *  *ptCoef;
-				if (--ptSample < filter->cSamples)
-					ptSample = filter->cSamples + filter->nTaps - 1;
-			}
+			for (k = 0; k < filter->nTaps; k++)
+				csample += ptSample[-k] * ptCoef[k];
 			cSamples[nOut++] = csample;
 		}
-		if (++filter->ptcSamp >= filter->cSamples + filter->nTaps)
-			filter->ptcSamp = filter->cSamples;
+		cFilterAdvance(filter);
 	}
 	return nOut;
 }
@@ -264,10 +296,10 @@ int quisk_dDecimate(double * dSamples, int count, struct quisk_dFilter * filter,
 int quisk_cInterpDecim(complex double * cSamples, int count, struct quisk_cFilter * filter, int interp, int decim)
 {	// Interpolate by interp, and then decimate by decim.
 	// This uses the double coefficients of filter (not the complex).  Samples are complex.
-	int i, k, nOut;
-	double * ptCoef;
+	// Only the kept outputs are calculated, each with a single polyphase branch of the filter.
+	int i, nOut, nPhase;
+	double * poly;
 	complex double * ptSample;
-	complex double csample;
 
 	if (count > filter->nBuf) {	// increase size of sample buffer
 		filter->nBuf = count * 2;
@@ -276,25 +308,17 @@ int quisk_cInterpDecim(complex double * cSamples, int count, struct quisk_cFilte
 		filter->cBuf = (complex double *)malloc(filter->nBuf * sizeof(complex double));
 	}
 	memcpy(filter->cBuf, cSamples, count * sizeof(complex double));
+	poly = cFilterPolyphase(filter, interp);
+	nPhase = filter->nTaps / interp;
 	nOut = 0;
 	for (i = 0; i < count; i++) {
-		// Put samples into buffer left to right.  Use samples right to left.
-		*filter->ptcSamp = filter->cBuf[i];
+		ptSample = cFilterPut(filter, filter->cBuf[i]);
 		while (filter->decim_index < interp) {
-			ptSample = filter->ptcSamp;
-			ptCoef = filter->dCoefs + filter->decim_index;
-			csample = 0;
-			for (k = 0; k < filter->nTaps / interp; k++, ptCoef += interp) {
-				csample += *ptSample  *  *ptCoef;
-				if (--ptSample < filter->cSamples)
-					ptSample = filter->cSamples + filter->nTaps - 1;
-			}
 			if (nOut < SAMP_BUFFER_SIZE * 8 / 10)
-				cSamples[nOut++] = csample * interp;
+				cSamples[nOut++] = cFilterDot(ptSample, poly + filter->decim_index * nPhase, nPhase) * interp;
 			filter->decim_index += decim;
 		}
-		if (++filter->ptcSamp >= filter->cSamples + filter->nTaps)
-			filter->ptcSamp = filter->cSamples;
+		cFilterAdvance(filter);
 		filter->decim_index = filter->decim_index - interp;
 	}
 	return nOut;
@@ -351,48 +375,333 @@ int quisk_cFilter(complex double * cSamples, int count, struct quisk_cFilter * f
 	return quisk_cDecimate(cSamples, count, filter, 1);
 }
 
-int quisk_cDecim2HB45(complex double * cSamples, int count, struct quisk_cHB45Filter * filter)
-{	// This uses the double coefficients of filter (not the complex).
+void quisk_cFastFilterInit(struct quisk_cFastFilter * filter, int taps, int is_iq)
+{	// Prepare an FFT convolution filter for taps coefficients.  Call quisk_cFastFilterCoefs() next.
+	// If is_iq, the I and Q samples are filtered by different real coefficients as in cRxFilterOut().
+	// Otherwise the complex samples are filtered by the I coefficients.  The output is delayed by nBlock samples.
+	int N, size;
+
+	filter->nTaps = taps;
+	filter->nBlock = 64;
+	while (filter->nBlock * 8 < taps)	// limit the number of partitions to about eight
+		filter->nBlock *= 2;
+	filter->nPart = (taps + filter->nBlock - 1) / filter->nBlock;
+	filter->index = 0;
+	filter->nextPart = 0;
+	filter->is_iq = is_iq;
+	N = filter->nBlock * 2;
+	size = N * sizeof(complex double);
+	filter->respA = (complex double *)fftw_malloc(size * filter->nPart);
+	if (is_iq)
+		filter->respB = (complex double *)fftw_malloc(size * filter->nPart);
+	else
+		filter->respB = NULL;
+	filter->fdl = (complex double *)fftw_malloc(size * filter->nPart);
+	filter->accum = (complex double *)fftw_malloc(size);
+	filter->timeBuf = (complex double *)fftw_malloc(size);
+	filter->inBuf = (complex double *)fftw_malloc(size);
+	filter->outBuf = (complex double *)malloc(filter->nBlock * sizeof(complex double));
+	// Plan before the arrays are initialized because FFTW_MEASURE overwrites them.
+	filter->planF = quisk_plan_dft(N, filter->inBuf, filter->fdl, FFTW_FORWARD);
+	filter->planB = quisk_plan_dft(N, filter->accum, filter->timeBuf, FFTW_BACKWARD);
+	memset(filter->fdl, 0, size * filter->nPart);
+	memset(filter->inBuf, 0, size);
+	memset(filter->outBuf, 0, filter->nBlock * sizeof(complex double));
+}
+
+void quisk_cFastFilterCoefs(struct quisk_cFastFilter * filter, double * coefI, double * coefQ)
+{	// Set the coefficients y[n] = sum coef[k] * x[n - k].  Use coefQ only if is_iq.
+	// The coefficients can be changed without resetting the sample history.
+	int i, k, p, N;
+	double * coefs;
+	complex double * resp, gI, gQ;
+
+	N = filter->nBlock * 2;
+	for (k = 0; k < 2; k++) {
+		if (k == 0) {
+			coefs = coefI;
+			resp = filter->respA;
+		}
+		else if (filter->is_iq) {
+			coefs = coefQ;
+			resp = filter->respB;
+		}
+		else {
+			break;
+		}
+		for (p = 0; p < filter->nPart; p++, resp += N) {
+			memset(filter->timeBuf, 0, N * sizeof(complex double));
+			for (i = 0; i < filter->nBlock && p * filter->nBlock + i < filter->nTaps; i++)
+				filter->timeBuf[i] = coefs[p * filter->nBlock + i] / N;	// include the 1/N of the inverse FFT
+			fftw_execute_dft((fftw_plan)filter->planF, filter->timeBuf, resp);
+		}
+	}
+	if (filter->is_iq) {
+		// With X the FFT of x = I + jQ, the FFT of the output is X * (GI + GQ) / 2 + conj(X[N-k]) * (GI - GQ) / 2.
+		for (i = 0; i < N * filter->nPart; i++) {
+			gI = filter->respA[i];
+			gQ = filter->respB[i];
+			filter->respA[i] = (gI + gQ) / 2;
+			filter->respB[i] = (gI - gQ) / 2;
+		}
+	}
+}
+
+static void FastFilterBlock(struct quisk_cFastFilter * filter)
+{	// Filter the block in inBuf and put the result in outBuf.
+	int i, k, p, N, mask;
+	complex double * X, * A, * B, * acc;
+
+	N = filter->nBlock * 2;
+	mask = N - 1;
+	X = filter->fdl + filter->nextPart * N;
+	fftw_execute_dft((fftw_plan)filter->planF, filter->inBuf, X);
+	memcpy(filter->inBuf, filter->inBuf + filter->nBlock, filter->nBlock * sizeof(complex double));
+	acc = filter->accum;
+	memset(acc, 0, N * sizeof(complex double));
+	k = filter->nextPart;		// the newest spectrum goes with the first partition
+	for (p = 0; p < filter->nPart; p++) {
+		X = filter->fdl + k * N;
+		A = filter->respA + p * N;
+		for (i = 0; i < N; i++)
+			acc[i] += X[i] * A[i];
+		if (filter->is_iq) {
+			B = filter->respB + p * N;
+			for (i = 0; i < N; i++)
+				acc[i] += conj(X[(N - i) & mask]) * B[i];
+		}
+		if (--k < 0)
+			k = filter->nPart - 1;
+	}
+	if (++filter->nextPart >= filter->nPart)
+		filter->nextPart = 0;
+	fftw_execute_dft((fftw_plan)filter->planB, acc, filter->timeBuf);
+	memcpy(filter->outBuf, filter->timeBuf + filter->nBlock, filter->nBlock * sizeof(complex double));
+}
+
+int quisk_cFastFilter(complex double * cSamples, int count, struct quisk_cFastFilter * filter)
+{	// Filter complex samples in place.  Samples are processed in blocks, so the output is delayed by nBlock samples.
+	int i;
+
+	for (i = 0; i < count; i++) {
+		filter->inBuf[filter->nBlock + filter->index] = cSamples[i];
+		cSamples[i] = filter->outBuf[filter->index];
+		if (++filter->index >= filter->nBlock) {
+			filter->index = 0;
+			FastFilterBlock(filter);
+		}
+	}
+	return count;
+}
+
+void quisk_cFastFilterFree(struct quisk_cFastFilter * filter)
+{
+	if ( ! filter->respA)
+		return;
+	fftw_free(filter->respA);
+	if (filter->respB)
+		fftw_free(filter->respB);
+	fftw_free(filter->fdl);
+	fftw_free(filter->accum);
+	fftw_free(filter->timeBuf);
+	fftw_free(filter->inBuf);
+	free(filter->outBuf);
+	memset(filter, 0, sizeof(struct quisk_cFastFilter));
+}
+
 // Half band filter, sample rate 96 Hz, pass 16, center 24, stop 32, good BW 2/3, 45 taps.
-	int i, nOut;
-	complex double * samples, * center;
-	static double coef[12] = { 0.000018566625444266, -0.000118469698701817, 0.000457318798253456,
+// Rate 96, cutoff 16-24-32, atten 120 dB.  Coef[0] and [44] are zero.
+// The odd taps are zero except the center tap, and the filter is symmetric, so only 12 coefficients are needed.
+static double HB45coef[12] = { 0.000018566625444266, -0.000118469698701817, 0.000457318798253456,
 	-0.001347840471412094, 0.003321838571445455, -0.007198422696929033, 0.014211106939802483,
 	-0.026424776824073383, 0.048414810444971007, -0.096214669073304823, 0.314881034738348550,
-	0.500000000000000000 }; // Rate 96, cutoff 16-24-32, atten 120 dB.  Coef[0] and [44] are zero.
+	0.500000000000000000 };
 
-	nOut = 0;
-	samples = filter->samples;
-	center = filter->center;
+// The half band kernels calculate the symmetric part of the filter for n outputs:
+//     dst[m] = sum(k = 0 ... 10) HB45coef[k] * (samples[21 + m - k] + samples[m + k])
+// The samples are a linear buffer of 21 old samples followed by the new samples.
+static void HB45KernelScalar(complex double * dst, complex double * samples, int n)
+{
+	int m, k;
+	complex double out;
+
+	for (m = 0; m < n; m++) {
+		out = 0;
+		for (k = 0; k < 11; k++)
+			out += (samples[21 + m - k] + samples[m + k]) * HB45coef[k];
+		dst[m] = out;
+	}
+}
+
+#if defined(__GNUC__) && (defined(__x86_64__) || defined(__i386__))
+#include <immintrin.h>
+#define QUISK_HB45_AVX	1
+
+__attribute__((target("avx")))
+static void HB45KernelAVX(complex double * dst, complex double * samples, int n)
+{	// Each 256-bit register holds two complex samples, so two outputs are calculated at once.
+	int m, k;
+	double * ptSamp, * ptDst;
+	__m256d acc, coef;
+
+	ptSamp = (double *)samples;
+	ptDst = (double *)dst;
+	for (m = 0; m + 1 < n; m += 2) {
+		acc = _mm256_setzero_pd();
+		for (k = 0; k < 11; k++) {
+			coef = _mm256_set1_pd(HB45coef[k]);
+			acc = _mm256_add_pd(acc, _mm256_mul_pd(coef, _mm256_add_pd(
+				_mm256_loadu_pd(ptSamp + 2 * (21 + m - k)), _mm256_loadu_pd(ptSamp + 2 * (m + k)))));
+		}
+		_mm256_storeu_pd(ptDst + 2 * m, acc);
+	}
+	if (m < n)
+		HB45KernelScalar(dst + m, samples + m, n - m);
+}
+#endif
+
+static void (* HB45Kernel)(complex double *, complex double *, int) = NULL;
+
+static void HB45SelectKernel(void)
+{	// Choose the half band kernel based on the features of this CPU.
+	HB45Kernel = HB45KernelScalar;
+#ifdef QUISK_HB45_AVX
+	__builtin_cpu_init();
+	if (__builtin_cpu_supports("avx"))
+		HB45Kernel = HB45KernelAVX;
+#endif
+}
+
+static int HB45BufferSize(struct quisk_cHB45Filter * filter, int count)
+{	// cBuf holds the linear sample buffer and a second buffer of about the same size.
+	// Return zero if the buffer can not be allocated.
+	if (count * 2 + 64 > filter->nBuf) {
+		if (filter->cBuf)
+			free(filter->cBuf);
+		filter->cBuf = (complex double *)malloc((count * 4 + 64) * sizeof(complex double));
+		if ( ! filter->cBuf) {
+			filter->nBuf = 0;
+			printf("Failure to allocate the half band filter buffer\n");
+			return 0;
+		}
+		filter->nBuf = count * 4 + 64;
+	}
+	if ( ! HB45Kernel)
+		HB45SelectKernel();
+	return 1;
+}
+
+void quisk_cHB45Reset(struct quisk_cHB45Filter * filter)
+{	// Clear the sample history, but keep the buffer.
+	filter->toggle = 0;
+	memset(filter->samples, 0, sizeof(filter->samples));
+	memset(filter->center, 0, sizeof(filter->center));
+}
+
+int quisk_cDecim2HB45(complex double * cSamples, int count, struct quisk_cHB45Filter * filter)
+{	// This uses the double coefficients of filter (not the complex).
+	// The input alternates between the center tap and the symmetric taps.  Samples
+	// for the symmetric taps go into the linear buffer "samples", and samples for the
+	// center tap go into the linear buffer "center".  There is one output for each sample in "samples".
+	int i, m, nS, nC, cOffset;
+	complex double * samples, * center;
+
+	if ( ! HB45BufferSize(filter, count))
+		return 0;
+	samples = filter->cBuf;
+	center = filter->cBuf + count + 24;
+	for (i = 0; i < 22; i++)		// old samples, oldest first
+		samples[i] = filter->samples[21 - i];
+	for (i = 0; i < 11; i++)
+		center[i] = filter->center[10 - i];
+	cOffset = filter->toggle ? 0 : 1;	// number of center samples before the first output
+	nS = 0;
+	nC = 0;
 	for (i = 0; i < count; i++) {
 		if (filter->toggle == 0){
 			filter->toggle = 1;
-			memmove(center + 1, center, sizeof(complex double) * 10);
-			center[0] = cSamples[i];
+			center[11 + nC++] = cSamples[i];
 		}
 		else {
 			filter->toggle = 0;
-			memmove(samples + 1, samples, sizeof(complex double) * 21);
-			samples[0] = cSamples[i];
-			// output a sample
-			cSamples[nOut++] =
-			(samples[ 0] + samples[21]) * coef[0] +
-			(samples[ 1] + samples[20]) * coef[1] +
-			(samples[ 2] + samples[19]) * coef[2] +
-			(samples[ 3] + samples[18]) * coef[3] +
-			(samples[ 4] + samples[17]) * coef[4] +
-			(samples[ 5] + samples[16]) * coef[5] +
-			(samples[ 6] + samples[15]) * coef[6] +
-			(samples[ 7] + samples[14]) * coef[7] +
-			(samples[ 8] + samples[13]) * coef[8] +
-			(samples[ 9] + samples[12]) * coef[9] +
-			(samples[10] + samples[11]) * coef[10] +
-			center[10] * coef[11];
+			samples[22 + nS++] = cSamples[i];
 		}
 	}
-	return nOut;
+	// The new samples start at samples[22], so the kernel starts at samples + 1.
+	(* HB45Kernel)(cSamples, samples + 1, nS);
+	for (m = 0; m < nS; m++)
+		cSamples[m] += center[m + cOffset] * HB45coef[11];
+	for (i = 0; i < 22; i++)		// save the newest samples
+		filter->samples[i] = samples[21 + nS - i];
+	for (i = 0; i < 11; i++)
+		filter->center[i] = center[10 + nC - i];
+	return nS;
 }
 
+static void HB45KernelFloat(complex float * dst, complex float * samples, int n)
+{	// The single precision half band kernel.  The compiler can vectorize the inner loop.
+	int m, k;
+	complex float out;
+
+	for (m = 0; m < n; m++) {
+		out = 0;
+		for (k = 0; k < 11; k++)
+			out += (samples[21 + m - k] + samples[m + k]) * (float)HB45coef[k];
+		dst[m] = out;
+	}
+}
+
+int quisk_fDecim2HB45(complex float * cSamples, int count, struct quisk_fHB45Filter * filter)
+{	// Single precision version of quisk_cDecim2HB45() for high sample rate sources.
+	int i, m, nS, nC, cOffset;
+	complex float * samples, * center;
+
+	if (count * 2 + 64 > filter->nBuf) {
+		if (filter->cBuf)
+			free(filter->cBuf);
+		filter->cBuf = (complex float *)malloc((count * 4 + 64) * sizeof(complex float));
+		if ( ! filter->cBuf) {
+			filter->nBuf = 0;
+			printf("Failure to allocate the half band filter buffer\n");
+			return 0;
+		}
+		filter->nBuf = count * 4 + 64;
+	}
+	samples = filter->cBuf;
+	center = filter->cBuf + count + 24;
+	for (i = 0; i < 22; i++)		// old samples, oldest first
+		samples[i] = filter->samples[21 - i];
+	for (i = 0; i < 11; i++)
+		center[i] = filter->center[10 - i];
+	cOffset = filter->toggle ? 0 : 1;	// number of center samples before the first output
+	nS = 0;
+	nC = 0;
+	for (i = 0; i < count; i++) {
+		if (filter->toggle == 0){
+			filter->toggle = 1;
+			center[11 + nC++] = cSamples[i];
+		}
+		else {
+			filter->toggle = 0;
+			samples[22 + nS++] = cSamples[i];
+		}
+	}
+	HB45KernelFloat(cSamples, samples + 1, nS);
+	for (m = 0; m < nS; m++)
+		cSamples[m] += center[m + cOffset] * (float)HB45coef[11];
+	for (i = 0; i < 22; i++)		// save the newest samples
+		filter->samples[i] = samples[21 + nS - i];
+	for (i = 0; i < 11; i++)
+		filter->center[i] = center[10 + nC - i];
+	return nS;
+}
+
+void quisk_dHB45Reset(struct quisk_dHB45Filter * filter)
+{	// Clear the sample history, but keep the buffer.
+	filter->toggle = 0;
+	memset(filter->samples, 0, sizeof(filter->samples));
+	memset(filter->center, 0, sizeof(filter->center));
+}
 
 int quisk_dInterp2HB45(double * dsamples, int count, struct quisk_dHB45Filter * filter)
 {  // Half-Band interpolation by 2
@@ -405,10 +714,15 @@ int quisk_dInterp2HB45(double * dsamples, int count, struct quisk_dHB45Filter *
 	0.500000000000000000 }; // Rate 96, cutoff 16-24-32, atten 120 dB.  Coef[0] and [44] are zero.
 
 	if (count > filter->nBuf) {	// increase size of sample buffer
-		filter->nBuf = count * 2;
 		if (filter->dBuf)
 			free(filter->dBuf);
-		filter->dBuf = (double *)malloc(filter->nBuf * sizeof(double));
+		filter->dBuf = (double *)malloc(count * 2 * sizeof(double));
+		if ( ! filter->dBuf) {
+			filter->nBuf = 0;
+			printf("Failure to allocate the half band filter buffer\n");
+			return 0;
+		}
+		filter->nBuf = count * 2;
 	}
 	nCoef = 12;
 	nSamp = (nCoef - 1) * 2;
@@ -431,36 +745,27 @@ int quisk_dInterp2HB45(double * dsamples, int count, struct quisk_dHB45Filter *
 
 int quisk_cInterp2HB45(complex double * cSamples, int count, struct quisk_cHB45Filter * filter)
 {  // Half-Band interpolation by 2
-	int i, k, nOut, nCoef, nSamp;
-	complex double out;
-	complex double * samples;
-	static double coef[12] = { 0.000018566625444266, -0.000118469698701817, 0.000457318798253456,
-	-0.001347840471412094, 0.003321838571445455, -0.007198422696929033, 0.014211106939802483,
-	-0.026424776824073383, 0.048414810444971007, -0.096214669073304823, 0.314881034738348550,
-	0.500000000000000000 }; // Rate 96, cutoff 16-24-32, atten 120 dB.  Coef[0] and [44] are zero.
-
-	if (count > filter->nBuf) {	// increase size of sample buffer
-		filter->nBuf = count * 2;
-		if (filter->cBuf)
-			free(filter->cBuf);
-		filter->cBuf = (complex double *)malloc(filter->nBuf * sizeof(complex double));
-	}
-	nCoef = 12;
-	nSamp = (nCoef - 1) * 2;
-	memcpy(filter->cBuf, cSamples, count * sizeof(complex double));
-	samples = filter->samples;
-	nOut = 0;
-	for (i = 0; i < count; i++) {
-		memmove(samples + 1, samples, (nSamp - 1) * sizeof(complex double));
-		samples[0] = filter->cBuf[i];
-		if (nOut > SAMP_BUFFER_SIZE * 8 / 10)
-			continue;
-		cSamples[nOut++] = samples[nCoef - 1] * coef[nCoef - 1] * 2;
-		out = 0;
-		for (k = 0; k < nSamp / 2; k++)
-			out += (samples[k] + samples[nSamp - 1 - k]) * coef[k];
-		cSamples[nOut++] = out * 2;
+	// The zero taps of the filter are not calculated; each input sample produces one output from
+	// the center tap and one output from the symmetric taps.
+	int i, m, nIn;
+	complex double * samples, * sym;
+
+	if ( ! HB45BufferSize(filter, count))
+		return 0;
+	samples = filter->cBuf;
+	sym = filter->cBuf + count + 24;
+	for (i = 0; i < 21; i++)		// old samples, oldest first
+		samples[i] = filter->samples[20 - i];
+	memcpy(samples + 21, cSamples, count * sizeof(complex double));
+	nIn = count;		// limit the output to the size of the sample buffer
+	if (nIn > SAMP_BUFFER_SIZE * 8 / 10 / 2 + 1)
+		nIn = SAMP_BUFFER_SIZE * 8 / 10 / 2 + 1;
+	(* HB45Kernel)(sym, samples, nIn);
+	for (m = 0; m < nIn; m++) {
+		cSamples[2 * m] = samples[10 + m] * HB45coef[11] * 2;
+		cSamples[2 * m + 1] = sym[m] * 2;
 	}
-	return nOut;
+	for (i = 0; i < 21; i++)		// save the newest samples
+		filter->samples[i] = samples[20 + count - i];
+	return nIn * 2;
 }
-
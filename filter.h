@@ -7,6 +7,8 @@ struct quisk_cFilter {
 	complex double * cSamples;	// storage for old samples
 	complex double * ptcSamp;	// next available position in cSamples
 	complex double * cBuf;		// auxillary buffer for interpolation
+	double * polyCoefs;			// dCoefs rearranged into polyphase branches for interpolation
+	int polyInterp;				// the interpolation of polyCoefs, or zero
 } ;
 
 struct quisk_dFilter {
@@ -28,6 +30,14 @@ struct quisk_cHB45Filter {   // Complex half band decimate by 2 filter with 45 c
 	complex double center[11];
 } ;
 
+struct quisk_fHB45Filter {   // Complex float half band decimate by 2 filter with 45 coefficients
+	complex float * cBuf;		// auxillary buffer for decimation
+	int nBuf;		// dimension of cBuf
+	int toggle;
+	complex float samples[22];
+	complex float center[11];
+} ;
+
 struct quisk_dHB45Filter {   // Real half band decimate by 2 filter with 45 coefficients
 	double * dBuf;		// auxillary buffer for interpolation
 	int nBuf;		// dimension of dBuf
@@ -36,6 +46,24 @@ struct quisk_dHB45Filter {   // Real half band decimate by 2 filter with 45 coef
 	double center[11];
 } ;
 
+struct quisk_cFastFilter {	// Partitioned overlap-save FFT convolution for long filters
+	int nTaps;			// number of filter coefficients
+	int nBlock;			// samples in each block; the FFT size is 2 * nBlock
+	int nPart;			// number of partitions of nBlock coefficients
+	int index;			// number of new samples in the current block
+	int nextPart;		// index in fdl for the spectrum of the next block
+	int is_iq;			// filter I and Q with different real coefficients
+	complex double * respA;		// nPart partition spectra applied to X[k]
+	complex double * respB;		// nPart partition spectra applied to conj(X[N-k]), only if is_iq
+	complex double * fdl;		// frequency domain delay line of nPart input spectra
+	complex double * accum;		// sum of the partition products
+	complex double * timeBuf;	// inverse FFT output
+	complex double * inBuf;		// the previous and the current block of input samples
+	complex double * outBuf;	// output samples for the current block
+	void * planF;				// fftw_plan for the forward FFT
+	void * planB;				// fftw_plan for the inverse FFT
+} ;
+
 void quisk_filt_cInit(struct quisk_cFilter *, double *, int);
 void quisk_filt_dInit(struct quisk_dFilter *, double *, int);
 void quisk_filt_tune(struct quisk_dFilter *, double, int);
@@ -48,10 +76,16 @@ int quisk_cCDecimate(complex double *, int, struct quisk_cFilter *, int);
 int quisk_dDecimate(double *, int, struct quisk_dFilter *, int);
 int quisk_cInterpDecim(complex double *, int, struct quisk_cFilter *, int, int);
 int quisk_cDecim2HB45(complex double *, int, struct quisk_cHB45Filter *);
+void quisk_cHB45Reset(struct quisk_cHB45Filter *);
+void quisk_dHB45Reset(struct quisk_dHB45Filter *);
 int quisk_dInterp2HB45(double *, int, struct quisk_dHB45Filter *);
 int quisk_cInterp2HB45(complex double *, int, struct quisk_cHB45Filter *);
 int quisk_dFilter(double *, int, struct quisk_dFilter *);
 int quisk_cFilter(complex double *, int, struct quisk_cFilter *);
+void quisk_cFastFilterInit(struct quisk_cFastFilter *, int, int);
+void quisk_cFastFilterCoefs(struct quisk_cFastFilter *, double *, double *);
+int quisk_cFastFilter(complex double *, int, struct quisk_cFastFilter *);
+void quisk_cFastFilterFree(struct quisk_cFastFilter *);
 
 extern double quiskMicFilt48Coefs[325];
 extern double quiskMic5Filt48Coefs[424];
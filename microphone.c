@@ -736,7 +736,7 @@ PyObject * quisk_get_tx_filter(PyObject * self, PyObject * args)
 
 	// Create space for the fft of size data_width
 	pt = samples = (fftw_complex *) fftw_malloc(sizeof(fftw_complex) * data_width);
-	plan = fftw_plan_dft_1d(data_width, pt, pt, FFTW_FORWARD, FFTW_MEASURE);
+	plan = quisk_plan_dft(data_width, pt, pt, FFTW_FORWARD);
 	average = (double *) malloc(sizeof(double) * (data_width + nTaps));
 	fft_window = (double *) malloc(sizeof(double) * data_width);
 	bufI = (double *) malloc(sizeof(double) * nTaps);
@@ -775,7 +775,7 @@ PyObject * quisk_get_tx_filter(PyObject * self, PyObject * args)
 
 	for (i = 0; i < data_width; i++)	// multiply by window
 		samples[i] *= fft_window[i];
-	fftw_execute(plan);		// Calculate FFT
+	fftw_execute_dft(plan, pt, pt);		// Calculate FFT
 	// Normalize and convert to log10
 	scale = 0.3 / data_width / scale;
 	for (k = 0; k < data_width; k++) {
@@ -801,7 +801,6 @@ PyObject * quisk_get_tx_filter(PyObject * self, PyObject * args)
 	free(bufI);
 	free(average);
 	free(fft_window);
-	fftw_destroy_plan(plan);
 	fftw_free(samples);
 
 	return tuple2;
@@ -10,10 +10,6 @@
 #include <Python.h>
 #include <stdio.h> 
 #include <string.h> 
-#include <fcntl.h> 
-#include <sys/stat.h> 
-#include <sys/types.h> 
-#include <unistd.h> 
 #include <complex.h>
 #include <perseus-sdr.h>
 
@@ -23,24 +19,6 @@
 
 // This module was written by Andrea Montefusco IW0HDV.
 
-typedef union {
-	struct {
-		int32_t	i;
-		int32_t	q;
-		} __attribute__((__packed__)) iq;
-	struct {
-		uint8_t		i1;
-		uint8_t		i2;
-		uint8_t		i3;
-		uint8_t		i4;
-		uint8_t		q1;
-		uint8_t		q2;
-		uint8_t		q3;
-		uint8_t		q4;
-		} __attribute__((__packed__)) ;
-} iq_sample;
-
-
 // buffer size for libperseus-sdr
 const static	int nb = 6;
 const static	int bs = 1024;
@@ -61,23 +39,37 @@ static int adc_preamp = 0;
 
 static void quisk_stop_samples(void);
 
-static const char *fname = "/tmp/quiskperseus";
-static int rfd = 0;
-static int wfd = 0;
 static int running = 0;
 static int wb_filter = 0;
 
+// The libperseus-sdr callback thread writes samples to this single-producer, single-consumer ring buffer,
+// and the sound thread reads them.  The indexes increase without limit and are masked to index the buffer.
+#define RING_SIZE	(1 << 19)		// size of the ring buffer in samples; must be a power of two
+static complex double ring_buf[RING_SIZE];
+static unsigned int ring_head = 0;		// write index, changed only by the callback thread
+static unsigned int ring_tail = 0;		// read index, changed only by the sound thread
+static unsigned long ring_overflows = 0;	// number of USB buffers that did not fit in the ring buffer
+static unsigned long ring_dropped = 0;	// number of samples dropped because the ring buffer was full
+
 // Called in a loop to read samples; called from the sound thread.
 static int quisk_read_samples(complex double * cSamples)
 {
-	//fprintf (stderr, "r"); fflush(stderr);
-
-	int n = read(rfd, cSamples, sizeof(complex double)*SAMP_BUFFER_SIZE); 
-	//fprintf(stderr, "%d ", n);
-	if (n >= 0)
-		return n/sizeof(complex double);	// return number of samples
-	else
-		return 0;
+	unsigned int head, tail, index, count, nSamples;
+
+	tail = ring_tail;
+	head = __atomic_load_n(&ring_head, __ATOMIC_ACQUIRE);
+	nSamples = head - tail;
+	if (nSamples > SAMP_BUFFER_SIZE)
+		nSamples = SAMP_BUFFER_SIZE;
+	index = tail & (RING_SIZE - 1);
+	count = RING_SIZE - index;		// samples before the end of the buffer
+	if (count > nSamples)
+		count = nSamples;
+	memcpy(cSamples, ring_buf + index, count * sizeof(complex double));
+	if (nSamples > count)
+		memcpy(cSamples + count, ring_buf, (nSamples - count) * sizeof(complex double));
+	__atomic_store_n(&ring_tail, tail + nSamples, __ATOMIC_RELEASE);
+	return nSamples;	// return number of samples
 }
 
 // Called in a loop to write samples; called from the sound thread.
@@ -88,39 +80,35 @@ static int quisk_write_samples(complex double * cSamples, int nSamples)
 
 
 //
-// callback that writes in the output pipe IQ values as
-// complex floating point
+// callback that converts a USB buffer of IQ values to
+// complex floating point and adds them to the ring buffer
 //
 static int user_data_callback_c_f(void *buf, int buf_size, void *extra)
 {
-	// The buffer received contains 24-bit IQ samples (6 bytes per sample)
-	// Here we save the received IQ samples as 32 bit 
-	// (msb aligned) integer IQ samples.
-
-	uint8_t	*samplebuf	= (uint8_t*)buf;
-	int nSamples 		= buf_size/6;
-	int k;
-	iq_sample s;
-
-	// the 24 bit data is scaled to a 32bit value (so that the machine's
-	// natural signed arithmetic will work)
-	for (k=0; k < nSamples; k++) {
-		s.i1 = s.q1 = 0;
-		s.i2 = *samplebuf++;
-		s.i3 = *samplebuf++;
-		s.i4 = *samplebuf++;
-		s.q2 = *samplebuf++;
-		s.q3 = *samplebuf++;
-		s.q4 = *samplebuf++;
-
-		// move I/Q to complex number
-		complex double x = (double)(s.iq.i)*10 + (double)(s.iq.q)*10 * _Complex_I;
-		if (wfd > 0) {
-			int n = write(wfd, &x, sizeof(complex double));
-			if (n<0 && ! -EAGAIN ) 
-				fprintf(stderr, "perseus c: Can't write output file: %s, descriptor: %d\n", strerror(errno), wfd);
-		}
+	// The buffer received contains 24-bit little-endian IQ samples (6 bytes per sample).
+	// The samples are scaled to 32 bits (msb aligned) and multiplied by 10.
+
+	const unsigned char * samplebuf = (const unsigned char *)buf;
+	unsigned int head, tail, space, index, count, nSamples;
+
+	nSamples = buf_size / 6;
+	head = ring_head;
+	tail = __atomic_load_n(&ring_tail, __ATOMIC_ACQUIRE);
+	space = RING_SIZE - (head - tail);
+	if (nSamples > space) {		// the sound thread is not keeping up; drop the samples that do not fit
+		ring_overflows++;
+		ring_dropped += nSamples - space;
+		pt_quisk_sound_state->read_error++;
+		nSamples = space;
 	}
+	index = head & (RING_SIZE - 1);
+	count = RING_SIZE - index;		// samples before the end of the buffer
+	if (count > nSamples)
+		count = nSamples;
+	quisk_unpack_iq(ring_buf + index, samplebuf, count, 3, 0, 0, 10.0);
+	if (nSamples > count)
+		quisk_unpack_iq(ring_buf, samplebuf + count * 6, nSamples - count, 3, 0, 0, 10.0);
+	__atomic_store_n(&ring_head, head + nSamples, __ATOMIC_RELEASE);
 	return 0;
 }
 
@@ -131,19 +119,9 @@ static void quisk_start_samples(void)
 {
 	fprintf (stderr, "perseus c: quisk_start_samples\n"); fflush(stderr);
 
-	int rc = mkfifo(fname, 0666); 
-	
-	if ((rc == -1) && (errno != EEXIST)) {
-		perror("perseus c: Error creating the named pipe");
-	}
-
-	rfd = open(fname, O_RDONLY|O_NONBLOCK); 
-	if (rfd < 0) fprintf(stderr, "perseus c: Can't open read FIFO (%s)\n", strerror(errno));
-	else  fprintf(stderr, "perseus c: read FIFO (%d)\n", rfd);
-
-	wfd = open(fname, O_WRONLY|O_NONBLOCK);
-	if (wfd < 0) fprintf(stderr, "perseus c: Can't open write FIFO (%s)\n", strerror(errno));
-	else  fprintf(stderr, "perseus c: write FIFO (%d)\n", wfd);
+	// The callback thread is not running, so the ring buffer can be reset.
+	ring_head = ring_tail = 0;
+	ring_overflows = ring_dropped = 0;
 
 	if (perseus_set_sampling_rate(descr, sr) < 0) {  // specify the sampling rate value in Samples/second
 		fprintf(stderr, "perseus c: fpga configuration error: %s\n", perseus_errorstr());
@@ -171,10 +149,8 @@ static void quisk_stop_samples(void)
 	fprintf(stderr, "perseus c: stopping async data acquisition...\n");
 	perseus_stop_async_input(descr);
 	running = 0;
-	// clearing FIFO...
-	close(rfd);
-	close(wfd);
-	unlink(fname);
+	if (ring_overflows)
+		fprintf(stderr, "perseus c: %lu ring buffer overflows, %lu samples dropped\n", ring_overflows, ring_dropped);
 }
 
 
@@ -429,6 +405,13 @@ static PyObject * set_adc_preamp (PyObject * self, PyObject * args)	// Called fr
 }
 
 
+static PyObject * get_overflows(PyObject * self, PyObject * args)	// Called from GUI thread
+{
+	if (!PyArg_ParseTuple (args, ""))
+		return NULL;
+	return Py_BuildValue("kk", ring_overflows, ring_dropped);
+}
+
 static PyObject * deinit(PyObject * self, PyObject * args)	// Called from dctor
 {
 	perseus_exit();
@@ -448,6 +431,7 @@ static PyMethodDef QuiskMethods[] = {
 	{"set_attenuator", set_attenuator, METH_VARARGS, "set attenuator"},
 	{"set_adc_dither", set_adc_dither, METH_VARARGS, "set ADC dither"},
 	{"set_adc_preamp", set_adc_preamp, METH_VARARGS, "set ADC preamplifier"},
+	{"get_overflows", get_overflows, METH_VARARGS, "Return the number of ring buffer overflows and dropped samples"},
 	{"deinit", deinit, METH_VARARGS, "deinit"},
 //	{"get_device_list", get_device_list, METH_VARARGS, "Return a list of Perseus SDR devices"},
 	{NULL, NULL, 0, NULL}		/* Sentinel */
@@ -20,6 +20,17 @@ HWND quisk_mainwin_handle;		// Handle of the main window on Windows
 #include "quisk.h"
 #include "filter.h"
 
+#ifndef MS_WINDOWS
+#include <pthread.h>
+#define QUISK_RX_THREADS	1		// Sub-receivers can run on worker threads
+#endif
+
+#if defined(QUISK_RX_THREADS) && defined(__linux__)
+#include <poll.h>
+#include <time.h>
+#define QUISK_UDP_CAPTURE	1		// UDP samples can be received on a capture thread with recvmmsg()
+#endif
+
 #define DEBUG		0
 
 // These are used for input/output of radio samples from/to a file.  The SAMPLES_FROM_FILE is 0 for
@@ -28,10 +39,12 @@ HWND quisk_mainwin_handle;		// Handle of the main window on Windows
 
 #define FM_FILTER_DEMPH		300.0				// Frequency of FM lowpass de-emphasis filter
 #define AGC_DELAY			15					// Delay in AGC buffer in milliseconds
-#define FFT_ARRAY_SIZE		4					// Number of FFTs
+#define FFT_ARRAY_SIZE		8					// Number of FFTs
 #define MULTIRX_FFT_MULT	8					// multirx FFT size is a multiple of graph size
-#define MAX_RX_CHANNELS		3					// maximum paths to decode audio
-#define MAX_RX_FILTERS		3					// maximum number of receiver filters
+#define MAX_RX_CHANNELS		4					// maximum paths to decode audio
+#define MAX_RX_FILTERS		4					// maximum number of receiver filters
+#define OFFLINE_BANK		3					// bank and filter used by process_iq()
+#define OFFLINE_BLOCK		8192				// number of samples process_iq() demodulates at a time
 #define DGT_NARROW_FREQ		3000				// Use 6 ksps rate below this bandwidth
 #define SQUELCH_FFT_SIZE	512
 
@@ -68,6 +81,14 @@ static int fft_data_index = 0;						// Write the current samples to this FFT
 static fftw_plan quisk_fft_plan;
 
 static double * fft_window;		// Window for FFT data
+static int fft_window_type;		// Window function: 0 Hanning, 1 Hamming, 2 Blackman, 3 Blackman-Harris, 4 flat top, 5 none
+static int fft_overlap;			// Number of samples each FFT block shares with the previous block
+static int graph_use_fft = 1;		// Use the FFT, or return raw data
+static int spectrum_thread;		// Calculate the graph FFTs on a worker thread
+static void spectrum_worker_signal(void);
+static void spectrum_worker_lock(void);
+static void spectrum_worker_unlock(void);
+static void spectrum_worker_close(void);
 static double * current_graph;	// current graph data as returned
 
 static PyObject * QuiskError;		// Exception for this module
@@ -81,6 +102,7 @@ int quiskTxHoldState;			// hold Tx until the repeater frequency shift is complet
 int quisk_is_vna;			// zero for normal program, one for the VNA program
 static int py_sample_rx_bytes=2;	// number of bytes in each I or Q sample: 1, 2, 3, or 4
 static int py_sample_rx_endian;		// order of sample array: 0 == little endian; 1 == big endian
+static int py_sample_rx_float;		// samples are float32 instead of integers
 static int py_bscope_bytes;
 static int py_bscope_endian;
 static int quisk_auto_notch;	// auto notch control
@@ -94,10 +116,14 @@ double quisk_ctcss_freq;		// CTCSS repeater access tone frequency in Hertz, or z
 static double cFilterI[MAX_RX_FILTERS][MAX_FILTER_SIZE];	// Digital filter coefficients for receivers
 static double cFilterQ[MAX_RX_FILTERS][MAX_FILTER_SIZE];	// Digital filter coefficients
 static int sizeFilter;			// Number of coefficients for filters
+static int filter_generation[MAX_RX_FILTERS];		// Incremented when the filter coefficients change
+static int fast_filter_taps = 256;		// Use FFT convolution for filters with at least this many taps; or zero
+static int rx_worker_threads;		// Demodulate the sub-receivers on worker threads
 static int isFDX;			// Are we in full duplex mode?
 static int filter_bandwidth[MAX_RX_FILTERS];		// Current filter bandwidth in Hertz
 static int filter_start_offset; 	// Current filter +/- start offset frequency from rx_tune_freq in Hertz for filter zero
-static int quisk_decim_srate;				// Sample rate after decimation
+static int quisk_decim_srate;				// Sample rate after decimation for the sound thread
+static int DecimSrate[MAX_RX_CHANNELS];		// Sample rate after decimation for each bank
 static int quisk_filter_srate=48000;		// Frequency for filters
 static int split_rxtx;						// Are we in split rx/tx mode?
 static int kill_audio;					// Replace radio sound with silence
@@ -114,9 +140,17 @@ static int vfo_screen;                  // The VFO (center) frequency on the FFT
 static int vfo_audio;                   // VFO frequency for the audio channel
 static int is_PTT_down;					// state 0/1 of PTT button
 static int sample_bytes=3;				// number of bytes in each I or Q sample
-
-static complex double PySampleBuf[SAMP_BUFFER_SIZE];	// buffer for samples returned from Python
-static int PySampleCount;				// count of samples in buffer
+static int sound_is_started;			// start_sound() was called, and not close_sound()
+
+// Samples returned from Python are unpacked into a ring.  add_rx_samples() is the only writer and py_sample_read()
+// is the only reader, so the free running head and tail indexes need no lock.
+#define PY_RING_SIZE	(1 << 17)		// number of samples in the ring; must be a power of two
+static complex double PySampleRing[PY_RING_SIZE];	// ring of samples returned from Python
+static unsigned int PySampleHead;		// count of samples added to the ring
+static unsigned int PySampleTail;		// count of samples read from the ring
+static unsigned long py_sample_accepted;	// total samples accepted into the ring
+static unsigned long py_sample_rejected;		// total samples refused because the ring was full; the caller may send them again
+static unsigned int py_sample_max_fill;		// the maximum number of samples waiting in the ring
 
 static int multirx_data_width;			// width of graph data to return
 static int multirx_fft_width;			// size of FFT samples
@@ -156,12 +190,16 @@ int quisk_tx_tune_freq;			// Transmit tuning frequency as +/- sample_rate / 2
 static int rit_freq;			// RIT frequency in Hertz
 
 #define RX_UDP_SIZE		1442		// Expected size of UDP samples packet
+#define UDP_DATAGRAM_SIZE	1500		// Maximum Ethernet is 1500 bytes.
+#define UDP_RING_SIZE		1024		// Number of datagrams in the UDP capture ring; a power of 2
+#define UDP_BATCH		32		// Maximum number of datagrams read by each recvmmsg() call
 static SOCKET rx_udp_socket = INVALID_SOCKET;		// Socket for receiving ADC samples from UDP
 int quisk_rx_udp_started = 0;		// Have we received any data yet?
 int quisk_using_udp = 0;			// Are we using rx_udp_socket?  No longer used, but provided for backward compatibility.
 static double rx_udp_gain_correct = 0;		// Small correction for different decimation rates
 static double rx_udp_clock;			// Clock frequency for UDP samples
 int quisk_use_rx_udp;						// from the config file
+static int udp_capture;			// Receive UDP samples on a capture thread
 
 static int is_little_endian;		// Test byte order; is it little-endian?
 unsigned char quisk_pc_to_hermes[17 * 4];			// data to send from PC to Hermes hardware
@@ -209,10 +247,162 @@ static struct  _MeasureSquelch {
 	int rf_count;
 	// These are used for SSB squelch
 	double * in_fft;
+	complex double * out_fft;
 	int index;
 	int sq_open;
 } MeasureSquelch[MAX_RX_CHANNELS];
 
+#ifdef QUISK_RX_THREADS
+static pthread_mutex_t rx_plan_mutex = PTHREAD_MUTEX_INITIALIZER;	// The FFTW planner is not thread safe
+#endif
+
+static void rx_plan_lock(void)
+{	// Lock before making a plan for code that may run on a worker thread.
+#ifdef QUISK_RX_THREADS
+	pthread_mutex_lock(&rx_plan_mutex);
+#endif
+}
+
+static void rx_plan_unlock(void)
+{
+#ifdef QUISK_RX_THREADS
+	pthread_mutex_unlock(&rx_plan_mutex);
+#endif
+}
+
+// FFTW plans are kept in a cache and are shared by all users of the same size, direction and
+// array layout.  Use the new-array execute functions with these plans, and do not destroy them.
+// Wisdom is loaded from the wisdom file when the program starts, and saved when the sound is closed.
+#define PLAN_CACHE_SIZE		64		// initial size of the cache; it grows as needed
+#define PLAN_COMPLEX		0
+#define PLAN_R2C		1
+#define PLAN_C2R		2
+static struct plan_cache_entry {
+	fftw_plan plan;
+	int kind;		// PLAN_COMPLEX, PLAN_R2C or PLAN_C2R
+	int size;
+	int sign;		// FFTW_FORWARD or FFTW_BACKWARD for complex plans
+	int in_place;
+	int align_in;		// SIMD alignment of the arrays
+	int align_out;
+} * PlanCache;
+static int plan_cache_count;
+static int plan_cache_size;
+static int plan_wisdom_changed;			// New plans were made since the wisdom was saved
+static char plan_wisdom_path[QUISK_PATH_SIZE];	// Path to the FFTW wisdom file, or empty
+#ifdef QUISK_RX_THREADS
+static pthread_mutex_t plan_cache_mutex = PTHREAD_MUTEX_INITIALIZER;
+#endif
+
+static fftw_plan PlanCacheGet(int kind, int size, int sign, void * in, void * out)
+{	// Return a plan from the cache, or make a new plan.
+	int i, align_in, align_out, in_place;
+	struct plan_cache_entry * entry;
+	fftw_plan plan;
+
+	in_place = in == out;
+	align_in = fftw_alignment_of((double *)in);
+	align_out = fftw_alignment_of((double *)out);
+#ifdef QUISK_RX_THREADS
+	pthread_mutex_lock(&plan_cache_mutex);
+#endif
+	for (i = 0; i < plan_cache_count; i++) {
+		entry = PlanCache + i;
+		if (entry->kind == kind && entry->size == size && entry->sign == sign && entry->in_place == in_place &&
+				entry->align_in == align_in && entry->align_out == align_out) {
+#ifdef QUISK_RX_THREADS
+			pthread_mutex_unlock(&plan_cache_mutex);
+#endif
+			return entry->plan;
+		}
+	}
+	if (kind == PLAN_R2C)
+		plan = fftw_plan_dft_r2c_1d(size, (double *)in, (fftw_complex *)out, FFTW_MEASURE);
+	else if (kind == PLAN_C2R)
+		plan = fftw_plan_dft_c2r_1d(size, (fftw_complex *)in, (double *)out, FFTW_MEASURE);
+	else
+		plan = fftw_plan_dft_1d(size, (fftw_complex *)in, (fftw_complex *)out, sign, FFTW_MEASURE);
+	plan_wisdom_changed = 1;
+	if (plan_cache_count >= plan_cache_size) {	// Plans are never destroyed, so every plan must stay in the cache
+		i = plan_cache_size ? plan_cache_size * 2 : PLAN_CACHE_SIZE;
+		entry = (struct plan_cache_entry *)realloc(PlanCache, i * sizeof(struct plan_cache_entry));
+		if (entry) {
+			PlanCache = entry;
+			plan_cache_size = i;
+		}
+	}
+	if (plan_cache_count < plan_cache_size) {
+		entry = PlanCache + plan_cache_count++;
+		entry->plan = plan;
+		entry->kind = kind;
+		entry->size = size;
+		entry->sign = sign;
+		entry->in_place = in_place;
+		entry->align_in = align_in;
+		entry->align_out = align_out;
+	}
+	else {
+		printf("Failure to enlarge the FFTW plan cache\n");
+	}
+#ifdef QUISK_RX_THREADS
+	pthread_mutex_unlock(&plan_cache_mutex);
+#endif
+	return plan;
+}
+
+fftw_plan quisk_plan_dft(int size, fftw_complex * in, fftw_complex * out, int sign)
+{	// Return a complex plan.  Execute it with fftw_execute_dft().
+	return PlanCacheGet(PLAN_COMPLEX, size, sign, in, out);
+}
+
+fftw_plan quisk_plan_r2c(int size, double * in, fftw_complex * out)
+{	// Return a real to complex plan.  Execute it with fftw_execute_dft_r2c().
+	return PlanCacheGet(PLAN_R2C, size, 0, in, out);
+}
+
+fftw_plan quisk_plan_c2r(int size, fftw_complex * in, double * out)
+{	// Return a complex to real plan.  Execute it with fftw_execute_dft_c2r().
+	return PlanCacheGet(PLAN_C2R, size, 0, in, out);
+}
+
+static void PlanWisdomLoad(const char * path)
+{	// Remember the wisdom file path, and load the wisdom if the file exists.
+	FILE * fp;
+
+	strncpy(plan_wisdom_path, path, QUISK_PATH_SIZE);
+	plan_wisdom_path[QUISK_PATH_SIZE - 1] = 0;
+	if ( ! plan_wisdom_path[0])
+		return;
+	fp = fopen(plan_wisdom_path, "r");
+	if ( ! fp)
+		return;
+	fclose(fp);
+#ifdef QUISK_RX_THREADS
+	pthread_mutex_lock(&plan_cache_mutex);
+#endif
+	if ( ! fftw_import_wisdom_from_filename(plan_wisdom_path))
+		printf("Failure to read the FFTW wisdom file %s\n", plan_wisdom_path);
+#ifdef QUISK_RX_THREADS
+	pthread_mutex_unlock(&plan_cache_mutex);
+#endif
+}
+
+static void PlanWisdomSave(void)
+{	// Save the wisdom if there are new plans.
+#ifdef QUISK_RX_THREADS
+	pthread_mutex_lock(&plan_cache_mutex);
+#endif
+	if (plan_wisdom_path[0] && plan_wisdom_changed) {
+		if (fftw_export_wisdom_to_filename(plan_wisdom_path))
+			plan_wisdom_changed = 0;
+		else
+			printf("Failure to write the FFTW wisdom file %s\n", plan_wisdom_path);
+	}
+#ifdef QUISK_RX_THREADS
+	pthread_mutex_unlock(&plan_cache_mutex);
+#endif
+}
+
 // These are used for playback of a WAV file.
 static int wavStart;			// Sound data starts at this offset
 // Two wavFp are needed because the same file is used twice on asynchronous streams.
@@ -567,16 +757,35 @@ static int fFracDecim(double * dSamples, int nSamples, double fdecim)
 	return nout;
 }
 #endif
-static int cFracDecim(complex double * cSamples, int nSamples, double fdecim)
+static int cFracDecim(complex double * cSamples, int nSamples, double fdecim, int bank)
 {
 // Fractional decimation of I/Q signals works poorly because it introduces aliases and birdies.
+// Each bank has its own state.  If cSamples is NULL, reset the state for bank.
 	int i, nout;
 	double xm0, xm1, xm2, xm3;
-	static double dindex = 1;
-	static complex double c0=0, c1=0, c2=0, c3=0;
-	static int in=0, out=0;
-
-	in += nSamples;
+	static struct {
+		double dindex;
+		complex double c0, c1, c2, c3;
+	} State[MAX_RX_CHANNELS];
+	static int is_init = 0;
+	double dindex;
+	complex double c0, c1, c2, c3;
+
+	if ( ! is_init) {
+		is_init = 1;
+		for (i = 0; i < MAX_RX_CHANNELS; i++)
+			State[i].dindex = 1;
+	}
+	if ( ! cSamples) {
+		State[bank].dindex = 1;
+		State[bank].c0 = State[bank].c1 = State[bank].c2 = State[bank].c3 = 0;
+		return nSamples;
+	}
+	dindex = State[bank].dindex;
+	c0 = State[bank].c0;
+	c1 = State[bank].c1;
+	c2 = State[bank].c2;
+	c3 = State[bank].c3;
 	nout = 0;
 	for (i = 0; i < nSamples; i++) {
 		c3 = cSamples[i];
@@ -594,7 +803,6 @@ static int cFracDecim(complex double * cSamples, int nSamples, double fdecim)
 					(xm1 * xm2 * xm3 * c0 / -6.0 + xm0 * xm2 * xm3 * c1 / 2.0 +
 					xm0 * xm1 * xm3 * c2 / -2.0 + xm0 * xm1 * xm2 * c3 / 6.0);
 #endif
-			out++;
 			dindex += fdecim - 1;
 			c0 = c1;
 			c1 = c2;
@@ -608,7 +816,11 @@ static int cFracDecim(complex double * cSamples, int nSamples, double fdecim)
 			dindex -= 1;
 		}
 	}
-	//printf ("in %d out %d\n", in, out);
+	State[bank].dindex = dindex;
+	State[bank].c0 = c0;
+	State[bank].c1 = c1;
+	State[bank].c2 = c2;
+	State[bank].c3 = c3;
 	return nout;
 }
 
@@ -750,10 +962,10 @@ static void dAutoNotch(double * dsamples, int nSamples, int sidetone, int rate)
 #endif
 
 	if ( ! planFwd) {		// set up FFT plans
-		planFwd = fftw_plan_dft_r2c_1d(NOTCH_DATA_SIZE, data_in, notch_fft, FFTW_MEASURE);
-		planRev = fftw_plan_dft_c2r_1d(NOTCH_DATA_SIZE, notch_fft, data_out, FFTW_MEASURE);		// destroys notch_fft
-		fltrFwd = fftw_plan_dft_r2c_1d(NOTCH_DATA_SIZE, fltr_in, fltr_fft, FFTW_MEASURE);
-		fltrRev = fftw_plan_dft_c2r_1d(NOTCH_FILTER_DESIGN_SIZE, fltr_fft, fltr_out, FFTW_MEASURE);
+		planFwd = quisk_plan_r2c(NOTCH_DATA_SIZE, data_in, notch_fft);
+		planRev = quisk_plan_c2r(NOTCH_DATA_SIZE, notch_fft, data_out);		// destroys notch_fft
+		fltrFwd = quisk_plan_r2c(NOTCH_DATA_SIZE, fltr_in, fltr_fft);
+		fltrRev = quisk_plan_c2r(NOTCH_FILTER_DESIGN_SIZE, fltr_fft, fltr_out);
 		for (i = 0; i < NOTCH_FILTER_SIZE; i++)
 			fft_window[i] = 0.50 - 0.50 * cos(2. * M_PI * i / (NOTCH_FILTER_SIZE));	// Hanning
 			//fft_window[i] = 0.54 - 0.46 * cos(2. * M_PI * i / (NOTCH_FILTER_SIZE));	// Hamming
@@ -777,7 +989,7 @@ static void dAutoNotch(double * dsamples, int nSamples, int sidetone, int rate)
 		dsamples[inp] = data_out[index];
 		if (++index >= NOTCH_DATA_SIZE) {	// we have a full FFT of samples
 			index = NOTCH_DATA_START_SIZE;
-			fftw_execute(planFwd);		// Calculate forward FFT
+			fftw_execute_dft_r2c(planFwd, data_in, notch_fft);		// Calculate forward FFT
 			// Find maximum FFT bins
 			delta_sig = (300 * 2 * NOTCH_FFT_SIZE + rate / 2) / rate;	// small frequency interval
 			delta_i1 = (400 * 2 * NOTCH_FFT_SIZE + rate / 2) / rate;	// small frequency interval
@@ -873,7 +1085,7 @@ static void dAutoNotch(double * dsamples, int nSamples, int sidetone, int rate)
 							fltr_fft[j] = 0.0;
 					}
 				}
-				fftw_execute(fltrRev);
+				fftw_execute_dft_c2r(fltrRev, fltr_fft, fltr_out);
 				// center the coefficient zero, make the filter symetric, reduce the size by one
 				memmove(fltr_out + NOTCH_FILTER_DESIGN_SIZE / 2 - 1, fltr_out, sizeof(double) * (NOTCH_FILTER_SIZE / 2 - 1));
 				for (i = NOTCH_FILTER_DESIGN_SIZE / 2 - 2, j = NOTCH_FILTER_DESIGN_SIZE / 2; i >= 0; i--, j++)
@@ -882,14 +1094,14 @@ static void dAutoNotch(double * dsamples, int nSamples, int sidetone, int rate)
 					fltr_in[i] = fltr_out[i] * fft_window[i] / NOTCH_FILTER_DESIGN_SIZE;
 				for (i = NOTCH_FILTER_SIZE; i < NOTCH_DATA_SIZE; i++)
 					fltr_in[i] = 0.0;
-				fftw_execute(fltrFwd);		// The filter is fltr_fft[]
+				fftw_execute_dft_r2c(fltrFwd, fltr_in, fltr_fft);		// The filter is fltr_fft[]
 			}
 #if NOTCH_DEBUG
 			printf("Max %12.0lf  frequency index1 %3d %5d %12.0lf  index2 %3d %5d %12.0lf  avg %12.0lf  %s\n", dmax, count1, i1, d1, count2, i2, d2, avg, txt);
 #endif
 			for (i = 0; i < NOTCH_FFT_SIZE; i++)	// Apply the filter
 				notch_fft[i] *= fltr_fft[i];
-			fftw_execute(planRev);		// Calculate inverse FFT
+			fftw_execute_dft_c2r(planRev, notch_fft, data_out);		// Calculate inverse FFT
 			memmove(data_in, data_in + NOTCH_DATA_OUTPUT_SIZE, NOTCH_DATA_START_SIZE * sizeof(double));
 			for (i = NOTCH_DATA_START_SIZE; i < NOTCH_DATA_SIZE; i++)
 				data_out[i] /= NOTCH_DATA_SIZE / 20;	// Empirical
@@ -903,14 +1115,17 @@ static double * audio_average_fft;
 void quisk_calc_audio_graph(double scale, complex double * csamples, double * dsamples, int nSamples, int real)
 { // Calculate an FFT for the audio data. Samples are either csamples or dsamples; the other is NULL.
   // The "scale" is the 0 dB reference. If "real", use the real part of csamples.
-	int i, k, inp;
+  // Real samples use a real FFT, and the negative frequencies are the mirror image of the positive frequencies.
+	int i, k, inp, is_real;
 	static int index;
 	static int count_fft;
 	static int audio_fft_size;
 	static int audio_fft_count;
 	static fftw_plan plan = NULL;
+	static fftw_plan plan_real;
 	static double * fft_window;
 	static complex double * audio_fft;
+	static double * audio_real;
 
 	if ( ! plan) {		// malloc new space and initialize
 		index = 0;
@@ -923,7 +1138,9 @@ void quisk_calc_audio_graph(double scale, complex double * csamples, double * ds
 		fft_window = (double *)malloc(audio_fft_size * sizeof(double));
 		audio_average_fft = (double *)malloc(audio_fft_size * sizeof(double));
 		audio_fft = (complex double *)malloc(audio_fft_size * sizeof(complex double));
-		plan = fftw_plan_dft_1d(audio_fft_size, audio_fft, audio_fft, FFTW_FORWARD, FFTW_MEASURE);
+		audio_real = (double *)malloc(audio_fft_size * sizeof(double));
+		plan = quisk_plan_dft(audio_fft_size, audio_fft, audio_fft, FFTW_FORWARD);
+		plan_real = quisk_plan_r2c(audio_fft_size, audio_real, audio_fft);
 		for (i = 0; i < audio_fft_size; i++) {
 			audio_average_fft[i] = 0;
 			fft_window[i] = 0.50 - 0.50 * cos(2. * M_PI * i / audio_fft_size);	// Hanning window loss 50%
@@ -931,7 +1148,8 @@ void quisk_calc_audio_graph(double scale, complex double * csamples, double * ds
 		return;
 	}
 	if (audio_fft_ready == 0) {	// calculate a new audio FFT
-		if (dsamples || real)	// Lyons 2Ed p61
+		is_real = dsamples || real;
+		if (is_real)	// Lyons 2Ed p61
 			scale *= audio_fft_size / 2.0;
 		else
 			scale *= audio_fft_size;
@@ -939,20 +1157,29 @@ void quisk_calc_audio_graph(double scale, complex double * csamples, double * ds
 		scale *= 0.5;	// correct for Hanning window loss
 		for (inp = 0; inp < nSamples; inp++) {
 			if (dsamples)
-				audio_fft[index] = dsamples[inp] / scale;
+				audio_real[index] = dsamples[inp] / scale;
 			else if (real)
-				audio_fft[index] = creal(csamples[inp]) / scale;
+				audio_real[index] = creal(csamples[inp]) / scale;
 			else
 				audio_fft[index] = csamples[inp] / scale;
 			if (++index >= audio_fft_size) {	// we have a full FFT of samples
 				index = 0;
-				for (i = 0; i < audio_fft_size; i++)
-					audio_fft[i] *= fft_window[i];	// multiply by window
-				fftw_execute(plan);		// Calculate forward FFT
 				count_fft++;
 				k = 0;
-				for (i = audio_fft_size / 2; i < audio_fft_size; i++)		// Negative frequencies
-					audio_average_fft[k++] += cabs(audio_fft[i]);
+				if (is_real) {
+					for (i = 0; i < audio_fft_size; i++)
+						audio_real[i] *= fft_window[i];	// multiply by window
+					fftw_execute_dft_r2c(plan_real, audio_real, audio_fft);		// Calculate forward FFT of the positive frequencies
+					for (i = audio_fft_size / 2; i < audio_fft_size; i++)		// Negative frequencies
+						audio_average_fft[k++] += cabs(audio_fft[audio_fft_size - i]);
+				}
+				else {
+					for (i = 0; i < audio_fft_size; i++)
+						audio_fft[i] *= fft_window[i];	// multiply by window
+					fftw_execute_dft(plan, audio_fft, audio_fft);		// Calculate forward FFT
+					for (i = audio_fft_size / 2; i < audio_fft_size; i++)		// Negative frequencies
+						audio_average_fft[k++] += cabs(audio_fft[i]);
+				}
 				for (i = 0; i < audio_fft_size / 2; i++)			// Positive frequencies
 					audio_average_fft[k++] += cabs(audio_fft[i]);
 				if (count_fft >= audio_fft_count) {
@@ -1000,9 +1227,6 @@ static void d_delay(double * dsamples, int nSamples, int bank, int samp_delay)
 		int buf_size;
 	} delay[MAX_RX_CHANNELS] = {{NULL, 0, 0}};
 
-	if ( ! delay[0].buffer)
-		for (i = 1; i < MAX_RX_CHANNELS; i++)
-			delay[i].buffer = NULL;
 	if ( ! delay[bank].buffer) {
 		delay[bank].buffer = (double *)malloc(samp_delay * sizeof(double));
 		delay[bank].index = 0;
@@ -1024,9 +1248,9 @@ static void ssb_squelch(double * dsamples, int nSamples, int samp_rate, struct _
 	int i, bw, bw1, bw2, inp;
 	double d, arith_avg, geom_avg, ratio;
 	complex double c;
+	complex double * out_fft;
 	static fftw_plan plan = NULL;
 	static double * fft_window;
-	static complex double * out_fft;
 #ifdef QUISK_PRINT_LEVELS
 	static int timer = 0;
 	timer += nSamples;
@@ -1034,18 +1258,22 @@ static void ssb_squelch(double * dsamples, int nSamples, int samp_rate, struct _
 
 	if ( ! MS->in_fft) {
 		MS->in_fft = (double *)fftw_malloc(SQUELCH_FFT_SIZE * sizeof(double));
+		// out_fft[0] is DC, then positive frequencies, then out_fft[N/2] is Nyquist.
+		MS->out_fft = (complex double *)fftw_malloc((SQUELCH_FFT_SIZE / 2 + 1) * sizeof(complex double));
 		MS->index = 0;
 		MS->sq_open = 0;
 	}
+	out_fft = MS->out_fft;
+	rx_plan_lock();		// The plan is shared by all banks
 	if ( ! plan) {		// malloc new space and initialize
 		fft_window = (double *)malloc(SQUELCH_FFT_SIZE * sizeof(double));
-		out_fft = (complex double *)fftw_malloc((SQUELCH_FFT_SIZE / 2 + 1) * sizeof(complex double));
-		// out_fft[0] is DC, then positive frequencies, then out_fft[N/2] is Nyquist.
-		plan = fftw_plan_dft_r2c_1d(SQUELCH_FFT_SIZE, MS->in_fft, out_fft, FFTW_MEASURE);
+		plan = quisk_plan_r2c(SQUELCH_FFT_SIZE, MS->in_fft, out_fft);
 		for (i = 0; i < SQUELCH_FFT_SIZE; i++)
 			fft_window[i] = 0.50 - 0.50 * cos(2. * M_PI * i / SQUELCH_FFT_SIZE);	// Hanning window
+		rx_plan_unlock();
 		return;
 	}
+	rx_plan_unlock();
 	for (inp = 0; inp < nSamples; inp++) {
 		MS->in_fft[MS->index++] = dsamples[inp];
 		if (MS->index >= SQUELCH_FFT_SIZE) {	// we have a full FFT of samples
@@ -1120,20 +1348,13 @@ static complex double dRxFilterOut(complex double sample, int bank, int nFilter)
 	// Multiple filters are at nFilter.
 	complex double cx;
 	int j, k;
-	static int init = 0;
 	static struct stStorage {
 		int indexFilter;						// current index into sample buffer
 		complex double bufFilterC[MAX_FILTER_SIZE];	// Digital filter sample buffer
-	} Storage[MAX_RX_CHANNELS];
+	} Storage[MAX_RX_CHANNELS];		// static storage is zero
 	struct stStorage * ptBuf = Storage + bank;
 	double * filtI;
 
-	if ( ! init) {
-		init = 1;
-		for (j = 0; j < MAX_RX_CHANNELS; j++)
-			memset(Storage + j, 0, sizeof(struct stStorage));
-	}
-
 	if ( ! sizeFilter)
 		return sample;
 	if (ptBuf->indexFilter >= sizeFilter)
@@ -1157,20 +1378,13 @@ complex double cRxFilterOut(complex double sample, int bank, int nFilter)
 	double accI, accQ;
 	double * filtI, * filtQ;
 	int j, k;
-	static int init = 0;
 	static struct stStorage {
 		int indexFilter;						// current index into sample buffer
 		double bufFilterI[MAX_FILTER_SIZE];		// Digital filter sample buffer
 		double bufFilterQ[MAX_FILTER_SIZE];		// Digital filter sample buffer
-	} Storage[MAX_RX_CHANNELS];
+	} Storage[MAX_RX_CHANNELS];		// static storage is zero
 	struct stStorage * ptBuf = Storage + bank;
 
-	if ( ! init) {
-		init = 1;
-		for (j = 0; j < MAX_RX_CHANNELS; j++)
-			memset(Storage + j, 0, sizeof(struct stStorage));
-	}
-
 	if ( ! sizeFilter)
 		return sample;
 	if (ptBuf->indexFilter >= sizeFilter)
@@ -1191,6 +1405,68 @@ complex double cRxFilterOut(complex double sample, int bank, int nFilter)
 	return accI + I * accQ;
 }
 
+static void RxFilterBlock(complex double * cSamples, int nSamples, int bank, int nFilter, int is_iq)
+{	// Rx FIR filter for a block of samples in place.  If is_iq, filter like cRxFilterOut(), else like dRxFilterOut().
+	// Long filters use FFT convolution and have an additional delay of one FFT block.
+	int i, size;
+	double * coefI, * coefQ;
+	static struct stFast {
+		struct quisk_cFastFilter filter;
+		int nFilter;
+		int is_iq;
+		int generation;
+		double rotI[MAX_FILTER_SIZE];
+		double rotQ[MAX_FILTER_SIZE];
+	} Fast[MAX_RX_CHANNELS];	// static storage is zero
+	struct stFast * ptFast = Fast + bank;
+
+	size = sizeFilter;
+	if ( ! cSamples) {	// Clear the sample history of this bank
+		for (i = 0; i < size; i++) {
+			cRxFilterOut(0, bank, nFilter);
+			dRxFilterOut(0, bank, nFilter);
+		}
+		rx_plan_lock();
+		quisk_cFastFilterFree(&ptFast->filter);
+		rx_plan_unlock();
+		return;
+	}
+	if ( ! size)
+		return;
+	if ( ! fast_filter_taps || size < fast_filter_taps) {
+		if (is_iq)
+			for (i = 0; i < nSamples; i++)
+				cSamples[i] = cRxFilterOut(cSamples[i], bank, nFilter);
+		else
+			for (i = 0; i < nSamples; i++)
+				cSamples[i] = dRxFilterOut(cSamples[i], bank, nFilter);
+		return;
+	}
+	if (ptFast->filter.nTaps != size || ptFast->is_iq != is_iq) {	// new filter size or type
+		rx_plan_lock();
+		quisk_cFastFilterFree(&ptFast->filter);
+		quisk_cFastFilterInit(&ptFast->filter, size, is_iq);
+		rx_plan_unlock();
+		ptFast->is_iq = is_iq;
+		ptFast->generation = filter_generation[nFilter] - 1;
+	}
+	if (ptFast->nFilter != nFilter || ptFast->generation != filter_generation[nFilter]) {	// new coefficients
+		ptFast->nFilter = nFilter;
+		ptFast->generation = filter_generation[nFilter];
+		// The circular buffer in cRxFilterOut() applies coefficient k to the sample delayed by (size - k) % size.
+		coefI = cFilterI[nFilter];
+		coefQ = cFilterQ[nFilter];
+		ptFast->rotI[0] = coefI[0];
+		ptFast->rotQ[0] = coefQ[0];
+		for (i = 1; i < size; i++) {
+			ptFast->rotI[i] = coefI[size - i];
+			ptFast->rotQ[i] = coefQ[size - i];
+		}
+		quisk_cFastFilterCoefs(&ptFast->filter, ptFast->rotI, ptFast->rotQ);
+	}
+	quisk_cFastFilter(cSamples, nSamples, &ptFast->filter);
+}
+
 static void AddTestTone(complex double * cSamples, int nSamples)
 {
 	int i;
@@ -1506,16 +1782,16 @@ void quisk_file_microphone(complex double * cSamples, int nSamples)
 	}
 }
 
-int PlanDecimation(int * pt2, int * pt3, int * pt5)	// search for a suitable decimation scheme
+int PlanDecimation(int rate, int * pt2, int * pt3, int * pt5)	// search for a suitable decimation scheme for rate
 {
 	int i, best, try, i2, i3, i5, decim2, decim3, decim5;
 
-	best = quisk_sound_state.sample_rate;
+	best = rate;
 	decim2 = decim3 = decim5 = 0;
 	for (i2 = 0; i2 <= 6; i2++) {		// limit to number of /2 filters, currently 6
 		for (i3 = 0; i3 <= 3; i3++) {		// limit to number of /3 filters, currently 3
 			for (i5 = 0; i5 <= 3; i5++) {		// limit to number of /5 filters, currently 3
-				try = quisk_sound_state.sample_rate;
+				try = rate;
 				for (i = 0; i < i2; i++)
 					try /= 2;
 				for (i = 0; i < i3; i++)
@@ -1535,7 +1811,7 @@ int PlanDecimation(int * pt2, int * pt3, int * pt5)	// search for a suitable dec
 		best = best * 24 / 25;
 	if (DEBUG)
 		printf ("Plan Decimation: rate %i, best %i, decim2 %i, decim3 %i, decim5 %i\n",
-			quisk_sound_state.sample_rate, best, decim2, decim3, decim5);
+			rate, best, decim2, decim3, decim5);
 	if (best > 72000)
 		printf("Failure to plan a suitable decimation in quisk_process_decimate\n");
 	if (pt2) {	// return decimations
@@ -1548,10 +1824,10 @@ int PlanDecimation(int * pt2, int * pt3, int * pt5)	// search for a suitable dec
 
 static int quisk_process_decimate(complex double * cSamples, int nSamples, int bank, rx_mode_type rx_mode)
 {	// Changes here will require changes to get_filter_rate();
-	int i, i2, i3, i5;
-	static int decim2, decim3, decim5;
-	static int old_rate = 0;
+	int i, i2, i3, i5, srate;
 	static struct stStorage {
+		int plan_rate;		// each bank plans its own decimation, so banks on worker threads share nothing
+		int decim2, decim3, decim5;
 		struct quisk_cHB45Filter HalfBand1;
 		struct quisk_cHB45Filter HalfBand2;
 		struct quisk_cHB45Filter HalfBand3;
@@ -1573,13 +1849,15 @@ static int quisk_process_decimate(complex double * cSamples, int nSamples, int b
 		struct quisk_cFilter filt300D5;
 	} Storage[MAX_RX_CHANNELS] ;
 
-	if ( ! cSamples) {	// Initialize all filters
+	if ( ! cSamples) {	// Initialize all filters; or if nSamples is not zero, only the filters for bank
 		for (i = 0; i < MAX_RX_CHANNELS; i++) {
-			memset(&Storage[i].HalfBand1, 0, sizeof(struct quisk_cHB45Filter));
-			memset(&Storage[i].HalfBand2, 0, sizeof(struct quisk_cHB45Filter));
-			memset(&Storage[i].HalfBand3, 0, sizeof(struct quisk_cHB45Filter));
-			memset(&Storage[i].HalfBand4, 0, sizeof(struct quisk_cHB45Filter));
-			memset(&Storage[i].HalfBand5, 0, sizeof(struct quisk_cHB45Filter));
+			if (nSamples && i != bank)
+				continue;
+			quisk_cHB45Reset(&Storage[i].HalfBand1);
+			quisk_cHB45Reset(&Storage[i].HalfBand2);
+			quisk_cHB45Reset(&Storage[i].HalfBand3);
+			quisk_cHB45Reset(&Storage[i].HalfBand4);
+			quisk_cHB45Reset(&Storage[i].HalfBand5);
 			quisk_filt_cInit(&Storage[i].filtSdriq111, quiskFilt111D2Coefs, sizeof(quiskFilt111D2Coefs)/sizeof(double));
 			quisk_filt_cInit(&Storage[i].filtSdriq53, quiskFilt53D1Coefs, sizeof(quiskFilt53D1Coefs)/sizeof(double));
 			quisk_filt_cInit(&Storage[i].filtSdriq133, quiskFilt133D2Coefs, sizeof(quiskFilt133D2Coefs)/sizeof(double));
@@ -1597,133 +1875,134 @@ static int quisk_process_decimate(complex double * cSamples, int nSamples, int b
 		}
 		return 0;
 	}
-	if (quisk_sound_state.sample_rate != old_rate) {
-		old_rate = quisk_sound_state.sample_rate;
-		PlanDecimation(&decim2, &decim3, &decim5);
+	if (quisk_sound_state.sample_rate != Storage[bank].plan_rate) {
+		Storage[bank].plan_rate = quisk_sound_state.sample_rate;
+		PlanDecimation(Storage[bank].plan_rate, &Storage[bank].decim2, &Storage[bank].decim3, &Storage[bank].decim5);
 	}
 	// Decimate: Lower the sample rate to 48000 sps (or approx).  Filters are designed for
 	// a pass bandwidth of 20 kHz and a stop bandwidth of 24 kHz.
 	// We use 48 ksps to accommodate wide digital modes.
 	switch((quisk_sound_state.sample_rate + 100) / 1000) {
 	case 41:
-		quisk_decim_srate = 48000;
+		srate = 48000;
 		break;
 	case 53:	// SDR-IQ
-		quisk_decim_srate = quisk_sound_state.sample_rate;
+		srate = quisk_sound_state.sample_rate;
 		nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtSdriq53, 1);
 		break;
 	case 111:	// SDR-IQ
-		quisk_decim_srate = quisk_sound_state.sample_rate / 2;
+		srate = quisk_sound_state.sample_rate / 2;
 		nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtSdriq111, 2);
 		break;
 	case 133:	// SDR-IQ
-		quisk_decim_srate = quisk_sound_state.sample_rate / 2;
+		srate = quisk_sound_state.sample_rate / 2;
 		nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtSdriq133, 2);
 		break;
 	case 185:	// SDR-IQ
-		quisk_decim_srate = quisk_sound_state.sample_rate / 3;
+		srate = quisk_sound_state.sample_rate / 3;
 		nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtSdriq185, 3);
 		break;
 	case 370:
-		quisk_decim_srate = quisk_sound_state.sample_rate / 6;
+		srate = quisk_sound_state.sample_rate / 6;
 		nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand2);
 		nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtSdriq185, 3);
 		break;
 	case 740:
-		quisk_decim_srate = quisk_sound_state.sample_rate / 12;
+		srate = quisk_sound_state.sample_rate / 12;
 		nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand2);
 		nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand3);
 		nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtSdriq185, 3);
 		break;
 	case 1333:
-		quisk_decim_srate = quisk_sound_state.sample_rate / 24;
+		srate = quisk_sound_state.sample_rate / 24;
 		nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand1);
 		nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand2);
 		nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand3);
 		nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtSdriq167, 3);
 		break;
 	default:
-		quisk_decim_srate = quisk_sound_state.sample_rate;
-		i2 = decim2;	// decimate by 2 except for the final /2 filter
+		srate = quisk_sound_state.sample_rate;
+		i2 = Storage[bank].decim2;	// decimate by 2 except for the final /2 filter
 		if (i2 > 1) {
 			nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand1);
-			quisk_decim_srate /= 2;
+			srate /= 2;
 			i2--;
 		}
 		if (i2 > 1) {
 			nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand2);
-			quisk_decim_srate /= 2;
+			srate /= 2;
 			i2--;
 		}
 		if (i2 > 1) {
 			nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand3);
-			quisk_decim_srate /= 2;
+			srate /= 2;
 			i2--;
 		}
 		if (i2 > 1) {
 			nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand4);
-			quisk_decim_srate /= 2;
+			srate /= 2;
 			i2--;
 		}
 		if (i2 > 1) {
 			nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand5);
-			quisk_decim_srate /= 2;
+			srate /= 2;
 			i2--;
 		}
-		i3 = decim3;	// decimate by 3
+		i3 = Storage[bank].decim3;	// decimate by 3
 		if (i3 > 0) {
 			nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtDecim3, 3);
-			quisk_decim_srate /= 3;
+			srate /= 3;
 			i3--;
 		}
 		if (i3 > 0) {
 			nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtDecim3B, 3);
-			quisk_decim_srate /= 3;
+			srate /= 3;
 			i3--;
 		}
 		if (i3 > 0) {
 			nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtDecim3C, 3);
-			quisk_decim_srate /= 3;
+			srate /= 3;
 			i3--;
 		}
-		i5 = decim5;	// decimate by 5
+		i5 = Storage[bank].decim5;	// decimate by 5
 		if (i5 > 0) {
 			nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtDecim5, 5);
-			quisk_decim_srate /= 5;
+			srate /= 5;
 			i5--;
 		}
 		if (i5 > 0) {
 			nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtDecim5B, 5);
-			quisk_decim_srate /= 5;
+			srate /= 5;
 			i5--;
 		}
 		if (i5 > 0) {
 			nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtDecim5S, 5);
-			quisk_decim_srate /= 5;
+			srate /= 5;
 			i5--;
 		}
 		if (i2 > 0) {	// decimate by 2 last - Unnecessary???
 			nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtDecim48to24, 2);
-			quisk_decim_srate /= 2;
+			srate /= 2;
 			i2--;
 		}
-		if (quisk_decim_srate >= 50000) {
-			quisk_decim_srate = quisk_decim_srate * 24 / 25;
+		if (srate >= 50000) {
+			srate = srate * 24 / 25;
 			nSamples = quisk_cInterpDecim(cSamples, nSamples, &Storage[bank].filt300D5, 6, 5);	// 60 kSps
 			nSamples = quisk_cInterpDecim(cSamples, nSamples, &Storage[bank].filtDecim5S, 4, 5);	// 48 kSps
 		}
 		if (i2 != 0 || i3 != 0 || i5 != 0)
 			printf ("Failure in quisk.c in integer decimation for rate %d\n", quisk_sound_state.sample_rate);
-		if (DEBUG && quisk_decim_srate != 48000)
-			printf("Failure to achieve rate 48000. Rate is %i\n", quisk_decim_srate);
+		if (DEBUG && srate != 48000)
+			printf("Failure to achieve rate 48000. Rate is %i\n", srate);
 		break;
 	}
+	DecimSrate[bank] = srate;	// Each bank writes only its own rate
 	return nSamples;
 }
 
 static int quisk_process_demodulate(complex double * cSamples, double * dsamples, int nSamples, int bank, int nFilter, rx_mode_type rx_mode)
 {	// Changes here will require changes to get_filter_rate();
-	int i;
+	int i, filter_srate;
 	complex double cx, cpx;
 	double d, di, dd;
 	static struct AgcState Agc1 = {0.3, 16000, 0}, Agc2 = {0.3, 16000, 0};
@@ -1746,12 +2025,14 @@ static int quisk_process_demodulate(complex double * cSamples, double * dsamples
 		struct quisk_cFilter filtDecim48to16;
 	} Storage[MAX_RX_CHANNELS] ;
 
-	if ( ! cSamples) {	// Initialize all filters
+	if ( ! cSamples) {	// Initialize all filters; or if nSamples is not zero, only the filters for bank
 		for (i = 0; i < MAX_RX_CHANNELS; i++) {
-			memset(&Storage[i].HalfBand4, 0, sizeof(struct quisk_cHB45Filter));
-			memset(&Storage[i].HalfBand5, 0, sizeof(struct quisk_cHB45Filter));
-			memset(&Storage[i].HalfBand6, 0, sizeof(struct quisk_dHB45Filter));
-			memset(&Storage[i].HalfBand7, 0, sizeof(struct quisk_dHB45Filter));
+			if (nSamples && i != bank)
+				continue;
+			quisk_cHB45Reset(&Storage[i].HalfBand4);
+			quisk_cHB45Reset(&Storage[i].HalfBand5);
+			quisk_dHB45Reset(&Storage[i].HalfBand6);
+			quisk_dHB45Reset(&Storage[i].HalfBand7);
 			quisk_filt_dInit(&Storage[i].filtAudio24p3, quiskAudio24p3Coefs, sizeof(quiskAudio24p3Coefs)/sizeof(double));
 			quisk_filt_dInit(&Storage[i].filtAudio24p4, quiskAudio24p4Coefs, sizeof(quiskAudio24p4Coefs)/sizeof(double));
 			quisk_filt_dInit(&Storage[i].filtAudio12p2, quiskAudio24p4Coefs, sizeof(quiskAudio24p4Coefs)/sizeof(double));
@@ -1773,16 +2054,17 @@ static int quisk_process_demodulate(complex double * cSamples, double * dsamples
 
 	//quisk_calc_audio_graph(pow(2, 31) - 1, cSamples, NULL, nSamples, 0);
 	// Filter and demodulate signal, copy capture buffer cSamples to play buffer dsamples.
-	// quisk_decim_srate is the sample rate after integer decimation.
+	// DecimSrate[bank] is the sample rate after integer decimation.
 	MeasureSquelch[bank].squelch_active = 0;
 	switch(rx_mode) {
 	case CWL:		// lower sideband CW at 6 ksps
-		quisk_filter_srate = quisk_decim_srate / 8;
+		filter_srate = DecimSrate[bank] / 8;
 		nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand5);
 		nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand4);
 		nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtDecim48to24, 2);
+		RxFilterBlock(cSamples, nSamples, bank, nFilter, 1);
 		for (i = 0; i < nSamples; i++) {
-			cx = cRxFilterOut(cSamples[i], bank, nFilter);
+			cx = cSamples[i];
 			dsamples[i] = dd = creal(cx) + cimag(cx);
 			if(bank == 0) {
 				measure_audio_sum += dd * dd;
@@ -1790,18 +2072,19 @@ static int quisk_process_demodulate(complex double * cSamples, double * dsamples
 			}
 		}
 		if(bank == 0)
-			dAutoNotch(dsamples, nSamples, rit_freq, quisk_filter_srate);
+			dAutoNotch(dsamples, nSamples, rit_freq, filter_srate);
 		nSamples = quisk_dInterpolate(dsamples, nSamples, &Storage[bank].filtAudio12p2, 2);
 		nSamples = quisk_dInterp2HB45(dsamples, nSamples, &Storage[bank].HalfBand6);
 		nSamples = quisk_dInterp2HB45(dsamples, nSamples, &Storage[bank].HalfBand7);
 		break;
 	case CWU:		// upper sideband CW at 6 ksps
-		quisk_filter_srate = quisk_decim_srate / 8;
+		filter_srate = DecimSrate[bank] / 8;
 		nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand5);
 		nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand4);
 		nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtDecim48to24, 2);
+		RxFilterBlock(cSamples, nSamples, bank, nFilter, 1);
 		for (i = 0; i < nSamples; i++) {
-			cx = cRxFilterOut(cSamples[i], bank, nFilter);
+			cx = cSamples[i];
 			dsamples[i] = dd = creal(cx) - cimag(cx);
 			if(bank == 0) {
 				measure_audio_sum += dd * dd;
@@ -1809,17 +2092,18 @@ static int quisk_process_demodulate(complex double * cSamples, double * dsamples
 			}
 		}
 		if(bank == 0)
-			dAutoNotch(dsamples, nSamples, rit_freq, quisk_filter_srate);
+			dAutoNotch(dsamples, nSamples, rit_freq, filter_srate);
 		nSamples = quisk_dInterpolate(dsamples, nSamples, &Storage[bank].filtAudio12p2, 2);
 		nSamples = quisk_dInterp2HB45(dsamples, nSamples, &Storage[bank].HalfBand6);
 		nSamples = quisk_dInterp2HB45(dsamples, nSamples, &Storage[bank].HalfBand7);
 		break;
 	case LSB:	// lower sideband SSB at 12 ksps
-		quisk_filter_srate = quisk_decim_srate / 4;
+		filter_srate = DecimSrate[bank] / 4;
 		nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand5);
 		nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtDecim48to24, 2);
+		RxFilterBlock(cSamples, nSamples, bank, nFilter, 1);
 		for (i = 0; i < nSamples; i++) {
-			cx = cRxFilterOut(cSamples[i], bank, nFilter);
+			cx = cSamples[i];
 			dsamples[i] = dd = creal(cx) + cimag(cx);
 			if(bank == 0) {
 				measure_audio_sum += dd * dd;
@@ -1827,23 +2111,25 @@ static int quisk_process_demodulate(complex double * cSamples, double * dsamples
 			}
 		}
 		if(bank == 0)
-			dAutoNotch(dsamples, nSamples, 0, quisk_filter_srate);
+			dAutoNotch(dsamples, nSamples, 0, filter_srate);
 		if (ssb_squelch_enabled) {
-			ssb_squelch(dsamples, nSamples, quisk_filter_srate, MeasureSquelch + bank);
+			ssb_squelch(dsamples, nSamples, filter_srate, MeasureSquelch + bank);
 			d_delay(dsamples, nSamples, bank, SQUELCH_FFT_SIZE);
 		}
-		quisk_calc_audio_graph(pow(2, 31) - 1, NULL, dsamples, nSamples, 1);
+		if (bank == 0)
+			quisk_calc_audio_graph(pow(2, 31) - 1, NULL, dsamples, nSamples, 1);
 		nSamples = quisk_dInterpolate(dsamples, nSamples, &Storage[bank].filtAudio24p4, 2);
 		nSamples = quisk_dInterp2HB45(dsamples, nSamples, &Storage[bank].HalfBand7);
 		//quisk_calc_audio_graph(pow(2, 31) - 1, NULL, dsamples, nSamples, 1);
 		break;
 	case USB:	 // upper sideband SSB at 12 ksps
 	default:
-		quisk_filter_srate = quisk_decim_srate / 4;
+		filter_srate = DecimSrate[bank] / 4;
 		nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand5);
 		nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtDecim48to24, 2);
+		RxFilterBlock(cSamples, nSamples, bank, nFilter, 1);
 		for (i = 0; i < nSamples; i++) {
-			cx = cRxFilterOut(cSamples[i], bank, nFilter);
+			cx = cSamples[i];
 			dsamples[i] = dd = creal(cx) - cimag(cx);
 			if(bank == 0) {
 				measure_audio_sum += dd * dd;
@@ -1851,9 +2137,9 @@ static int quisk_process_demodulate(complex double * cSamples, double * dsamples
 			}
 		}
 		if(bank == 0)
-			dAutoNotch(dsamples, nSamples, 0, quisk_filter_srate);
+			dAutoNotch(dsamples, nSamples, 0, filter_srate);
 		if (ssb_squelch_enabled) {
-			ssb_squelch(dsamples, nSamples, quisk_filter_srate, MeasureSquelch + bank);
+			ssb_squelch(dsamples, nSamples, filter_srate, MeasureSquelch + bank);
 			d_delay(dsamples, nSamples, bank, SQUELCH_FFT_SIZE);
 		}
 		nSamples = quisk_dInterpolate(dsamples, nSamples, &Storage[bank].filtAudio24p4, 2);
@@ -1861,10 +2147,11 @@ static int quisk_process_demodulate(complex double * cSamples, double * dsamples
 		//quisk_calc_audio_graph(pow(2, 31) - 1, NULL, dsamples, nSamples, 1);
 		break;
 	case AM:		// AM at 24 ksps
-		quisk_filter_srate = quisk_decim_srate / 2;
+		filter_srate = DecimSrate[bank] / 2;
 		nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtDecim48to24, 2);
+		RxFilterBlock(cSamples, nSamples, bank, nFilter, 0);
 		for (i = 0; i < nSamples; i++) {
-			cx = dRxFilterOut(cSamples[i], bank, nFilter);
+			cx = cSamples[i];
 			di = cabs(cx);
 			d = di + Storage[bank].dc_remove * 0.99;	// DC removal; R.G. Lyons page 553
 			di = d - Storage[bank].dc_remove;
@@ -1877,23 +2164,24 @@ static int quisk_process_demodulate(complex double * cSamples, double * dsamples
 		}
 		nSamples = quisk_dFilter(dsamples, nSamples, &Storage[bank].filtAudio24p6);
 		if(bank == 0)
-			dAutoNotch(dsamples, nSamples, 0, quisk_filter_srate);
+			dAutoNotch(dsamples, nSamples, 0, filter_srate);
 		if (ssb_squelch_enabled) {
-			ssb_squelch(dsamples, nSamples, quisk_filter_srate, MeasureSquelch + bank);
+			ssb_squelch(dsamples, nSamples, filter_srate, MeasureSquelch + bank);
 			d_delay(dsamples, nSamples, bank, SQUELCH_FFT_SIZE);
 		}
 		nSamples = quisk_dInterp2HB45(dsamples, nSamples, &Storage[bank].HalfBand7);
 		break;
 	case FM:		// FM at 48 ksps
 	case DGT_FM:
-		quisk_filter_srate = quisk_decim_srate;
+		filter_srate = DecimSrate[bank];
+		RxFilterBlock(cSamples, nSamples, bank, nFilter, 0);
 		for (i = 0; i < nSamples; i++) {
-			cx = dRxFilterOut(cSamples[i], bank, nFilter);
+			cx = cSamples[i];
 			MeasureSquelch[bank].rf_sum += cabs(cx);
 			MeasureSquelch[bank].rf_count += 1;
 			cpx = cx * conj(Storage[bank].fm_1);
 			Storage[bank].fm_1 = cx;
-			di = quisk_filter_srate * carg(cpx);
+			di = filter_srate * carg(cpx);
 			// FM de-emphasis
 			dsamples[i] = dd = Storage[bank].FM_y_1 = di * Storage[bank].FM_a_0 +
 				Storage[bank].FM_x_1 * Storage[bank].FM_a_1 - Storage[bank].FM_y_1 * Storage[bank].FM_b_1;
@@ -1907,7 +2195,7 @@ static int quisk_process_demodulate(complex double * cSamples, double * dsamples
 		nSamples = quisk_dFilter(dsamples, nSamples, &Storage[bank].filtAudioFmHp);
 		nSamples = quisk_dInterp2HB45(dsamples, nSamples, &Storage[bank].HalfBand6);
 		if(bank == 0)
-			dAutoNotch(dsamples, nSamples, 0, quisk_filter_srate);
+			dAutoNotch(dsamples, nSamples, 0, filter_srate);
 		if (MeasureSquelch[bank].rf_count >= 2400) {
 			MeasureSquelch[bank].squelch = MeasureSquelch[bank].rf_sum / MeasureSquelch[bank].rf_count / CLIP32;
 			if (MeasureSquelch[bank].squelch > 1.E-10)
@@ -1921,16 +2209,17 @@ static int quisk_process_demodulate(complex double * cSamples, double * dsamples
 		break;
 	case DGT_U:     // digital mode DGT-U at 48 ksps
 		if (filter_bandwidth[nFilter] < DGT_NARROW_FREQ) {	// filter at 6 ksps
-			quisk_filter_srate = quisk_decim_srate / 8;
+			filter_srate = DecimSrate[bank] / 8;
 			nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand5);
 			nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand4);
 			nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtDecim48to24, 2);
 		}
 		else {	// filter at 48 ksps
-			quisk_filter_srate = quisk_decim_srate;
+			filter_srate = DecimSrate[bank];
 		}
+		RxFilterBlock(cSamples, nSamples, bank, nFilter, 1);
 		for (i = 0; i < nSamples; i++) {
-			cx = cRxFilterOut(cSamples[i], bank, nFilter);
+			cx = cSamples[i];
 			dsamples[i] = dd = creal(cx) - cimag(cx);
 			if(bank == 0) {
 				measure_audio_sum += dd * dd;
@@ -1938,7 +2227,7 @@ static int quisk_process_demodulate(complex double * cSamples, double * dsamples
 			}
 		}
 		if(bank == 0)
-			dAutoNotch(dsamples, nSamples, 0, quisk_filter_srate);
+			dAutoNotch(dsamples, nSamples, 0, filter_srate);
 		if (filter_bandwidth[nFilter] < DGT_NARROW_FREQ) {
 			nSamples = quisk_dInterpolate(dsamples, nSamples, &Storage[bank].filtAudio12p2, 2);
 			nSamples = quisk_dInterp2HB45(dsamples, nSamples, &Storage[bank].HalfBand6);
@@ -1947,16 +2236,17 @@ static int quisk_process_demodulate(complex double * cSamples, double * dsamples
 		break;
 	case DGT_L:     // digital mode DGT-L
 		if (filter_bandwidth[nFilter] < DGT_NARROW_FREQ) {	// filter at 6 ksps
-			quisk_filter_srate = quisk_decim_srate / 8;
+			filter_srate = DecimSrate[bank] / 8;
 			nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand5);
 			nSamples = quisk_cDecim2HB45(cSamples, nSamples, &Storage[bank].HalfBand4);
 			nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtDecim48to24, 2);
 		}
 		else {	// filter at 48 ksps
-			quisk_filter_srate = quisk_decim_srate;
+			filter_srate = DecimSrate[bank];
 		}
+		RxFilterBlock(cSamples, nSamples, bank, nFilter, 1);
 		for (i = 0; i < nSamples; i++) {
-			cx = cRxFilterOut(cSamples[i], bank, nFilter);
+			cx = cSamples[i];
 			dsamples[i] = dd = creal(cx) + cimag(cx);
 			if(bank == 0) {
 				measure_audio_sum += dd * dd;
@@ -1964,7 +2254,7 @@ static int quisk_process_demodulate(complex double * cSamples, double * dsamples
 			}
 		}
 		if(bank == 0)
-			dAutoNotch(dsamples, nSamples, 0, quisk_filter_srate);
+			dAutoNotch(dsamples, nSamples, 0, filter_srate);
 		if (filter_bandwidth[nFilter] < DGT_NARROW_FREQ) {
 			nSamples = quisk_dInterpolate(dsamples, nSamples, &Storage[bank].filtAudio12p2, 2);
 			nSamples = quisk_dInterp2HB45(dsamples, nSamples, &Storage[bank].HalfBand6);
@@ -1972,11 +2262,9 @@ static int quisk_process_demodulate(complex double * cSamples, double * dsamples
 		}
 		break;
 	case DGT_IQ:     // digital mode DGT-IQ at 48 ksps
-		quisk_filter_srate = quisk_decim_srate;
-		if (filter_bandwidth[nFilter] < 19000) {		// No filtering for wide bandwidth
-			for (i = 0; i < nSamples; i++)
-				cSamples[i] = dRxFilterOut(cSamples[i], bank, nFilter);
-		}
+		filter_srate = DecimSrate[bank];
+		if (filter_bandwidth[nFilter] < 19000)		// No filtering for wide bandwidth
+			RxFilterBlock(cSamples, nSamples, bank, nFilter, 0);
 		if(bank == 0) {
 			for (i = 0; i < nSamples; i++) {
 				measure_audio_sum = measure_audio_sum + cSamples[i] * conj(cSamples[i]);
@@ -1993,12 +2281,13 @@ static int quisk_process_demodulate(complex double * cSamples, double * dsamples
 		else
 			process_agc(&Agc2, cSamples, nSamples, 1);
 		// Perhaps decimate by an additional fraction
-		if (quisk_decim_srate != 48000) {
-			dd = quisk_decim_srate / 48000.0;
-			nSamples = cFracDecim(cSamples, nSamples, dd);
-			quisk_decim_srate = 48000;
+		if (DecimSrate[bank] != 48000) {
+			dd = DecimSrate[bank] / 48000.0;
+			nSamples = cFracDecim(cSamples, nSamples, dd, bank);
+			if (bank == 0)
+				quisk_decim_srate = 48000;
 		}
-		quisk_filter_srate =8000;
+		filter_srate =8000;
 		nSamples = quisk_cDecimate(cSamples, nSamples, &Storage[bank].filtDecim16to8, 2);
 		if (pt_quisk_freedv_rx)
 			nSamples = (* pt_quisk_freedv_rx)(cSamples, dsamples, nSamples, bank);
@@ -2012,7 +2301,9 @@ static int quisk_process_demodulate(complex double * cSamples, double * dsamples
 		nSamples = quisk_dInterp2HB45(dsamples, nSamples, &Storage[bank].HalfBand7);
 		break;
 	}
-	if (bank == 0 && measure_audio_count >= quisk_filter_srate * measure_audio_time) {
+	if (bank == 0)
+		quisk_filter_srate = filter_srate;
+	if (bank == 0 && measure_audio_count >= filter_srate * measure_audio_time) {
 		measured_audio = sqrt(measure_audio_sum / measure_audio_count) / CLIP32 * 1e6;
 		measure_audio_sum = measure_audio_count = 0;
 	}
@@ -2146,23 +2437,170 @@ static void process_agc(struct AgcState * dat, complex double * csamples, int co
 	return;
 }
 
+struct rx_bank_job {	// Tune, decimate and demodulate one sub-receiver bank
+	complex double * cSamples;		// input samples; these are changed
+	double * dsamples;				// output audio samples
+	int nSamples;					// the number of input samples, and then the number of output samples
+	int bank;
+	int nFilter;
+	rx_mode_type rx_mode;
+	complex double * tuneVector;	// the tuning oscillator for this bank
+	double tune_freq;				// the tuning frequency in Hertz
+} ;
+
+static void rx_bank_set(struct rx_bank_job * job, complex double * cSamples, double * dsamples, int nSamples,
+		int bank, int nFilter, rx_mode_type rx_mode, complex double * tuneVector, double tune_freq)
+{
+	job->cSamples = cSamples;
+	job->dsamples = dsamples;
+	job->nSamples = nSamples;
+	job->bank = bank;
+	job->nFilter = nFilter;
+	job->rx_mode = rx_mode;
+	job->tuneVector = tuneVector;
+	job->tune_freq = tune_freq;
+}
+
+static void rx_bank_run(struct rx_bank_job * job)
+{
+	int i, n;
+	complex double phase;
+
+	phase = cexp((I * -2.0 * M_PI * job->tune_freq) / quisk_sound_state.sample_rate);
+	// Tune the channel to frequency
+	for (i = 0; i < job->nSamples; i++) {
+		job->cSamples[i] *= *job->tuneVector;
+		*job->tuneVector *= phase;
+	}
+	n = quisk_process_decimate(job->cSamples, job->nSamples, job->bank, job->rx_mode);
+	job->nSamples = quisk_process_demodulate(job->cSamples, job->dsamples, n, job->bank, job->nFilter, job->rx_mode);
+}
+
+#ifdef QUISK_RX_THREADS
+// There is one worker thread for each sub-receiver bank 1, 2, ...  The main receiver on bank 0
+// runs on the sound thread at the same time, and then the sound thread waits for the workers.
+static struct rx_worker {
+	pthread_t thread;
+	pthread_mutex_t mutex;
+	pthread_cond_t cond;
+	struct rx_bank_job * job;		// the job to run, or NULL when the worker is idle
+	int started;
+	int stop;
+} RxWorker[MAX_RX_CHANNELS];
+
+static void * rx_worker_thread(void * arg)
+{
+	struct rx_worker * worker = (struct rx_worker *)arg;
+
+	pthread_mutex_lock(&worker->mutex);
+	while (1) {
+		while ( ! worker->job && ! worker->stop)
+			pthread_cond_wait(&worker->cond, &worker->mutex);
+		if (worker->stop)
+			break;
+		pthread_mutex_unlock(&worker->mutex);
+		rx_bank_run(worker->job);
+		pthread_mutex_lock(&worker->mutex);
+		worker->job = NULL;
+		pthread_cond_signal(&worker->cond);
+	}
+	pthread_mutex_unlock(&worker->mutex);
+	return NULL;
+}
+
+static int rx_worker_submit(struct rx_bank_job * job)
+{	// Start the job on the worker for its bank.  Return 0 if there is no worker, and the caller must run the job.
+	struct rx_worker * worker = RxWorker + job->bank;
+
+	if ( ! worker->started) {
+		pthread_mutex_init(&worker->mutex, NULL);
+		pthread_cond_init(&worker->cond, NULL);
+		worker->job = NULL;
+		worker->stop = 0;
+		if (pthread_create(&worker->thread, NULL, rx_worker_thread, worker) != 0) {
+			printf("Failure to start the worker thread for receiver bank %d\n", job->bank);
+			pthread_mutex_destroy(&worker->mutex);
+			pthread_cond_destroy(&worker->cond);
+			return 0;
+		}
+		worker->started = 1;
+	}
+	pthread_mutex_lock(&worker->mutex);
+	worker->job = job;
+	pthread_cond_signal(&worker->cond);
+	pthread_mutex_unlock(&worker->mutex);
+	return 1;
+}
+
+static void rx_worker_wait(struct rx_bank_job * job)
+{	// Wait for the job to finish.
+	struct rx_worker * worker = RxWorker + job->bank;
+
+	pthread_mutex_lock(&worker->mutex);
+	while (worker->job)
+		pthread_cond_wait(&worker->cond, &worker->mutex);
+	pthread_mutex_unlock(&worker->mutex);
+}
+
+static void rx_worker_close(void)
+{	// Stop all worker threads.
+	int i;
+	struct rx_worker * worker;
+
+	for (i = 0; i < MAX_RX_CHANNELS; i++) {
+		worker = RxWorker + i;
+		if ( ! worker->started)
+			continue;
+		pthread_mutex_lock(&worker->mutex);
+		worker->stop = 1;
+		pthread_cond_signal(&worker->cond);
+		pthread_mutex_unlock(&worker->mutex);
+		pthread_join(worker->thread, NULL);
+		pthread_mutex_destroy(&worker->mutex);
+		pthread_cond_destroy(&worker->cond);
+		worker->started = 0;
+	}
+}
+#else
+static int rx_worker_submit(struct rx_bank_job * job)
+{
+	return 0;
+}
+
+static void rx_worker_wait(struct rx_bank_job * job)
+{
+}
+
+static void rx_worker_close(void)
+{
+}
+#endif
+
+static int rx_mode_is_threadsafe(rx_mode_type rx_mode)
+{	// FreeDV and external demodulation have state that is shared between banks.
+	return rx_mode != FDV_U && rx_mode != FDV_L && rx_mode != EXT;
+}
+
 int quisk_process_samples(complex double * cSamples, int nSamples)
 {
 // Called when samples are available.
 // Samples range from about 2^16 to a max of 2^31.
-	int i, n, nout, is_key_down, squelch_real=0, squelch_imag=0;
+	int i, m, n, nout, is_key_down, squelch_real=0, squelch_imag=0;
 	double d, di, tune;
 	double double_filter_decim;
 	complex double phase;
 	int orig_nSamples;
+	int threaded;
 	fft_data * ptFFT;
 	rx_mode_type rx_mode;
+	struct rx_bank_job job1, job2;		// sub-receivers on banks 1 and 2
 
-	static int size_dsamples = 0;		// Current dimension of dsamples, dsamples2, orig_cSamples, buf_cSamples
+	static int size_dsamples = 0;		// Current dimension of dsamples, dsamples2, dsamples3, orig_cSamples, buf_cSamples
 	static int old_split_rxtx = 0;		// Prior value of split_rxtx
 	static int old_multirx_play_channel = 0;		// Prior value of multirx_play_channel
 	static double * dsamples = NULL;
 	static double * dsamples2 = NULL;
+	static double * dsamples3 = NULL;
 	static complex double * orig_cSamples = NULL;
 	static complex double * buf_cSamples = NULL;
 	static complex double rxTuneVector = 1;
@@ -2200,6 +2638,8 @@ int quisk_process_samples(complex double * cSamples, int nSamples)
 			free(dsamples);
 		if (dsamples2)
 			free(dsamples2);
+		if (dsamples3)
+			free(dsamples3);
 		if (orig_cSamples)
 			free(orig_cSamples);
 		if (buf_cSamples)
@@ -2207,6 +2647,7 @@ int quisk_process_samples(complex double * cSamples, int nSamples)
 		size_dsamples = nSamples * 2;
 		dsamples = (double *)malloc(size_dsamples * sizeof(double));
 		dsamples2 = (double *)malloc(size_dsamples * sizeof(double));
+		dsamples3 = (double *)malloc(size_dsamples * sizeof(double));
 		orig_cSamples = (complex double *)malloc(size_dsamples * sizeof(complex double));
 		buf_cSamples = (complex double *)malloc(size_dsamples * sizeof(complex double));
 	}
@@ -2332,15 +2773,26 @@ int quisk_process_samples(complex double * cSamples, int nSamples)
 			    n = fft_data_index + 1;				// next FFT data location
 			    if (n >= FFT_ARRAY_SIZE)
 				    n = 0;
+			    // Start the next block with the end of this block.  Raw blocks for the scope and
+			    // the VNA are a continuous stream, so they never overlap.
+			    if (quisk_is_vna || ! graph_use_fft)
+				    m = 0;
+			    else
+				    m = fft_overlap;
 			    if (fft_data_array[n].filled == 0) {				// Is the next buffer empty?
-				    fft_data_array[n].index = 0;
+				    if (m > 0)
+					    memcpy(fft_data_array[n].samples, ptFFT->samples + fft_size - m, m * sizeof(complex double));
+				    fft_data_array[n].index = m;
 				    fft_data_array[n].block = 0;
 				    fft_data_array[fft_data_index].filled = 1;	// Mark the previous buffer ready.
+				    spectrum_worker_signal();
 				    fft_data_index = n;							// Write samples into the new buffer.
 				    ptFFT = fft_data_array + fft_data_index;
 			    }
 			    else {				// no place to write samples
-				    ptFFT->index = 0;
+				    if (m > 0)
+					    memmove(ptFFT->samples, ptFFT->samples + fft_size - m, m * sizeof(complex double));
+				    ptFFT->index = m;
 				    fft_error++;
 			    }
 		    }
@@ -2387,7 +2839,40 @@ int quisk_process_samples(complex double * cSamples, int nSamples)
 	}
 #endif
 
+	// Set up the sub-receivers.  They are independent of the main receiver on bank 0,
+	// and may run on worker threads while the main receiver is demodulated here.
+	job1.cSamples = job2.cSamples = NULL;
+	if (rxMode == DGT_IQ) {
+		;		// This mode is already stereo
+	}
+	else if (split_rxtx) {		// Demodulate a second channel from the same receiver
+		rx_bank_set(&job1, orig_cSamples, dsamples2, orig_nSamples, 1, 0, rxMode,
+			&txTuneVector, quisk_tx_tune_freq + rit_freq);
+	}
+	else if (multirx_play_channel >= 0) {		// Demodulate a second channel from a different receiver
+		memcpy(buf_cSamples, multirx_cSamples[multirx_play_channel], orig_nSamples * sizeof(complex double));
+		rx_bank_set(&job1, buf_cSamples, dsamples2, orig_nSamples, 1, 1, multirx_mode[multirx_play_channel],
+			&aux1TuneVector, multirx_freq[multirx_play_channel]);
+	}
+	// play sub-receiver 1 audio on a digital output device
+	rx_mode = multirx_mode[0];
+	if (quisk_multirx_count > 0 &&
+	(rx_mode == DGT_U || rx_mode == DGT_L || rx_mode == DGT_IQ || rx_mode == DGT_FM)  &&
+	quisk_DigitalRx1Output.driver) {
+		rx_bank_set(&job2, multirx_cSamples[0], dsamples3, orig_nSamples, 2, 2, rx_mode,
+			&aux2TuneVector, multirx_freq[0]);
+	}
+	threaded = rx_worker_threads && (job1.cSamples || job2.cSamples) && rx_mode_is_threadsafe(rxMode) &&
+		( ! job1.cSamples || rx_mode_is_threadsafe(job1.rx_mode));
+	if (threaded) {
+		if (job1.cSamples && ! rx_worker_submit(&job1))
+			rx_bank_run(&job1);
+		if (job2.cSamples && ! rx_worker_submit(&job2))
+			rx_bank_run(&job2);
+	}
+
 	nSamples = quisk_process_decimate(cSamples, nSamples, 0, rxMode);
+	quisk_decim_srate = DecimSrate[0];
 
 #if DEBUG
 	for (i = 0; i < nSamples; i++) {
@@ -2402,21 +2887,26 @@ int quisk_process_samples(complex double * cSamples, int nSamples)
 
 	nSamples = quisk_process_demodulate(cSamples, dsamples, nSamples, 0, 0, rxMode);
 
+	if (threaded) {		// Wait for the sub-receivers
+		if (job1.cSamples)
+			rx_worker_wait(&job1);
+		if (job2.cSamples)
+			rx_worker_wait(&job2);
+	}
+	else {
+		if (job1.cSamples)
+			rx_bank_run(&job1);
+		if (job2.cSamples)
+			rx_bank_run(&job2);
+	}
+
 	squelch_real = 0;	// keep track of the squelch for the two play channels
 	squelch_imag = 0;
 	if (rxMode == DGT_IQ) {
 		;		// This mode is already stereo
 	}
 	else if (split_rxtx) {		// Demodulate a second channel from the same receiver
-		phase = cexp((I * -2.0 * M_PI * (quisk_tx_tune_freq + rit_freq)) / quisk_sound_state.sample_rate);
-		// Tune the second channel to frequency
-		for (i = 0; i < orig_nSamples; i++) {
-			orig_cSamples[i] *= txTuneVector;
-			txTuneVector *= phase;
-		}
-		n = quisk_process_decimate(orig_cSamples, orig_nSamples, 1, rxMode);
-		n = quisk_process_demodulate(orig_cSamples, dsamples2, n, 1, 0, rxMode);
-		nSamples = Buffer2Chan(dsamples, nSamples, dsamples2, n);		// buffer dsamples and dsamples2 so the count is equal
+		nSamples = Buffer2Chan(dsamples, nSamples, dsamples2, job1.nSamples);		// buffer dsamples and dsamples2 so the count is equal
 		// dsamples was demodulated on bank 0, dsamples2 on bank 1
 		switch(split_rxtx) {
 		default:
@@ -2461,16 +2951,7 @@ int quisk_process_samples(complex double * cSamples, int nSamples)
 		}
 	}
 	else if (multirx_play_channel >= 0) {		// Demodulate a second channel from a different receiver
-		memcpy(buf_cSamples, multirx_cSamples[multirx_play_channel], orig_nSamples * sizeof(complex double));
-		phase = cexp((I * -2.0 * M_PI * (multirx_freq[multirx_play_channel])) / quisk_sound_state.sample_rate);
-		// Tune the second channel to frequency
-		for (i = 0; i < orig_nSamples; i++) {
-			buf_cSamples[i] *= aux1TuneVector;
-			aux1TuneVector *= phase;
-		}
-		n = quisk_process_decimate(buf_cSamples, orig_nSamples, 1, multirx_mode[multirx_play_channel]);
-		n = quisk_process_demodulate(buf_cSamples, dsamples2, n, 1, 1, multirx_mode[multirx_play_channel]);
-		nSamples = Buffer2Chan(dsamples, nSamples, dsamples2, n);		// buffer dsamples and dsamples2 so the count is equal
+		nSamples = Buffer2Chan(dsamples, nSamples, dsamples2, job1.nSamples);		// buffer dsamples and dsamples2 so the count is equal
 		switch(multirx_play_method) {
 		default:
 		case 0:		// play both
@@ -2501,24 +2982,14 @@ int quisk_process_samples(complex double * cSamples, int nSamples)
 	}
 
 	// play sub-receiver 1 audio on a digital output device
-	rx_mode = multirx_mode[0];
-	if (quisk_multirx_count > 0 &&
-	(rx_mode == DGT_U || rx_mode == DGT_L || rx_mode == DGT_IQ || rx_mode == DGT_FM)  &&
-	quisk_DigitalRx1Output.driver) {
-		phase = cexp((I * -2.0 * M_PI * (multirx_freq[0])) / quisk_sound_state.sample_rate);
-		// Tune the channel to frequency
-		for (i = 0; i < orig_nSamples; i++) {
-			multirx_cSamples[0][i] *= aux2TuneVector;
-			aux2TuneVector *= phase;
-		}
-		n = quisk_process_decimate(multirx_cSamples[0], orig_nSamples, 2, rx_mode);
-		n = quisk_process_demodulate(multirx_cSamples[0], dsamples2, n, 2, 2, rx_mode);
-		if (rx_mode == DGT_IQ) {		// DGT-IQ
+	if (job2.cSamples) {
+		n = job2.nSamples;
+		if (job2.rx_mode == DGT_IQ) {		// DGT-IQ
 			process_agc(&Agc3, multirx_cSamples[0], n, 1);
 		}
 		else {
 			for (i = 0; i < n; i++)
-				multirx_cSamples[0][i] = dsamples2[i] + I * dsamples2[i];
+				multirx_cSamples[0][i] = dsamples3[i] + I * dsamples3[i];
 			process_agc(&Agc3, multirx_cSamples[0], n, 0);
 		}
 		play_sound_interface(&quisk_DigitalRx1Output, n, multirx_cSamples[0], 1, 1.0);
@@ -2527,7 +2998,7 @@ int quisk_process_samples(complex double * cSamples, int nSamples)
 	// Perhaps decimate by an additional fraction
 	if (quisk_decim_srate != 48000) {
 		double_filter_decim = quisk_decim_srate / 48000.0;
-		nSamples = cFracDecim(cSamples, nSamples, double_filter_decim);
+		nSamples = cFracDecim(cSamples, nSamples, double_filter_decim, 0);
 		quisk_decim_srate = 48000;
 	}
 
@@ -2662,10 +3133,12 @@ static PyObject * get_filter_rate(PyObject * self, PyObject * args)
 {	// Return the filter sample rate as used by quisk_process_samples.
 	// Changes to quisk_process_decimate or quisk_process_demodulate will require changes here.
 	int rate, decim_srate, filter_srate, mode, bandwidth;
-	// mode is -1 to use the rxMode
-	if (!PyArg_ParseTuple (args, "ii", &mode, &bandwidth))
+	// mode is -1 to use the rxMode; rate is the sample rate, or zero to use the current rate
+	rate = 0;
+	if (!PyArg_ParseTuple (args, "ii|i", &mode, &bandwidth, &rate))
 		return NULL;
-	rate = quisk_sound_state.sample_rate;
+	if (rate <= 0)
+		rate = quisk_sound_state.sample_rate;
 	switch((rate + 100) / 1000) {
 	case 41:
 		decim_srate = 48000;
@@ -2691,7 +3164,7 @@ static PyObject * get_filter_rate(PyObject * self, PyObject * args)
 		decim_srate = rate / 24;
 		break;
 	default:
-		decim_srate = PlanDecimation(NULL, NULL, NULL);
+		decim_srate = PlanDecimation(rate, NULL, NULL, NULL);
 		break;
 	}
 	if (mode < 0) {
@@ -2734,6 +3207,191 @@ static PyObject * get_filter_rate(PyObject * self, PyObject * args)
 	return PyInt_FromLong(filter_srate);
 }
 
+static PyObject * process_iq(PyObject * self, PyObject * args)
+{  // Demodulate a block of I/Q samples without the sound system, and return the audio at 48000 sps.  The
+   // samples go through the same decimation, demodulation and AGC as radio sound, but on a separate bank.
+   // The samples are complex double with full scale 1.0 if sample_bytes is zero, else little-endian integers
+   // or float32 of sample_bytes each for I and Q.  Return bytes of complex double with the left channel in
+   // the real part and the right channel in the imaginary part, with full scale 1.0.  The filter and AGC
+   // state continue from the previous call unless reset is true, so a long recording can be sent in blocks.
+   // The filter coefficients are read on every call, and the filter is changed only if they are different.
+	int i, n, k, count, rate, mode, bandwidth, size, nbytes, is_float, reset, nout, max_out, changed;
+	int old_rate, old_play, old_decim, old_size;
+	rx_mode_type old_mode;
+	double tune;
+	complex double phase;
+	complex double * out, * pt;
+	static complex double cBuf[SAMP_BUFFER_SIZE];
+	static double dBuf[SAMP_BUFFER_SIZE];
+	static double newFilterI[MAX_FILTER_SIZE], newFilterQ[MAX_FILTER_SIZE];
+	static struct AgcState agc = {0.7, 48000, 0};
+	static complex double tuneVector = 1;
+	static int offline_rate, offline_mode, offline_size;		// the sample rate, mode and filter size of the previous call
+	PyObject * samples, * filterI, * filterQ, * obj, * ret;
+	Py_buffer view;
+	char buf98[98];
+
+	nbytes = is_float = reset = 0;
+	if (!PyArg_ParseTuple (args, "OiidOOi|iii", &samples, &rate, &mode, &tune, &filterI, &filterQ, &bandwidth,
+			&nbytes, &is_float, &reset))
+		return NULL;
+	if (sound_is_started) {
+		PyErr_SetString (QuiskError, "Can not process samples while the sound is started");
+		return NULL;
+	}
+	if (mode < 0 || mode > DGT_FM || ! rx_mode_is_threadsafe(mode)) {
+		PyErr_SetString (QuiskError, "Unsupported mode for process_iq");
+		return NULL;
+	}
+	if (rate < 48000) {
+		PyErr_SetString (QuiskError, "The sample rate must be at least 48000");
+		return NULL;
+	}
+	if (nbytes < 0 || nbytes > 4 || (is_float && nbytes != 4)) {
+		PyErr_SetString (QuiskError, "Invalid sample size");
+		return NULL;
+	}
+	if (PySequence_Check(filterI) != 1 || PySequence_Check(filterQ) != 1) {
+		PyErr_SetString (QuiskError, "Filters I and Q must be sequences");
+		return NULL;
+	}
+	size = PySequence_Size(filterI);
+	if (size < 0)
+		return NULL;
+	k = PySequence_Size(filterQ);
+	if (k < 0)
+		return NULL;
+	if (size != k) {
+		PyErr_SetString (QuiskError, "The size of filters I and Q must be equal");
+		return NULL;
+	}
+	if (size >= MAX_FILTER_SIZE) {
+		snprintf(buf98, 98, "Filter size must be less than %d", MAX_FILTER_SIZE);
+		PyErr_SetString (QuiskError, buf98);
+		return NULL;
+	}
+	for (i = 0; i < size; i++) {
+		obj = PySequence_GetItem(filterI, i);
+		if ( ! obj)
+			return NULL;
+		newFilterI[i] = PyFloat_AsDouble(obj);
+		Py_DECREF(obj);
+		obj = PySequence_GetItem(filterQ, i);
+		if ( ! obj)
+			return NULL;
+		newFilterQ[i] = PyFloat_AsDouble(obj);
+		Py_DECREF(obj);
+		if (PyErr_Occurred())
+			return NULL;
+	}
+	if (PyObject_GetBuffer(samples, &view, PyBUF_SIMPLE) != 0)
+		return NULL;
+	k = nbytes ? nbytes * 2 : (int)sizeof(complex double);
+	if (view.len % k != 0) {
+		PyBuffer_Release(&view);
+		PyErr_SetString (QuiskError, "The sample buffer has a partial sample");
+		return NULL;
+	}
+	count = view.len / k;
+	max_out = (int)((double)count * 48000 / rate) + 2 * OFFLINE_BLOCK;
+	out = (complex double *)malloc(max_out * sizeof(complex double));
+	if ( ! out) {
+		PyBuffer_Release(&view);
+		return PyErr_NoMemory();
+	}
+	// Change the filter only if the coefficients are different, so interleaved callers with different filters work
+	changed = size != offline_size || bandwidth != filter_bandwidth[OFFLINE_BANK];
+	for (i = 0; i < size && ! changed; i++)
+		if (newFilterI[i] != cFilterI[OFFLINE_BANK][i] || newFilterQ[i] != cFilterQ[OFFLINE_BANK][i])
+			changed = 1;
+	if (changed) {
+		memcpy(cFilterI[OFFLINE_BANK], newFilterI, size * sizeof(double));
+		memcpy(cFilterQ[OFFLINE_BANK], newFilterQ, size * sizeof(double));
+		offline_size = size;
+		filter_bandwidth[OFFLINE_BANK] = bandwidth;
+		filter_generation[OFFLINE_BANK]++;
+	}
+	if (rate != offline_rate || mode != offline_mode || ! agc.buf_size)
+		reset = 1;
+	// The radio sound is stopped, so change the global state and restore it later
+	old_rate = quisk_sound_state.sample_rate;
+	old_play = quisk_sound_state.playback_rate;
+	old_decim = quisk_decim_srate;
+	old_size = sizeFilter;
+	old_mode = rxMode;
+	quisk_sound_state.sample_rate = rate;
+	quisk_sound_state.playback_rate = 48000;
+	sizeFilter = size;
+	rxMode = mode;
+	if (reset) {
+		offline_rate = rate;
+		offline_mode = mode;
+		quisk_process_decimate(NULL, 1, OFFLINE_BANK, 0);
+		quisk_process_demodulate(NULL, NULL, 1, OFFLINE_BANK, 0, 0);
+		RxFilterBlock(NULL, 0, OFFLINE_BANK, OFFLINE_BANK, 0);
+		cFracDecim(NULL, 0, 1.0, OFFLINE_BANK);
+		if (agc.c_samp)
+			free(agc.c_samp);
+		agc.c_samp = NULL;
+		agc.buf_size = 0;
+		process_agc(&agc, NULL, 0, 0);		// initialize the AGC
+		tuneVector = 1;
+	}
+	nout = 0;
+	phase = cexp((I * -2.0 * M_PI * tune) / rate);
+	for (k = 0; k < count; k += OFFLINE_BLOCK) {
+		n = count - k;
+		if (n > OFFLINE_BLOCK)
+			n = OFFLINE_BLOCK;
+		if (nbytes)
+			quisk_unpack_iq(cBuf, (unsigned char *)view.buf + k * nbytes * 2, n, nbytes, 0, is_float ? QUISK_UNPACK_FLOAT : 0, 1.0);
+		else
+			for (i = 0; i < n; i++)
+				cBuf[i] = ((complex double *)view.buf)[k + i] * CLIP32;
+		if (tune != 0) {
+			for (i = 0; i < n; i++) {
+				cBuf[i] *= tuneVector;
+				tuneVector *= phase;
+			}
+		}
+		n = quisk_process_decimate(cBuf, n, OFFLINE_BANK, mode);
+		quisk_decim_srate = DecimSrate[OFFLINE_BANK];
+		n = quisk_process_demodulate(cBuf, dBuf, n, OFFLINE_BANK, OFFLINE_BANK, mode);
+		if (mode != DGT_IQ)
+			for (i = 0; i < n; i++)
+				cBuf[i] = dBuf[i] + I * dBuf[i];
+		// The order is the same as quisk_process_samples(): fractional decimation to 48000 sps, then AGC
+		if (quisk_decim_srate != 48000)
+			n = cFracDecim(cBuf, n, quisk_decim_srate / 48000.0, OFFLINE_BANK);
+		process_agc(&agc, cBuf, n, mode == DGT_IQ);
+		if (nout + n > max_out) {
+			max_out = nout + n + OFFLINE_BLOCK;
+			pt = (complex double *)realloc(out, max_out * sizeof(complex double));
+			if ( ! pt) {
+				free(out);
+				out = NULL;
+				break;
+			}
+			out = pt;
+		}
+		for (i = 0; i < n; i++)
+			out[nout++] = cBuf[i] / CLIP32;
+	}
+	PyBuffer_Release(&view);
+	quisk_sound_state.sample_rate = old_rate;
+	quisk_sound_state.playback_rate = old_play;
+	quisk_decim_srate = old_decim;
+	sizeFilter = old_size;
+	rxMode = old_mode;
+	if ( ! out) {
+		agc.buf_size = 0;		// the state is partly updated, so reset on the next call
+		return PyErr_NoMemory();
+	}
+	ret = PyBytes_FromStringAndSize((char *)out, nout * sizeof(complex double));
+	free(out);
+	return ret;
+}
+
 static PyObject * get_smeter(PyObject * self, PyObject * args)
 {
 	if (!PyArg_ParseTuple (args, ""))
@@ -2764,7 +3422,7 @@ static void init_bandscope(void)
 		bandscopeWindow = (double *)malloc(bandscope_size * sizeof(double));
 		bandscopeAverage = (double *)malloc((bandscope_size / 2 + 1 + 1) * sizeof(double));
 		bandscopeFFT = (complex double *)malloc((bandscope_size / 2 + 1) * sizeof(complex double));
-		bandscopePlan = fftw_plan_dft_r2c_1d(bandscope_size, bandscopeSamples, bandscopeFFT, FFTW_MEASURE);
+		bandscopePlan = quisk_plan_r2c(bandscope_size, bandscopeSamples, bandscopeFFT);
 		// Create the fft window
 		for (i = 0, j = -bandscope_size / 2; i < bandscope_size; i++, j++)
 			bandscopeWindow[i] = 0.5 + 0.5 * cos(2. * M_PI * j / bandscope_size);	// Hanning
@@ -2775,11 +3433,10 @@ static void init_bandscope(void)
 }
 
 static PyObject * add_rx_samples(PyObject * self, PyObject * args)
-{
-	int i;
-	int ii, qq;	// ii, qq must be four bytes
-	unsigned char * pt_ii;
-	unsigned char * pt_qq;
+{  // Add the Rx samples to the ring.  Accept as many whole samples as fit, and return the number of bytes accepted.
+   // Return None if the samples are invalid, so the caller does not send them again.
+	int count, n, nbytes, index, flags;
+	unsigned int head, fill;
 	Py_buffer view;
 	PyObject * samples;
 
@@ -2795,47 +3452,53 @@ static PyObject * add_rx_samples(PyObject * self, PyObject * args)
 		Py_INCREF (Py_None);
 		return Py_None;
 	}
+	if (py_sample_rx_bytes < 1 || py_sample_rx_bytes > 4 || (py_sample_rx_float && py_sample_rx_bytes != 4)) {
+		printf ("add_rx_samples: Invalid sample size %d\n", py_sample_rx_bytes);
+		PyBuffer_Release(&view);
+		Py_INCREF (Py_None);
+		return Py_None;
+	}
 	if (view.len % (py_sample_rx_bytes * 2) != 0) {
 		printf ("add_rx_samples: Odd number of bytes in sample buffer\n");
+		PyBuffer_Release(&view);
+		Py_INCREF (Py_None);
+		return Py_None;
 	}
-	else if (PySampleCount + view.len / py_sample_rx_bytes / 2 > SAMP_BUFFER_SIZE * 8 / 10) {
-		printf ("add_rx_samples: buffer is too full\n");
-	}
-	else if (py_sample_rx_endian == 0) {	// byte order of samples is little-endian
-		void * buf;
-		void * buf_end;
-		buf = view.buf;
-		buf_end = buf + view.len;
-		pt_ii = (unsigned char *)&ii + 4 - py_sample_rx_bytes;
-		pt_qq = (unsigned char *)&qq + 4 - py_sample_rx_bytes;
-		while (buf < buf_end) {
-			ii = qq = 0;
-			memcpy(pt_ii, buf, py_sample_rx_bytes);
-			buf += py_sample_rx_bytes;
-			memcpy(pt_qq, buf, py_sample_rx_bytes);
-			buf += py_sample_rx_bytes;
-			PySampleBuf[PySampleCount++] = ii + qq * I;
-		}
-	}
-	else {		// byte order of samples is big-endian
-		unsigned char * buf;
-		unsigned char * buf_end;
-		buf = view.buf;
-		buf_end = buf + view.len;
-		while (buf < buf_end) {
-			ii = qq = 0;
-			pt_ii = (unsigned char *)&ii + 3;
-			pt_qq = (unsigned char *)&qq + 3;
-			for (i = 0; i < py_sample_rx_bytes; i++)
-				*pt_ii-- = *buf++;
-			for (i = 0; i < py_sample_rx_bytes; i++)
-				*pt_qq-- = *buf++;
-			PySampleBuf[PySampleCount++] = ii + qq * I;
-		}
-	}
+	flags = py_sample_rx_endian ? QUISK_UNPACK_BIG_ENDIAN : 0;
+	if (py_sample_rx_float)
+		flags |= QUISK_UNPACK_FLOAT;
+	count = view.len / py_sample_rx_bytes / 2;
+	head = PySampleHead;
+	fill = head - __atomic_load_n(&PySampleTail, __ATOMIC_ACQUIRE);
+	if (count > (int)(PY_RING_SIZE - fill)) {
+		py_sample_rejected += count - (PY_RING_SIZE - fill);
+		count = PY_RING_SIZE - fill;
+	}
+	index = head & (PY_RING_SIZE - 1);
+	n = PY_RING_SIZE - index;	// samples before the end of the ring
+	if (n > count)
+		n = count;
+	quisk_unpack_iq(PySampleRing + index, view.buf, n, py_sample_rx_bytes, 0, flags, 1.0);
+	if (count > n)
+		quisk_unpack_iq(PySampleRing, (unsigned char *)view.buf + n * py_sample_rx_bytes * 2, count - n, py_sample_rx_bytes, 0, flags, 1.0);
+	__atomic_store_n(&PySampleHead, head + count, __ATOMIC_RELEASE);
+	py_sample_accepted += count;
+	if (fill + count > py_sample_max_fill)
+		py_sample_max_fill = fill + count;
+	nbytes = count * py_sample_rx_bytes * 2;
 	PyBuffer_Release(&view);
-	Py_INCREF (Py_None);
-	return Py_None;
+	return PyInt_FromLong(nbytes);
+}
+
+static PyObject * get_py_sample_status(PyObject * self, PyObject * args)
+{  // Return the statistics for the ring of samples returned from Python.
+	unsigned int fill;
+
+	if (!PyArg_ParseTuple (args, ""))
+		return NULL;
+	fill = __atomic_load_n(&PySampleHead, __ATOMIC_ACQUIRE) - __atomic_load_n(&PySampleTail, __ATOMIC_ACQUIRE);
+	return Py_BuildValue("{s:k,s:k,s:I,s:I,s:i}", "accepted", py_sample_accepted, "rejected", py_sample_rejected,
+		"fill", fill, "max_fill", py_sample_max_fill, "size", PY_RING_SIZE);
 }
 
 static PyObject * add_bscope_samples(PyObject * self, PyObject * args)
@@ -2900,38 +3563,92 @@ static PyObject * add_bscope_samples(PyObject * self, PyObject * args)
 }
 
 static void py_sample_start(void)
-{
+{	// Discard old samples and reset the statistics.
+	__atomic_store_n(&PySampleTail, __atomic_load_n(&PySampleHead, __ATOMIC_ACQUIRE), __ATOMIC_RELEASE);
+	py_sample_accepted = py_sample_rejected = 0;
+	py_sample_max_fill = 0;
 }
 
 static void py_sample_stop(void)
 {
-	if (bandscopePlan) {
-		fftw_destroy_plan(bandscopePlan);
-		bandscopePlan = NULL;
-	}
+	bandscopePlan = NULL;
 }
 
 static int py_sample_read(complex double * cSamples)
-{
-	int n;
+{	// Copy the available samples from the ring, but leave room in cSamples for later processing.
+	int n, index, count;
+	unsigned int tail;
+
+	tail = PySampleTail;
+	count = __atomic_load_n(&PySampleHead, __ATOMIC_ACQUIRE) - tail;
+	if (count > SAMP_BUFFER_SIZE * 8 / 10)
+		count = SAMP_BUFFER_SIZE * 8 / 10;
+	index = tail & (PY_RING_SIZE - 1);
+	n = PY_RING_SIZE - index;
+	if (n > count)
+		n = count;
+	memcpy(cSamples, PySampleRing + index, n * sizeof(complex double));
+	if (count > n)
+		memcpy(cSamples + n, PySampleRing, (count - n) * sizeof(complex double));
+	__atomic_store_n(&PySampleTail, tail + count, __ATOMIC_RELEASE);
+	return count;
+}
+
+static void MakeFftWindow(double * window, int size, int type)
+{	// Make a window function centered on size / 2. Scale it to the coherent gain of the Hanning window
+	// so the graph levels and S-meter do not depend on the window.
+	static double coefs[][5] = {		// Cosine terms of the window functions
+		{0.5, 0.5, 0, 0, 0},			// Hanning
+		{0.54, 0.46, 0, 0, 0},			// Hamming
+		{0.42, 0.50, 0.08, 0, 0},		// Blackman
+		{0.35875, 0.48829, 0.14128, 0.01168, 0},	// Blackman-Harris
+		{0.21557895, 0.41663158, 0.277263158, 0.083578947, 0.006947368},	// Flat top
+		{1.0, 0, 0, 0, 0}			// Rectangular
+	} ;
+	int i, j, k;
+	double d, theta;
+
+	if (type < 0 || type >= (int)(sizeof(coefs) / sizeof(coefs[0])))
+		type = 0;
+	for (i = 0, j = -size / 2; i < size; i++, j++) {
+		theta = 2. * M_PI * j / size;
+		d = coefs[type][0];
+		for (k = 1; k < 5; k++)
+			d += coefs[type][k] * cos(k * theta);
+		window[i] = d * 0.5 / coefs[type][0];
+	}
+}
 
-	memcpy(cSamples, PySampleBuf, PySampleCount * sizeof(complex double));
-	n = PySampleCount;
-	PySampleCount = 0;
-	return n;
+static void SetFftOverlap(int percent)
+{	// Set the overlap of successive FFT blocks in percent
+	if (percent < 0)
+		percent = 0;
+	else if (percent > 75)
+		percent = 75;
+	fft_overlap = fft_size * percent / 100;
 }
 
 static PyObject * set_params(PyObject * self, PyObject * args, PyObject * keywds)
 {  /* Call with keyword arguments ONLY; change local parameters */
 	static char * kwlist[] = {"quisk_is_vna", "rx_bytes", "rx_endian", "read_error", "clip", 
-	"bscope_bytes", "bscope_endian", "bscope_size", "bandscopeScale", "hermes_pause", NULL} ;
-	int i, nbytes, read_error, clip, bscope_size, hermes_pause;
+	"bscope_bytes", "bscope_endian", "bscope_size", "bandscopeScale", "hermes_pause",
+	"fft_window", "fft_overlap", "rx_float", NULL} ;
+	int i, nbytes, read_error, clip, bscope_size, hermes_pause, window, overlap;
 
-	nbytes = read_error = clip = bscope_size = hermes_pause = -1;
-	if (!PyArg_ParseTupleAndKeywords (args, keywds, "|iiiiiiiidi", kwlist,
+	nbytes = read_error = clip = bscope_size = hermes_pause = window = overlap = -1;
+	if (!PyArg_ParseTupleAndKeywords (args, keywds, "|iiiiiiiidiiii", kwlist,
 	&quisk_is_vna, &nbytes, &py_sample_rx_endian, &read_error, &clip,
-	&py_bscope_bytes, &py_bscope_endian, &bscope_size, &bandscopeScale, &hermes_pause))
+	&py_bscope_bytes, &py_bscope_endian, &bscope_size, &bandscopeScale, &hermes_pause,
+	&window, &overlap, &py_sample_rx_float))
 		return NULL;
+	if (window != -1 && fft_window) {
+		spectrum_worker_lock();		// the spectrum worker may be using the window
+		fft_window_type = window;
+		MakeFftWindow(fft_window, fft_size, fft_window_type);
+		spectrum_worker_unlock();
+	}
+	if (overlap != -1)
+		SetFftOverlap(overlap);
 	if (nbytes != -1) {
 		py_sample_rx_bytes = nbytes;
 		quisk_sample_source4(py_sample_start, py_sample_stop, py_sample_read, NULL);
@@ -3043,15 +3760,255 @@ static PyObject * open_key(PyObject * self, PyObject * args)
 	return PyInt_FromLong(quisk_open_key(name));
 }
 
-static void close_udp(void)
+#ifdef QUISK_UDP_CAPTURE
+// The capture thread drains the UDP socket in batches with recvmmsg() into a ring of datagrams.  There is
+// one writer (the capture thread) and one reader (the sound thread), so the ring needs no lock.  The
+// mutex and cond are only used to wake the sound thread when the ring is empty.
+static struct udp_capture {
+	pthread_t thread;
+	pthread_mutex_t mutex;
+	pthread_cond_t cond;		// signaled when datagrams are added to an empty ring
+	unsigned char (* data)[UDP_DATAGRAM_SIZE];
+	int * length;			// size of each datagram
+	double * time;			// kernel receive time of each datagram in seconds
+	unsigned int head;		// next slot to write; changed by the capture thread only
+	unsigned int tail;		// next slot to read; changed by the sound thread only
+	int waiting;			// the sound thread is waiting for data
+	int dropped;			// datagrams lost because the ring was full
+	int started;
+	int stop;
+} UdpCapture;
+
+static void * udp_capture_thread(void * arg)
 {
-	short msg = 0x7373;		// shutdown
-
-	quisk_using_udp = 0;
-	if (rx_udp_socket != INVALID_SOCKET) {
-		shutdown(rx_udp_socket, QUISK_SHUT_RD);
-		send(rx_udp_socket, (char *)&msg, 2, 0);
-		send(rx_udp_socket, (char *)&msg, 2, 0);
+	struct udp_capture * cap = (struct udp_capture *)arg;
+	struct mmsghdr msgs[UDP_BATCH];
+	struct iovec iovecs[UDP_BATCH];
+	char control[UDP_BATCH][CMSG_SPACE(sizeof(struct timespec))];
+	static unsigned char discard[UDP_DATAGRAM_SIZE];
+	struct cmsghdr * cmsg;
+	struct timespec * ts;
+	struct pollfd pfd;
+	unsigned int head, slot;
+	int i, n, want;
+
+	pfd.fd = rx_udp_socket;
+	pfd.events = POLLIN;
+	while ( ! cap->stop) {
+		if (poll(&pfd, 1, 100) != 1)	// wait for data with a timeout so we see the stop flag
+			continue;
+		while ( ! cap->stop) {	// read all available datagrams
+			head = cap->head;
+			want = UDP_RING_SIZE - (head - __atomic_load_n(&cap->tail, __ATOMIC_ACQUIRE));
+			if (want > UDP_BATCH)
+				want = UDP_BATCH;
+			for (i = 0; i < UDP_BATCH; i++) {
+				slot = (head + i) & (UDP_RING_SIZE - 1);
+				iovecs[i].iov_base = want > 0 ? cap->data[slot] : discard;
+				iovecs[i].iov_len = UDP_DATAGRAM_SIZE;
+				memset(&msgs[i].msg_hdr, 0, sizeof(struct msghdr));
+				msgs[i].msg_hdr.msg_iov = iovecs + i;
+				msgs[i].msg_hdr.msg_iovlen = 1;
+				msgs[i].msg_hdr.msg_control = control[i];
+				msgs[i].msg_hdr.msg_controllen = sizeof(control[i]);
+			}
+			if (want <= 0) {	// the ring is full; throw away one datagram
+				if (recvmmsg(rx_udp_socket, msgs, 1, MSG_DONTWAIT, NULL) == 1)
+					cap->dropped++;
+				break;
+			}
+			n = recvmmsg(rx_udp_socket, msgs, want, MSG_DONTWAIT, NULL);
+			if (n <= 0)
+				break;
+			for (i = 0; i < n; i++) {
+				slot = (head + i) & (UDP_RING_SIZE - 1);
+				cap->length[slot] = msgs[i].msg_len;
+				cap->time[slot] = 0;
+				for (cmsg = CMSG_FIRSTHDR(&msgs[i].msg_hdr); cmsg; cmsg = CMSG_NXTHDR(&msgs[i].msg_hdr, cmsg)) {
+					if (cmsg->cmsg_level == SOL_SOCKET && cmsg->cmsg_type == SCM_TIMESTAMPNS) {
+						ts = (struct timespec *)CMSG_DATA(cmsg);
+						cap->time[slot] = ts->tv_sec + ts->tv_nsec * 1E-9;
+					}
+				}
+			}
+			__atomic_store_n(&cap->head, head + n, __ATOMIC_RELEASE);
+			pthread_mutex_lock(&cap->mutex);
+			if (cap->waiting)
+				pthread_cond_signal(&cap->cond);
+			pthread_mutex_unlock(&cap->mutex);
+			if (n < want)
+				break;
+		}
+	}
+	return NULL;
+}
+
+static void udp_capture_start(void)
+{	// Start the capture thread.  This is called by the sound thread after the hardware starts sending samples.
+	struct udp_capture * cap = &UdpCapture;
+	int on = 1;
+
+	if (cap->started || rx_udp_socket == INVALID_SOCKET)
+		return;
+	if ( ! cap->data) {
+		cap->data = malloc(UDP_RING_SIZE * UDP_DATAGRAM_SIZE);
+		cap->length = (int *)malloc(UDP_RING_SIZE * sizeof(int));
+		cap->time = (double *)malloc(UDP_RING_SIZE * sizeof(double));
+	}
+	setsockopt(rx_udp_socket, SOL_SOCKET, SO_TIMESTAMPNS, &on, sizeof(on));
+	pthread_mutex_init(&cap->mutex, NULL);
+	pthread_cond_init(&cap->cond, NULL);
+	cap->head = cap->tail = 0;
+	cap->waiting = 0;
+	cap->dropped = 0;
+	cap->stop = 0;
+	if (pthread_create(&cap->thread, NULL, udp_capture_thread, cap) != 0) {
+		printf("Failure to start the UDP capture thread\n");
+		pthread_mutex_destroy(&cap->mutex);
+		pthread_cond_destroy(&cap->cond);
+		udp_capture = 0;
+		return;
+	}
+	cap->started = 1;
+}
+
+static void udp_capture_stop(void)
+{	// Stop the capture thread before the socket is closed.
+	struct udp_capture * cap = &UdpCapture;
+
+	if ( ! cap->started)
+		return;
+	cap->stop = 1;
+	pthread_join(cap->thread, NULL);
+	pthread_mutex_destroy(&cap->mutex);
+	pthread_cond_destroy(&cap->cond);
+	cap->started = 0;
+#if DEBUG_IO
+	printf("UDP capture thread dropped %d datagrams\n", cap->dropped);
+#endif
+}
+
+static ssize_t udp_capture_read(unsigned char * buf)
+{	// Copy the next datagram from the ring.  Wait up to 100 milliseconds.
+	struct udp_capture * cap = &UdpCapture;
+	struct timespec deadline;
+	unsigned int tail, slot;
+	ssize_t bytes;
+#if DEBUG_IO
+	static double time0 = 0;
+#endif
+
+	tail = cap->tail;
+	if (__atomic_load_n(&cap->head, __ATOMIC_ACQUIRE) == tail) {	// the ring is empty
+		clock_gettime(CLOCK_REALTIME, &deadline);
+		deadline.tv_nsec += 100000000;
+		if (deadline.tv_nsec >= 1000000000) {
+			deadline.tv_nsec -= 1000000000;
+			deadline.tv_sec++;
+		}
+		pthread_mutex_lock(&cap->mutex);
+		cap->waiting = 1;
+		while (__atomic_load_n(&cap->head, __ATOMIC_ACQUIRE) == tail)
+			if (pthread_cond_timedwait(&cap->cond, &cap->mutex, &deadline) != 0)
+				break;
+		cap->waiting = 0;
+		pthread_mutex_unlock(&cap->mutex);
+		if (__atomic_load_n(&cap->head, __ATOMIC_ACQUIRE) == tail)
+			return 0;
+	}
+	slot = tail & (UDP_RING_SIZE - 1);
+	bytes = cap->length[slot];
+	memcpy(buf, cap->data[slot], bytes);
+#if DEBUG_IO
+	if (time0 && cap->time[slot] - time0 > 0.020)
+		printf("UDP datagram arrived %.1f msec after the previous datagram\n", (cap->time[slot] - time0) * 1E3);
+	time0 = cap->time[slot];
+#endif
+	__atomic_store_n(&cap->tail, tail + 1, __ATOMIC_RELEASE);
+	return bytes;
+}
+
+static int udp_capture_flush(void)
+{	// Throw away all datagrams in the ring.  Return 0 if the capture thread is not running.
+	if ( ! UdpCapture.started)
+		return 0;
+	__atomic_store_n(&UdpCapture.tail, __atomic_load_n(&UdpCapture.head, __ATOMIC_ACQUIRE), __ATOMIC_RELEASE);
+	return 1;
+}
+#else
+static void udp_capture_start(void)
+{
+	udp_capture = 0;
+}
+
+static void udp_capture_stop(void)
+{
+}
+
+static ssize_t udp_capture_read(unsigned char * buf)
+{
+	return 0;
+}
+
+static int udp_capture_flush(void)
+{
+	return 0;
+}
+#endif
+
+static ssize_t udp_read_block(unsigned char * buf)
+{	// Read the next UDP datagram of samples into buf, which must have UDP_DATAGRAM_SIZE bytes.  Wait up to 100 milliseconds.
+	// Return the number of bytes, or 0 for a timeout, or -1 for an error.
+	struct timeval tm_wait;
+	fd_set fds;
+	int i;
+
+	if (udp_capture) {
+		udp_capture_start();
+		if (udp_capture)
+			return udp_capture_read(buf);
+	}
+	tm_wait.tv_sec = 0;
+	tm_wait.tv_usec = 100000; // Linux seems to have problems with very small time intervals
+	FD_ZERO (&fds);
+	FD_SET (rx_udp_socket, &fds);
+	i = select (rx_udp_socket + 1, &fds, NULL, NULL, &tm_wait);
+	if (i == 0)
+		return 0;
+	else if (i != 1)
+		return -1;
+	return recv(rx_udp_socket, (char *)buf, UDP_DATAGRAM_SIZE,  0);	// blocking read
+}
+
+static void udp_flush(void)
+{	// Throw away all pending datagrams.
+	unsigned char buf[UDP_DATAGRAM_SIZE];
+	struct timeval tm_wait;
+	fd_set fds;
+
+	if (udp_capture_flush())
+		return;
+	while (1) {
+		tm_wait.tv_sec = 0;
+		tm_wait.tv_usec = 0;
+		FD_ZERO (&fds);
+		FD_SET (rx_udp_socket, &fds);
+		if (select (rx_udp_socket + 1, &fds, NULL, NULL, &tm_wait) != 1)
+			break;
+		recv(rx_udp_socket, (char *)buf, UDP_DATAGRAM_SIZE,  0);
+	}
+}
+
+static void close_udp(void)
+{
+	short msg = 0x7373;		// shutdown
+
+	quisk_using_udp = 0;
+	udp_capture_stop();
+	if (rx_udp_socket != INVALID_SOCKET) {
+		shutdown(rx_udp_socket, QUISK_SHUT_RD);
+		send(rx_udp_socket, (char *)&msg, 2, 0);
+		send(rx_udp_socket, (char *)&msg, 2, 0);
 		QuiskSleepMicrosec(3000000);
 		close(rx_udp_socket);
 		rx_udp_socket = INVALID_SOCKET;
@@ -3071,6 +4028,7 @@ static void close_udp10(void)		// Metis-Hermes protocol
 	unsigned char buf[64];
 
 	quisk_using_udp = 0;
+	udp_capture_stop();
 	if (rx_udp_socket != INVALID_SOCKET) {
 		shutdown(rx_udp_socket, QUISK_SHUT_RD);
 		buf[0] = 0xEF;
@@ -3088,10 +4046,7 @@ static void close_udp10(void)		// Metis-Hermes protocol
 	}
 	quisk_rx_udp_started = 0;
 	quisk_multirx_state = 0;
-	if (bandscopePlan) {
-		fftw_destroy_plan(bandscopePlan);
-		bandscopePlan = NULL;
-	}
+	bandscopePlan = NULL;
 #ifdef MS_WINDOWS
 	if (cleanupWSA) {
 		cleanupWSA = 0;
@@ -3114,8 +4069,7 @@ static int quisk_read_rx_udp(complex double * samp)	// Read samples from UDP
 	ssize_t bytes;
 	unsigned char buf[1500];	// Maximum Ethernet is 1500 bytes.
 	static unsigned char seq0;	// must be 8 bits
-	int i, nSamples, xr, xi, index, want_samples;
-	unsigned char * ptxr, * ptxi;
+	int nSamples, want_samples;
 	struct timeval tm_wait;
 	fd_set fds;
 
@@ -3151,26 +4105,19 @@ static int quisk_read_rx_udp(complex double * samp)	// Read samples from UDP
 	nSamples = 0;
 	want_samples = (int)(quisk_sound_state.data_poll_usec * 1e-6 * quisk_sound_state.sample_rate + 0.5);
 	while (nSamples < want_samples) {		// read several UDP blocks
-		tm_wait.tv_sec = 0;
-		tm_wait.tv_usec = 100000; // Linux seems to have problems with very small time intervals
-		FD_ZERO (&fds);
-		FD_SET (rx_udp_socket, &fds);
-		i = select (rx_udp_socket + 1, &fds, NULL, NULL, &tm_wait);
-		if (i == 1)
-			;
-		else if (i == 0) {
+		bytes = udp_read_block(buf);
+		if (bytes == 0) {
 #if DEBUG_IO
 			printf("Udp socket timeout\n");
 #endif
 			return 0;
 		}
-		else {
+		else if (bytes < 0) {
 #if DEBUG_IO
-			printf("Udp select error %d\n", i);
+			printf("Udp select error %d\n", (int)bytes);
 #endif
 			return 0;
 		}
-		bytes = recv(rx_udp_socket, (char *)buf, 1500,  0);	// blocking read
 		if (bytes != RX_UDP_SIZE) {		// Known size of sample block
 			quisk_sound_state.read_error++;
 #if DEBUG_IO
@@ -3193,53 +4140,8 @@ static int quisk_read_rx_udp(complex double * samp)	// Read samples from UDP
 		quisk_set_key_down(buf[1] & 0x01);	// bit zero is key state
 		if (buf[1] & 0x02)					// bit one is ADC overrange
 			quisk_sound_state.overrange++;
-		index = 2;
-		ptxr = (unsigned char *)&xr;
-		ptxi = (unsigned char *)&xi;
-		// convert 24-bit samples to 32-bit samples; int must be 32 bits.
-		if (is_little_endian) {
-			while (index < bytes) {		// This works for 3, 2, 1 byte samples
-				xr = xi = 0;
-				memcpy (ptxr + (4 - sample_bytes), buf + index, sample_bytes);
-				index += sample_bytes;
-				memcpy (ptxi + (4 - sample_bytes), buf + index, sample_bytes);
-				index += sample_bytes;
-				samp[nSamples++] = (xr + xi * I) * rx_udp_gain_correct;
-				xr = xi = 0;
-				memcpy (ptxr + (4 - sample_bytes), buf + index, sample_bytes);
-				index += sample_bytes;
-				memcpy (ptxi + (4 - sample_bytes), buf + index, sample_bytes);
-				index += sample_bytes;
-				samp[nSamples++] = (xr + xi * I) * rx_udp_gain_correct;
-			}
-		}
-		else {		// big-endian
-			while (index < bytes) {		// This works for 3-byte samples only
-				*(ptxr    ) = buf[index + 2];
-				*(ptxr + 1) = buf[index + 1];
-				*(ptxr + 2) = buf[index    ];
-				*(ptxr + 3) = 0;
-				index += 3;
-				*(ptxi    ) = buf[index + 2];
-				*(ptxi + 1) = buf[index + 1];
-				*(ptxi + 2) = buf[index    ];
-				*(ptxi + 3) = 0;
-				index += 3;
-				samp[nSamples++] = (xr + xi * I) * rx_udp_gain_correct;;
-				*(ptxr    ) = buf[index + 2];
-				*(ptxr + 1) = buf[index + 1];
-				*(ptxr + 2) = buf[index    ];
-				*(ptxr + 3) = 0;
-				index += 3;
-				*(ptxi    ) = buf[index + 2];
-				*(ptxi + 1) = buf[index + 1];
-				*(ptxi + 2) = buf[index    ];
-				*(ptxi + 3) = 0;
-				index += 3;
-				samp[nSamples++] = (xr + xi * I) * rx_udp_gain_correct;;
-
-			}
-		}
+		// convert the little-endian samples after the two byte header
+		nSamples += quisk_unpack_iq(samp + nSamples, buf + 2, (bytes - 2) / (sample_bytes * 2), sample_bytes, 0, 0, rx_udp_gain_correct);
 	}
 	return nSamples;
 }
@@ -3248,8 +4150,6 @@ static int quisk_hermes_is_ready(int rx_udp_socket)
 {		// Start Hermes; return 1 when we are ready to receive data
 	unsigned char buf[1500];
 	int i, dummy;
-	struct timeval tm_wait;
-	fd_set fds;
 
 	if (rx_udp_socket == INVALID_SOCKET)
 		return 0;
@@ -3281,15 +4181,7 @@ static int quisk_hermes_is_ready(int rx_udp_socket)
 		return 0;
 	case 2:
 	case 22:
-		while (1) {
-			tm_wait.tv_sec = 0;			// throw away all pending records
-			tm_wait.tv_usec = 0;
-			FD_ZERO (&fds);
-			FD_SET (rx_udp_socket, &fds);
-			if (select (rx_udp_socket + 1, &fds, NULL, NULL, &tm_wait) != 1)
-				break;
-			recv(rx_udp_socket, (char *)buf, 1500,  0);
-		}
+		udp_flush();			// throw away all pending records
 		// change to state 3 for startup
 		// change to state 23 for temporary shutdown
 		quisk_multirx_state++;
@@ -3347,10 +4239,7 @@ static int read_rx_udp10(complex double * samp)	// Read samples from UDP using t
 	static unsigned int seq0;
 	static int tx_records;
 	static int max_multirx_count=0;
-	int i, j, nSamples, xr, xi, index, start, want_samples, dindex, num_records;
-	complex double c;
-	struct timeval tm_wait;
-	fd_set fds;
+	int i, j, nSamples, index, start, stride, want_samples, dindex, num_records;
 
 	if ( ! quisk_hermes_is_ready(rx_udp_socket)) {
 		seq0 = 0;
@@ -3380,26 +4269,19 @@ static int read_rx_udp10(complex double * samp)	// Read samples from UDP using t
 		}
 	}
 	while (nSamples < want_samples) {		// read several UDP blocks
-		tm_wait.tv_sec = 0;
-		tm_wait.tv_usec = 100000; // Linux seems to have problems with very small time intervals
-		FD_ZERO (&fds);
-		FD_SET (rx_udp_socket, &fds);
-		i = select (rx_udp_socket + 1, &fds, NULL, NULL, &tm_wait);		// blocking wait
-		if (i == 1)
-			;
-		else if (i == 0) {
+		bytes = udp_read_block(buf);
+		if (bytes == 0) {
 #if DEBUG_IO
 			printf("Udp socket timeout\n");
 #endif
 			return 0;
 		}
-		else {
+		else if (bytes < 0) {
 #if DEBUG_IO
-			printf("Udp select error %d\n", i);
+			printf("Udp select error %d\n", (int)bytes);
 #endif
 			return 0;
 		}
-		bytes = recv(rx_udp_socket, (char *)buf, 1500,  0);			// blocking read
 		if (bytes != 1032 || buf[0] != 0xEF || buf[1] != 0xFE || buf[2] != 0x01) {		// Known size of sample block
 			quisk_sound_state.read_error++;
 #if DEBUG_IO
@@ -3511,24 +4393,19 @@ static int read_rx_udp10(complex double * samp)	// Read samples from UDP using t
 				hermes_count_current++;
 			}
 			// convert 24-bit samples to 32-bit samples; int must be 32 bits.
+			// Each record has big-endian Q and I samples for each receiver, then two bytes of microphone samples.
 			index = start + 5;
-			for (i = 0; i < num_records; i++) {		// read records
-				xi = buf[index    ] << 24 | buf[index + 1] << 16 | buf[index + 2] << 8;
-				xr = buf[index + 3] << 24 | buf[index + 4] << 16 | buf[index + 5] << 8;
-				samp[nSamples] = xr + xi * I;		// first receiver
+			stride = (quisk_multirx_count + 1) * 6 + 2;
+			quisk_unpack_iq(samp + nSamples, buf + index, num_records, 3, stride,
+				QUISK_UNPACK_BIG_ENDIAN | QUISK_UNPACK_QI, 1.0);		// first receiver
+			for (j = 0; j < quisk_multirx_count; j++) {		// multirx receivers
 				index += 6;
-				for (j = 0; j < quisk_multirx_count; j++) {		// multirx receivers
-					xi = buf[index    ] << 24 | buf[index + 1] << 16 | buf[index + 2] << 8;
-					xr = buf[index + 3] << 24 | buf[index + 4] << 16 | buf[index + 5] << 8;
-					c = xr + xi * I;
-					multirx_cSamples[j][nSamples] = c;
-					if (multirx_fft_data[j].index < multirx_fft_width)
-						multirx_fft_data[j].samples[multirx_fft_data[j].index++] = c;
-					index += 6;
-				}
-				nSamples++;
-				index += 2;
+				quisk_unpack_iq(multirx_cSamples[j] + nSamples, buf + index, num_records, 3, stride,
+					QUISK_UNPACK_BIG_ENDIAN | QUISK_UNPACK_QI, 1.0);
+				for (i = 0; i < num_records && multirx_fft_data[j].index < multirx_fft_width; i++)
+					multirx_fft_data[j].samples[multirx_fft_data[j].index++] = multirx_cSamples[j][nSamples + i];
 			}
+			nSamples += num_records;
 		}
 	}
 	if ((quisk_pc_to_hermes[3] >> 3 & 0x7) != quisk_multirx_count &&	// change in number of receivers
@@ -3554,9 +4431,9 @@ static int read_rx_udp17(complex double * cSamples0)	// Read samples from UDP
 	ssize_t bytes;
 	unsigned char buf[1500];	// Maximum Ethernet is 1500 bytes.
 	static unsigned char seq0;	// must be 8 bits
-	int i, n, nSamples0, xr, xi, index, want_samples, key_down;
+	int n, k, count, nSamples0, xr, xi, want_samples, key_down;
 	complex double sample;
-	unsigned char * ptxr, * ptxi;
+	complex double samples[RX_UDP_SIZE / 6];
 	struct timeval tm_wait;
 	fft_data * ptFFT;
 	fd_set fds;
@@ -3596,26 +4473,19 @@ static int read_rx_udp17(complex double * cSamples0)	// Read samples from UDP
 	want_samples = (int)(quisk_sound_state.data_poll_usec * 1e-6 * quisk_sound_state.sample_rate + 0.5);
 	key_down = quisk_is_key_down();
 	while (nSamples0 < want_samples) {		// read several UDP blocks
-		tm_wait.tv_sec = 0;
-		tm_wait.tv_usec = 100000; // Linux seems to have problems with very small time intervals
-		FD_ZERO (&fds);
-		FD_SET (rx_udp_socket, &fds);
-		i = select (rx_udp_socket + 1, &fds, NULL, NULL, &tm_wait);
-		if (i == 1)
-			;
-		else if (i == 0) {
+		bytes = udp_read_block(buf);
+		if (bytes == 0) {
 #if DEBUG_IO || DEBUG
 			printf("Udp socket timeout\n");
 #endif
 			return 0;
 		}
-		else {
+		else if (bytes < 0) {
 #if DEBUG_IO || DEBUG
-			printf("Udp select error %d\n", i);
+			printf("Udp select error %d\n", (int)bytes);
 #endif
 			return 0;
 		}
-		bytes = recv(rx_udp_socket, (char *)buf, 1500,  0);	// blocking read
 		if (bytes != RX_UDP_SIZE) {		// Known size of sample block
 			quisk_sound_state.read_error++;
 #if DEBUG_IO || DEBUG
@@ -3638,32 +4508,12 @@ static int read_rx_udp17(complex double * cSamples0)	// Read samples from UDP
 		//quisk_set_key_down(buf[1] & 0x01);	// bit zero is key state
 		if (buf[1] & 0x02)					// bit one is ADC overrange
 			quisk_sound_state.overrange++;
-		index = 2;
-		ptxr = (unsigned char *)&xr;
-		ptxi = (unsigned char *)&xi;
-		// convert 24-bit samples to 32-bit samples; int must be 32 bits.
-		while (index < bytes) {
-			if (is_little_endian) {
-				xr = xi = 0;
-				memcpy (ptxr + 1, buf + index, 3);
-				index += 3;
-				memcpy (ptxi + 1, buf + index, 3);
-				index += 3;
-				sample = (xr + xi * I) * rx_udp_gain_correct;
-			}
-			else {		// big-endian
-				*(ptxr    ) = buf[index + 2];
-				*(ptxr + 1) = buf[index + 1];
-				*(ptxr + 2) = buf[index    ];
-				*(ptxr + 3) = 0;
-				index += 3;
-				*(ptxi    ) = buf[index + 2];
-				*(ptxi + 1) = buf[index + 1];
-				*(ptxi + 2) = buf[index    ];
-				*(ptxi + 3) = 0;
-				index += 3;
-				sample = (xr + xi * I) * rx_udp_gain_correct;
-			}
+		// convert the little-endian 24-bit samples to 32-bit samples.  The low bits are channel markers.
+		count = quisk_unpack_iq(samples, buf + 2, (bytes - 2) / 6, 3, 0, 0, 1.0);
+		for (k = 0; k < count; k++) {
+			xr = (int)creal(samples[k]);
+			xi = (int)cimag(samples[k]);
+			sample = samples[k] * rx_udp_gain_correct;
 			if (xr & 0x100) {		// channel 1
 				if (quisk_invert_spectrum)		// Invert spectrum
 					sample = conj(sample);
@@ -3699,6 +4549,7 @@ static int read_rx_udp17(complex double * cSamples0)	// Read samples from UDP
 						fft_data_array[n].index = 0;
 						fft_data_array[n].block = 0;
 						fft_data_array[fft_data_index].filled = 1;	// Mark the previous buffer ready.
+						spectrum_worker_signal();
 						fft_data_index = n;							// Write samples into the new buffer.
 						ptFFT = fft_data_array + fft_data_index;
 					}
@@ -3854,7 +4705,11 @@ static PyObject * close_sound(PyObject * self, PyObject * args)
 		return NULL;
 	quisk_close_mic();
 	quisk_close_sound();
+	sound_is_started = 0;
 	quisk_close_key();
+	rx_worker_close();
+	spectrum_worker_close();
+	PlanWisdomSave();
 #if SAMPLES_FROM_FILE
     QuiskWavClose(&hWav);
 #endif
@@ -3916,6 +4771,7 @@ static PyObject * start_sound(PyObject * self, PyObject * args)
 	if (!PyArg_ParseTuple (args, ""))
 		return NULL;
 	quisk_start_sound();
+	sound_is_started = 1;
 	Py_INCREF (Py_None);
 	return Py_None;
 }
@@ -4230,6 +5086,7 @@ static PyObject * set_filters(PyObject * self, PyObject * args)
 		Py_XDECREF(obj);
 	}
 	sizeFilter = size;
+	filter_generation[nFilter]++;
 	Py_INCREF (Py_None);
 	return Py_None;
 }
@@ -4465,31 +5322,88 @@ static PyObject * set_multirx_play_channel(PyObject * self, PyObject * args)
 	return Py_None;
 }
 
-static PyObject * get_multirx_graph(PyObject * self, PyObject * args)	// Called by the GUI thread
+static int GraphBufferGet(PyObject * buffer, Py_buffer * view)
+{	// Get a writable view of a caller-supplied buffer for graph data.  Return zero for success.
+	if ( ! PyObject_CheckBuffer(buffer)) {
+		PyErr_SetString (QuiskError, "The graph buffer must support the buffer protocol.");
+		return -1;
+	}
+	if (PyObject_GetBuffer(buffer, view, PyBUF_CONTIG | PyBUF_FORMAT) != 0)
+		return -1;
+	return 0;
+}
+
+static PyObject * GraphBufferFill(Py_buffer * view, double * values, int count)
+{	// Copy graph values into the buffer and return the count.  The buffer items are double, or float if
+	// the format is "f".  A buffer of bytes such as a bytearray receives doubles in native byte order.
+	int i;
+	const char * format;
+	float * ptFloat;
+
+	format = view->format;
+	if (format && (*format == '@' || *format == '=' ||
+			(*format == '<' && is_little_endian) || (*format == '>' && ! is_little_endian)))
+		format++;
+	if (format && strcmp(format, "f") == 0) {
+		if (view->len < count * (Py_ssize_t)sizeof(float)) {
+			PyErr_SetString (QuiskError, "The graph buffer is too small.");
+			return NULL;
+		}
+		ptFloat = (float *)view->buf;
+		for (i = 0; i < count; i++)
+			ptFloat[i] = (float)values[i];
+	}
+	else if ( ! format || strcmp(format, "d") == 0 || strcmp(format, "B") == 0 ||
+			strcmp(format, "b") == 0 || strcmp(format, "c") == 0) {
+		if (view->len < count * (Py_ssize_t)sizeof(double)) {
+			PyErr_SetString (QuiskError, "The graph buffer is too small.");
+			return NULL;
+		}
+		memcpy(view->buf, values, count * sizeof(double));
+	}
+	else {
+		PyErr_SetString (QuiskError, "The graph buffer must contain double, float or bytes.");
+		return NULL;
+	}
+	return PyInt_FromLong(count);
+}
+
+static PyObject * GraphValues(double * values, int count, Py_buffer * view)
+{	// Return the graph values as a tuple of floats; or if view is not NULL, copy them into the buffer.
+	int i;
+	PyObject * tuple2;
+
+	if (view)
+		return GraphBufferFill(view, values, count);
+	tuple2 = PyTuple_New(count);
+	for (i = 0; i < count; i++)
+		PyTuple_SetItem(tuple2, i, PyFloat_FromDouble(values[i]));
+	return tuple2;
+}
+
+static PyObject * GetMultirxGraph(Py_buffer * view)
 {
 	int i, j, k;
 	double d1, d2, scale;
 	static double * fft_window=NULL;		// Window for FFT data
+	static double * graph=NULL;				// The graph data
 	PyObject * retrn, * data;
 	static double time0=0;			// time of last graph
 
-	if (!PyArg_ParseTuple (args, ""))
-		return NULL;
 	if ( ! fft_window) {
 		// Create the fft window
 		fft_window = (double *) malloc(sizeof(double) * multirx_fft_width);
 		for (i = 0, j = -multirx_fft_width / 2; i < multirx_fft_width; i++, j++)
 			fft_window[i] = 0.5 + 0.5 * cos(2. * M_PI * j / multirx_fft_width);	// Hanning
+		graph = (double *) malloc(sizeof(double) * multirx_data_width);
 	}
-	retrn = PyTuple_New(2);
 	if (multirx_fft_next_state == 1 && QuiskTimeSec() - time0 >= multirx_fft_next_time) {
 		time0 = QuiskTimeSec();
 		// The FFT is ready to run.  Calculate FFT.
 		for (i = 0; i < multirx_fft_width; i++)		// multiply by window
 			multirx_fft_next_samples[i] *= fft_window[i];
-		fftw_execute(multirx_fft_next_plan);
+		fftw_execute_dft(multirx_fft_next_plan, multirx_fft_next_samples, multirx_fft_next_samples);
 		// Average the fft data into the graph in order of frequency
-		data = PyTuple_New(multirx_data_width);
 		scale = log10(multirx_fft_width) + 31.0 * log10(2.0);
 		scale *= 20.0;
 		j = MULTIRX_FFT_MULT;
@@ -4501,7 +5415,7 @@ static PyObject * get_multirx_graph(PyObject * self, PyObject * args)	// Called
 				d2 = 20.0 * log10(d1) - scale;
 				if (d2 < -200)
 					d2 = -200;
-				PyTuple_SetItem(data, k++, PyFloat_FromDouble(d2));
+				graph[k++] = d2;
 				d1 = 0;
 				j = MULTIRX_FFT_MULT;
 			}
@@ -4512,36 +5426,59 @@ static PyObject * get_multirx_graph(PyObject * self, PyObject * args)	// Called
 				d2 = 20.0 * log10(d1) - scale;
 				if (d2 < -200)
 					d2 = -200;
-				PyTuple_SetItem(data, k++, PyFloat_FromDouble(d2));
+				graph[k++] = d2;
 				d1 = 0;
 				j = MULTIRX_FFT_MULT;
 			}
 		}
+		multirx_fft_next_state = 2;			// This FFT is done.
+		data = GraphValues(graph, multirx_data_width, view);
+		if ( ! data)
+			return NULL;
+		retrn = PyTuple_New(2);
 		PyTuple_SetItem(retrn, 0, data);
 		PyTuple_SetItem(retrn, 1, PyInt_FromLong(multirx_fft_next_index));
-		multirx_fft_next_state = 2;			// This FFT is done.
 	}
 	else {
-		data = PyTuple_New(0);
-		PyTuple_SetItem(retrn, 0, data);
+		retrn = PyTuple_New(2);
+		if (view)
+			PyTuple_SetItem(retrn, 0, PyInt_FromLong(0));
+		else
+			PyTuple_SetItem(retrn, 0, PyTuple_New(0));
 		PyTuple_SetItem(retrn, 1, PyInt_FromLong(-1));
 	}
 	return retrn;
 }
 
-static PyObject * get_bandscope(PyObject * self, PyObject * args)	// Called by the GUI thread
+static PyObject * get_multirx_graph(PyObject * self, PyObject * args)	// Called by the GUI thread
+{	// Return a tuple (data, index).  If a buffer is passed, the data is written to the buffer and data is its count.
+	PyObject * buffer = NULL;
+	PyObject * retrn;
+	Py_buffer view;
+
+	if (!PyArg_ParseTuple (args, "|O", &buffer))
+		return NULL;
+	if ( ! buffer)
+		return GetMultirxGraph(NULL);
+	if (GraphBufferGet(buffer, &view) != 0)
+		return NULL;
+	retrn = GetMultirxGraph(&view);
+	PyBuffer_Release(&view);
+	return retrn;
+}
+
+static PyObject * GetBandscope(int clock, double zoom, double deltaf, Py_buffer * view)
 {
-	int i, j, j1, j2, L, clock;
-	double zoom, deltaf, rate, f1;
+	int i, j, j1, j2, L;
+	double rate, f1;
 	static int fft_count = 0;
 	static double the_max = 0;
 	static double time0=0;			// time of last graph
+	static double * graph = NULL;	// The graph data
+	static int graph_size = 0;		// The size of graph
 	double d1, d2, sample, frac, scale;
 	PyObject * tuple2;
 
-	if (!PyArg_ParseTuple (args, "idd", &clock, &zoom, &deltaf))
-		return NULL;
-
 	if (bandscopeState == 99 && bandscopePlan) {	// bandscope samples are ready
 		for (i = 0; i < bandscope_size; i++) {
 			d1 = fabs(bandscopeSamples[i]);
@@ -4549,7 +5486,7 @@ static PyObject * get_bandscope(PyObject * self, PyObject * args)	// Called by t
 				the_max = d1;
 			bandscopeSamples[i] *= bandscopeWindow[i];	// multiply by window
 		}
-		fftw_execute(bandscopePlan);		// Calculate forward FFT
+		fftw_execute_dft_r2c(bandscopePlan, bandscopeSamples, bandscopeFFT);		// Calculate forward FFT
 		// The return FFT has length bandscope_size / 2 + 1
 		L = bandscope_size / 2 + 1;
 		for (i = 0; i < L; i++)
@@ -4559,7 +5496,12 @@ static PyObject * get_bandscope(PyObject * self, PyObject * args)	// Called by t
 		if (QuiskTimeSec() - time0 >= 1.0 / graph_refresh) {	// return FFT data
 			bandscopeAverage[L] = 0.0;	// in case we run off the end
 			// Average the return FFT into the data width
-			tuple2 = PyTuple_New(graph_width);
+			if (graph_size != graph_width) {
+				graph_size = graph_width;
+				if (graph)
+					free(graph);
+				graph = (double *)malloc(graph_size * sizeof(double));
+			}
 			frac = (double)L / graph_width;
 			scale = 1.0 / frac / fft_count / bandscope_size;
 			rate = clock / 2.0;
@@ -4584,8 +5526,9 @@ static PyObject * get_bandscope(PyObject * self, PyObject * args)	// Called by t
 					sample = -200.0;
 				else
 					sample = 20.0 * log10(sample);
-				PyTuple_SetItem(tuple2, i, PyFloat_FromDouble(sample));
+				graph[i] = sample;
 			}
+			tuple2 = GraphValues(graph, graph_width, view);
 			fft_count = 0;
 			time0 = QuiskTimeSec();
 			hermes_adc_level = the_max;
@@ -4599,165 +5542,500 @@ static PyObject * get_bandscope(PyObject * self, PyObject * args)	// Called by t
 	return Py_None;
 }
 
-static PyObject * get_graph(PyObject * self, PyObject * args)	// Called by the GUI thread
-{
-	int i, j, k, m, n, index, ffts, ii, mm, m0, deltam;
-	fft_data * ptFft;
-	PyObject * tuple2;
-	double d1, d2, scale, zoom, deltaf;
-	complex double c;
-	static double meter = 0;		// RMS s-meter
-	static int use_fft = 1;			// Use the FFT, or return raw data
-	static double * fft_avg=NULL;	// Array to average the FFT
-	static double * fft_tmp;
-	static int count_fft=0;			// how many fft's have occurred (for average)
-	static double time0=0;			// time of last graph
+static PyObject * get_bandscope(PyObject * self, PyObject * args)	// Called by the GUI thread
+{	// Return a tuple of bandscope data or None.  If a buffer is passed, the data is written to the buffer and the count is returned.
+	int clock;
+	double zoom, deltaf;
+	PyObject * buffer = NULL;
+	PyObject * retrn;
+	Py_buffer view;
 
-	if (!PyArg_ParseTuple (args, "idd", &k, &zoom, &deltaf))
+	if (!PyArg_ParseTuple (args, "idd|O", &clock, &zoom, &deltaf, &buffer))
 		return NULL;
-	if (k != use_fft) {		// change in data return type; re-initialize
-		use_fft = k;
-		count_fft = 0;
-	}
-	if ( ! fft_avg) {
-		fft_avg = (double *) malloc(sizeof(double) * fft_size);
-		fft_tmp = (double *) malloc(sizeof(double) * fft_size);
+	if ( ! buffer)
+		return GetBandscope(clock, zoom, deltaf, NULL);
+	if (GraphBufferGet(buffer, &view) != 0)
+		return NULL;
+	retrn = GetBandscope(clock, zoom, deltaf, &view);
+	PyBuffer_Release(&view);
+	return retrn;
+}
+
+// These are used to average the FFT blocks into the graph.  The blocks are processed either by
+// the GUI thread in get_graph(), or by the spectrum worker thread.
+static double graph_meter;		// RMS s-meter
+static double * graph_fft_avg;		// Array to average the FFT
+static double * graph_fft_tmp;
+static int graph_count_fft;		// how many fft's have occurred (for average)
+static double graph_time0;		// time of last graph
+
+static void GraphAddBlock(fft_data * ptFft)
+{	// Calculate the FFT of a filled block and add it to the average.  Then mark the block empty.
+	int i, j, k, m, n, ii, mm, m0, deltam;
+	double d1, d2;
+	complex double c;
+
+	if ( ! graph_fft_avg) {
+		graph_fft_avg = (double *) malloc(sizeof(double) * fft_size);
+		graph_fft_tmp = (double *) malloc(sizeof(double) * fft_size);
 		for (i = 0; i < fft_size; i++)
-			fft_avg[i] = 0;
+			graph_fft_avg[i] = 0;
+	}
+	for (i = 0; i < fft_size; i++)		// multiply by window
+		ptFft->samples[i] *= fft_window[i];
+	fftw_execute_dft(quisk_fft_plan, ptFft->samples, ptFft->samples);	// Calculate FFT
+	// Create RMS s-meter value at known bandwidth
+	// The pass band is (rx_tune_freq + filter_start_offset) to += bandwidth
+	// d1 is the tune frequency
+	// d2 is the number of FFT bins required for the bandwidth
+	// i is the starting bin number from  - sample_rate / 2 to + sample_rate / 2
+	d2 = (double)filter_bandwidth[0] * fft_size / fft_sample_rate;
+	if (scan_blocks) {    // Use tx, not rx?? ERROR:
+		d1 = ((double)quisk_tx_tune_freq + vfo_screen - scan_vfo0 - scan_deltaf * ptFft->block) * fft_size / scan_sample_rate;
+		i = (int)(d1 - d2 / 2 + 0.5);
 	}
-	// Process all FFTs that are ready to run.
+	else
+		i = (int)((double)(rx_tune_freq + filter_start_offset) * fft_size / fft_sample_rate + 0.5);
+	n = (int)(floor(d2) + 0.01);		// number of whole bins to add
+	if (i > - fft_size / 2 && i + n + 1 < fft_size / 2) {	// too close to edge?
+		for (j = 0; j < n; i++, j++) {
+			if (i < 0)
+				c = ptFft->samples[fft_size + i];	// negative frequencies
+			else
+				c = ptFft->samples[i];				// positive frequencies
+			graph_meter = graph_meter + c * conj(c);		// add square of amplitude
+		}
+		if (i < 0)			// add fractional next bin
+			c = ptFft->samples[fft_size + i];
+		else
+			c = ptFft->samples[i];
+		graph_meter = graph_meter + c * conj(c) * (d2 - n);	// fractional part of next bin
+	}
+	// Average the fft data into the graph in order of frequency
+	if (scan_blocks) {
+		if (ptFft->block == (scan_blocks - 1))
+			graph_count_fft++;
+		k = 0;
+		for (i = fft_size / 2; i < fft_size; i++)			// Negative frequencies
+			graph_fft_tmp[k++] = cabs(ptFft->samples[i]);
+		for (i = 0; i < fft_size / 2; i++)					// Positive frequencies
+			graph_fft_tmp[k++] = cabs(ptFft->samples[i]);
+		// Average this block into its correct position
+		m0 = (int)(fft_size * ((1.0 - scan_valid) / 2.0));
+		deltam = (int)(fft_size * scan_valid / scan_blocks);
+		m = mm = m0 + ptFft->block * deltam;						// target position
+		i = ii = (int)(fft_size * ((1.0 - scan_valid) / 2.0));	// start of valid data
+		for (j = 0; j < deltam; j++) {
+			d2 = 0;
+			for (n = 0; n < scan_blocks; n++)
+				d2 += graph_fft_tmp[i++];
+			graph_fft_avg[m++] = d2;
+		}
+		//printf(" %d %.4lf At %5d to %5d place %5d to %5d for block %d\n", fft_size, scan_valid, mm, m, ii, i, ptFft->block);
+	}
+	else {
+		graph_count_fft++;
+		k = 0;
+		for (i = fft_size / 2; i < fft_size; i++)			// Negative frequencies
+			graph_fft_avg[k++] += cabs(ptFft->samples[i]);
+		for (i = 0; i < fft_size / 2; i++)					// Positive frequencies
+			graph_fft_avg[k++] += cabs(ptFft->samples[i]);
+	}
+	ptFft->filled = 0;
+}
+
+static int GraphReady(void)
+{	// Return 1 if we have averaged enough fft's to return the graph data.
+	return graph_count_fft > 0 && QuiskTimeSec() - graph_time0 >= 1.0 / graph_refresh;
+}
+
+static void GraphFinish(double zoom, double deltaf, double * graph)
+{	// Average the fft data of size fft_size into the size of data_width, convert to dB and write it to graph.
+	int i, j, k, n;
+	double d2, scale;
+
+	n = (int)(zoom * (double)fft_size / data_width + 0.5);
+	if (n < 1)
+		n = 1;
+	for (i = 0; i < data_width; i++) {	// For each graph pixel
+		// find k, the starting index into the FFT data
+		k = (int)(fft_size * (
+			deltaf / fft_sample_rate + zoom * ((double)i / data_width - 0.5) + 0.5) + 0.1);
+		d2 = 0.0;
+		for (j = 0; j < n; j++, k++)
+			if (k >= 0 && k < fft_size)
+				d2 += graph_fft_avg[k];
+		graph_fft_avg[i] = d2;
+	}
+	scale = 1.0 / 2147483647.0 / fft_size;
+	Smeter = graph_meter * scale * scale / graph_count_fft;		// record the new s-meter value
+	graph_meter = 0;
+	if (Smeter > 0)
+		Smeter = 10.0 * log10(Smeter);
+	else
+		Smeter = -160.0;
+	// This correction is for a -40 dB strong signal, and is caused by FFT leakage
+	// into adjacent bins. It is the amplitude that is spread out, not the squared amplitude.
+	Smeter += 4.25969;
+	// scale = 1.0 / count_fft / fft_size;	// Divide by sample count
+	// scale /= pow(2.0, 31);			// Normalize to max == 1
+	scale = log10(graph_count_fft) + log10(fft_size) + 31.0 * log10(2.0);
+	scale *= 20.0;
+	for (i = 0; i < data_width; i++) {
+		d2 = 20.0 * log10(graph_fft_avg[i]) - scale;
+		if (d2 < -200)
+			d2 = -200;
+		graph[i] = d2;
+	}
+	for (i = 0; i < fft_size; i++)
+		graph_fft_avg[i] = 0;
+	graph_count_fft = 0;
+	graph_time0 = QuiskTimeSec();
+}
+
+static fft_data * GraphNextBlock(void)
+{	// Return the oldest filled FFT block, or NULL.  Reject scan blocks that are out of range.
+	int index, ffts;
+	fft_data * ptFft;
+
 	index = fft_data_index;		// oldest data first - FIFO
 	for (ffts = 0; ffts < FFT_ARRAY_SIZE; ffts++) {
 		if (++index >= FFT_ARRAY_SIZE)
 			index = 0;
-		if (fft_data_array[index].filled)
-			ptFft = fft_data_array + index;
-		else
+		if ( ! fft_data_array[index].filled)
 			continue;
+		ptFft = fft_data_array + index;
 		if (scan_blocks && ptFft->block >= scan_blocks) {
 			//printf("Reject block %d\n", ptFft->block);
 			ptFft->filled = 0;
 			continue;
 		}
-		if ( ! use_fft) {		// return raw data, not FFT
-			tuple2 = PyTuple_New(data_width);
-			for (i = 0; i < data_width; i++)
-				PyTuple_SetItem(tuple2, i,
-					PyComplex_FromDoubles(creal(ptFft->samples[i]), cimag(ptFft->samples[i])));
-			ptFft->filled = 0;
-			return tuple2;
-		}
-		// Continue with FFT calculation
-		for (i = 0; i < fft_size; i++)		// multiply by window
-			ptFft->samples[i] *= fft_window[i];
-		fftw_execute_dft(quisk_fft_plan, ptFft->samples, ptFft->samples);	// Calculate FFT
-		// Create RMS s-meter value at known bandwidth
-		// The pass band is (rx_tune_freq + filter_start_offset) to += bandwidth
-		// d1 is the tune frequency
-		// d2 is the number of FFT bins required for the bandwidth
-		// i is the starting bin number from  - sample_rate / 2 to + sample_rate / 2
-		d2 = (double)filter_bandwidth[0] * fft_size / fft_sample_rate;
-		if (scan_blocks) {    // Use tx, not rx?? ERROR:
-			d1 = ((double)quisk_tx_tune_freq + vfo_screen - scan_vfo0 - scan_deltaf * ptFft->block) * fft_size / scan_sample_rate;
-			i = (int)(d1 - d2 / 2 + 0.5);
-		}
-		else
-			i = (int)((double)(rx_tune_freq + filter_start_offset) * fft_size / fft_sample_rate + 0.5);
-		n = (int)(floor(d2) + 0.01);		// number of whole bins to add
-		if (i > - fft_size / 2 && i + n + 1 < fft_size / 2) {	// too close to edge?
-			for (j = 0; j < n; i++, j++) {
-				if (i < 0)
-					c = ptFft->samples[fft_size + i];	// negative frequencies
-				else
-					c = ptFft->samples[i];				// positive frequencies
-				meter = meter + c * conj(c);		// add square of amplitude
-			}
-			if (i < 0)			// add fractional next bin
-				c = ptFft->samples[fft_size + i];
-			else
-				c = ptFft->samples[i];
-			meter = meter + c * conj(c) * (d2 - n);	// fractional part of next bin
-		}
-		// Average the fft data into the graph in order of frequency
-		if (scan_blocks) {
-			if (ptFft->block == (scan_blocks - 1))
-				count_fft++;
-			k = 0;
-			for (i = fft_size / 2; i < fft_size; i++)			// Negative frequencies
-				fft_tmp[k++] = cabs(ptFft->samples[i]);
-			for (i = 0; i < fft_size / 2; i++)					// Positive frequencies
-				fft_tmp[k++] = cabs(ptFft->samples[i]);
-			// Average this block into its correct position
-			m0 = (int)(fft_size * ((1.0 - scan_valid) / 2.0));
-			deltam = (int)(fft_size * scan_valid / scan_blocks);
-			m = mm = m0 + ptFft->block * deltam;						// target position
-			i = ii = (int)(fft_size * ((1.0 - scan_valid) / 2.0));	// start of valid data
-			for (j = 0; j < deltam; j++) {
-				d2 = 0;
-				for (n = 0; n < scan_blocks; n++)
-					d2 += fft_tmp[i++];
-				fft_avg[m++] = d2;
+		return ptFft;
+	}
+	return NULL;
+}
+
+#ifdef QUISK_RX_THREADS
+// The spectrum worker thread calculates the FFTs for the graph as the blocks are filled, and
+// publishes the finished graph in a double buffer.  The GUI thread only copies the graph.
+static struct spectrum_worker {
+	pthread_t thread;
+	pthread_mutex_t mutex;		// protects the fields below and the cond
+	pthread_cond_t cond;		// signaled when an FFT block is filled
+	pthread_mutex_t block_mutex;	// held while the worker uses the FFT blocks and the average
+	double * graph[2];		// graph[front] is the newest finished graph
+	int front;
+	int ready;			// graph[front] has not been returned yet
+	int pending;			// an FFT block was filled
+	double zoom;			// zoom and deltaf of the last get_graph() call
+	double deltaf;
+	int started;
+	int stop;
+} SpectrumWorker;
+
+static void * spectrum_worker_thread(void * arg)
+{
+	struct spectrum_worker * worker = (struct spectrum_worker *)arg;
+	fft_data * ptFft;
+	double zoom, deltaf;
+	int back, stop;
+
+	while (1) {
+		pthread_mutex_lock(&worker->mutex);
+		while ( ! worker->pending && ! worker->stop)
+			pthread_cond_wait(&worker->cond, &worker->mutex);
+		worker->pending = 0;
+		zoom = worker->zoom;
+		deltaf = worker->deltaf;
+		back = 1 - worker->front;
+		stop = worker->stop;
+		pthread_mutex_unlock(&worker->mutex);
+		if (stop)
+			break;
+		pthread_mutex_lock(&worker->block_mutex);
+		if (graph_use_fft) {
+			while ((ptFft = GraphNextBlock()))
+				GraphAddBlock(ptFft);
+			if (GraphReady()) {
+				GraphFinish(zoom, deltaf, worker->graph[back]);
+				pthread_mutex_lock(&worker->mutex);
+				worker->front = back;
+				worker->ready = 1;
+				pthread_mutex_unlock(&worker->mutex);
 			}
-			//printf(" %d %.4lf At %5d to %5d place %5d to %5d for block %d\n", fft_size, scan_valid, mm, m, ii, i, ptFft->block);
 		}
-		else {
-			count_fft++;
-			k = 0;
-			for (i = fft_size / 2; i < fft_size; i++)			// Negative frequencies
-				fft_avg[k++] += cabs(ptFft->samples[i]);
-			for (i = 0; i < fft_size / 2; i++)					// Positive frequencies
-				fft_avg[k++] += cabs(ptFft->samples[i]);
-		}
-		ptFft->filled = 0;
-		if (count_fft > 0 && QuiskTimeSec() - time0 >= 1.0 / graph_refresh) {
-			// We have averaged enough fft's to return the graph data.
-			// Average the fft data of size fft_size into the size of data_width.
-			n = (int)(zoom * (double)fft_size / data_width + 0.5);
-			if (n < 1)
-				n = 1;
-			for (i = 0; i < data_width; i++) {	// For each graph pixel
-				// find k, the starting index into the FFT data
-				k = (int)(fft_size * (
-					deltaf / fft_sample_rate + zoom * ((double)i / data_width - 0.5) + 0.5) + 0.1);
-				d2 = 0.0;
-				for (j = 0; j < n; j++, k++)
-					if (k >= 0 && k < fft_size)
-						d2 += fft_avg[k];
-				fft_avg[i] = d2;
+		pthread_mutex_unlock(&worker->block_mutex);
+	}
+	return NULL;
+}
+
+static int spectrum_worker_start(double zoom, double deltaf)
+{	// Start the worker if it is not running.  Return 0 if there is no worker.
+	struct spectrum_worker * worker = &SpectrumWorker;
+
+	if (worker->started)
+		return 1;
+	pthread_mutex_init(&worker->mutex, NULL);
+	pthread_mutex_init(&worker->block_mutex, NULL);
+	pthread_cond_init(&worker->cond, NULL);
+	worker->graph[0] = (double *) malloc(sizeof(double) * data_width);
+	worker->graph[1] = (double *) malloc(sizeof(double) * data_width);
+	worker->front = 0;
+	worker->ready = 0;
+	worker->pending = 1;
+	worker->zoom = zoom;
+	worker->deltaf = deltaf;
+	worker->stop = 0;
+	if (pthread_create(&worker->thread, NULL, spectrum_worker_thread, worker) != 0) {
+		printf("Failure to start the spectrum worker thread\n");
+		pthread_mutex_destroy(&worker->mutex);
+		pthread_mutex_destroy(&worker->block_mutex);
+		pthread_cond_destroy(&worker->cond);
+		free(worker->graph[0]);
+		free(worker->graph[1]);
+		spectrum_thread = 0;
+		return 0;
+	}
+	worker->started = 1;
+	return 1;
+}
+
+static void spectrum_worker_signal(void)
+{	// Called by the sound thread when an FFT block is filled.
+	struct spectrum_worker * worker = &SpectrumWorker;
+
+	if ( ! worker->started)
+		return;
+	pthread_mutex_lock(&worker->mutex);
+	worker->pending = 1;
+	pthread_cond_signal(&worker->cond);
+	pthread_mutex_unlock(&worker->mutex);
+}
+
+static int spectrum_worker_get(double zoom, double deltaf, double * graph)
+{	// Copy the newest graph.  Return 1 if there was a new graph, else 0.
+	struct spectrum_worker * worker = &SpectrumWorker;
+	int ready;
+
+	pthread_mutex_lock(&worker->mutex);
+	worker->zoom = zoom;
+	worker->deltaf = deltaf;
+	ready = worker->ready;
+	if (ready) {
+		memcpy(graph, worker->graph[worker->front], sizeof(double) * data_width);
+		worker->ready = 0;
+	}
+	pthread_mutex_unlock(&worker->mutex);
+	return ready;
+}
+
+static void spectrum_worker_lock(void)
+{	// Lock the FFT blocks before the GUI thread uses them.
+	if (SpectrumWorker.started)
+		pthread_mutex_lock(&SpectrumWorker.block_mutex);
+}
+
+static void spectrum_worker_unlock(void)
+{
+	if (SpectrumWorker.started)
+		pthread_mutex_unlock(&SpectrumWorker.block_mutex);
+}
+
+static void spectrum_worker_close(void)
+{	// Stop the worker thread.
+	struct spectrum_worker * worker = &SpectrumWorker;
+
+	if ( ! worker->started)
+		return;
+	pthread_mutex_lock(&worker->mutex);
+	worker->stop = 1;
+	pthread_cond_signal(&worker->cond);
+	pthread_mutex_unlock(&worker->mutex);
+	pthread_join(worker->thread, NULL);
+	pthread_mutex_destroy(&worker->mutex);
+	pthread_mutex_destroy(&worker->block_mutex);
+	pthread_cond_destroy(&worker->cond);
+	free(worker->graph[0]);
+	free(worker->graph[1]);
+	worker->started = 0;
+}
+#else
+static int spectrum_worker_start(double zoom, double deltaf)
+{
+	return 0;
+}
+
+static void spectrum_worker_signal(void)
+{
+}
+
+static int spectrum_worker_get(double zoom, double deltaf, double * graph)
+{
+	return 0;
+}
+
+static void spectrum_worker_lock(void)
+{
+}
+
+static void spectrum_worker_unlock(void)
+{
+}
+
+static void spectrum_worker_close(void)
+{
+}
+#endif
+
+static PyObject * GetGraph(int k, double zoom, double deltaf, Py_buffer * view)
+{
+	int i;
+	fft_data * ptFft;
+	PyObject * tuple2;
+
+	if (k != graph_use_fft) {		// change in data return type; re-initialize
+		spectrum_worker_lock();
+		graph_use_fft = k;
+		graph_count_fft = 0;
+		spectrum_worker_unlock();
+	}
+	if (graph_use_fft && spectrum_thread && spectrum_worker_start(zoom, deltaf)) {
+		if (spectrum_worker_get(zoom, deltaf, current_graph))
+			return GraphValues(current_graph, data_width, view);
+		Py_INCREF(Py_None);	// No data yet
+		return Py_None;
+	}
+	// Process all FFTs that are ready to run.
+	spectrum_worker_lock();
+	while ((ptFft = GraphNextBlock())) {
+		if ( ! graph_use_fft) {		// return raw data, not FFT
+			if (view) {		// I and Q of each sample
+				tuple2 = GraphBufferFill(view, (double *)ptFft->samples, data_width * 2);
 			}
-			scale = 1.0 / 2147483647.0 / fft_size;
-			Smeter = meter * scale * scale / count_fft;		// record the new s-meter value
-			meter = 0;
-			if (Smeter > 0)
-				Smeter = 10.0 * log10(Smeter);
-			else
-				Smeter = -160.0;
-			// This correction is for a -40 dB strong signal, and is caused by FFT leakage
-			// into adjacent bins. It is the amplitude that is spread out, not the squared amplitude.
-			Smeter += 4.25969;
-			tuple2 = PyTuple_New(data_width);
-			// scale = 1.0 / count_fft / fft_size;	// Divide by sample count
-			// scale /= pow(2.0, 31);			// Normalize to max == 1
-			scale = log10(count_fft) + log10(fft_size) + 31.0 * log10(2.0);
-			scale *= 20.0;
-			for (i = 0; i < data_width; i++) {
-				d2 = 20.0 * log10(fft_avg[i]) - scale;
-				if (d2 < -200)
-					d2 = -200;
-				current_graph[i] = d2;
-				PyTuple_SetItem(tuple2, i, PyFloat_FromDouble(d2));
+			else {
+				tuple2 = PyTuple_New(data_width);
+				for (i = 0; tuple2 && i < data_width; i++)
+					PyTuple_SetItem(tuple2, i,
+						PyComplex_FromDoubles(creal(ptFft->samples[i]), cimag(ptFft->samples[i])));
 			}
-			for (i = 0; i < fft_size; i++)
-				fft_avg[i] = 0;
-			count_fft = 0;
-			time0 = QuiskTimeSec();
+			if (tuple2)		// keep the block for the next call if it was not copied
+				ptFft->filled = 0;
+			spectrum_worker_unlock();
 			return tuple2;
 		}
+		// Continue with FFT calculation
+		GraphAddBlock(ptFft);
+		if (GraphReady()) {
+			GraphFinish(zoom, deltaf, current_graph);
+			spectrum_worker_unlock();
+			return GraphValues(current_graph, data_width, view);
+		}
 	}
+	spectrum_worker_unlock();
 	Py_INCREF(Py_None);	// No data yet
 	return Py_None;
 }
 
+static PyObject * get_graph(PyObject * self, PyObject * args)	// Called by the GUI thread
+{	// Return a tuple of graph data or None.  If a buffer is passed, the data is written to the buffer and the count is returned.
+	// Raw data is written as I and Q for each sample.
+	int k;
+	double zoom, deltaf;
+	PyObject * buffer = NULL;
+	PyObject * retrn;
+	Py_buffer view;
+
+	if (!PyArg_ParseTuple (args, "idd|O", &k, &zoom, &deltaf, &buffer))
+		return NULL;
+	if ( ! buffer)
+		return GetGraph(k, zoom, deltaf, NULL);
+	if (GraphBufferGet(buffer, &view) != 0)
+		return NULL;
+	retrn = GetGraph(k, zoom, deltaf, &view);
+	PyBuffer_Release(&view);
+	return retrn;
+}
+
+static PyObject * waterfall_row(PyObject * self, PyObject * args)	// Called by the GUI thread
+{	// Convert a row of graph data in dB into RGBA pixels for the waterfall.  The palette has 256 RGBA colors.
+	// The data is a sequence of floats, or a buffer of double or float as written by get_graph().
+	int i, count, index, item;
+	double gain, y_zero, y_scale, yz, slope, d;
+	const char * format;
+	unsigned char * ptRow, * ptPalette;
+	PyObject * data, * palette, * row, * seq;
+	Py_buffer view, pview;
+
+	if (!PyArg_ParseTuple (args, "OOddd", &data, &palette, &gain, &y_zero, &y_scale))
+		return NULL;
+	if (PyObject_GetBuffer(palette, &pview, PyBUF_SIMPLE) != 0)
+		return NULL;
+	if (pview.len < 256 * 4) {
+		PyBuffer_Release(&pview);
+		PyErr_SetString (QuiskError, "The waterfall palette must have 256 RGBA colors.");
+		return NULL;
+	}
+	ptPalette = (unsigned char *)pview.buf;
+	seq = NULL;
+	item = 0;		// size of buffer items, or zero for a sequence
+	if (PyObject_CheckBuffer(data) && PyObject_GetBuffer(data, &view, PyBUF_CONTIG_RO | PyBUF_FORMAT) == 0) {
+		format = view.format;
+		if (format && (*format == '@' || *format == '=' ||
+				(*format == '<' && is_little_endian) || (*format == '>' && ! is_little_endian)))
+			format++;
+		if (format && strcmp(format, "f") == 0)
+			item = sizeof(float);
+		else
+			item = sizeof(double);
+		count = view.len / item;
+	}
+	else {
+		PyErr_Clear();
+		seq = PySequence_Fast(data, "The waterfall data must be a sequence or a buffer.");
+		if ( ! seq) {
+			PyBuffer_Release(&pview);
+			return NULL;
+		}
+		count = PySequence_Fast_GET_SIZE(seq);
+	}
+	// y_scale and y_zero range from zero to 160.
+	// y_zero controls the center position of the colors. Set to a bit over the noise level.
+	// y_scale controls how much the colors change when the sample deviates from y_zero.
+	yz = 40.0 + y_zero * 0.69;		// -yz is the color center in dB
+	slope = y_scale + 10;
+	row = PyByteArray_FromStringAndSize(NULL, count * 4);
+	if (row) {
+		ptRow = (unsigned char *)PyByteArray_AS_STRING(row);
+		for (i = 0; i < count; i++) {
+			if (item == sizeof(float))
+				d = ((float *)view.buf)[i];
+			else if (item)
+				d = ((double *)view.buf)[i];
+			else
+				d = PyFloat_AsDouble(PySequence_Fast_GET_ITEM(seq, i));
+			d = (d - gain + yz) * slope * 0.10 + 128;
+			if ( ! (d > 0))		// also catches NaN
+				index = 0;
+			else if (d >= 255)
+				index = 255;
+			else
+				index = (int)d;
+			memcpy(ptRow, ptPalette + index * 4, 4);
+			ptRow += 4;
+		}
+		if (PyErr_Occurred()) {		// a sequence item was not a number
+			Py_DECREF(row);
+			row = NULL;
+		}
+	}
+	if (item)
+		PyBuffer_Release(&view);
+	else
+		Py_DECREF(seq);
+	PyBuffer_Release(&pview);
+	return row;
+}
+
 static PyObject * get_filter(PyObject * self, PyObject * args)
 {
 	int i, j, k, n;
@@ -4775,7 +6053,7 @@ static PyObject * get_filter(PyObject * self, PyObject * args)
 
 	// Create space for the fft of size data_width
 	samples = (fftw_complex *) fftw_malloc(sizeof(fftw_complex) * data_width);
-	plan = fftw_plan_dft_1d(data_width, samples, samples, FFTW_FORWARD, FFTW_MEASURE);
+	plan = quisk_plan_dft(data_width, samples, samples, FFTW_FORWARD);
 	average = (double *) malloc(sizeof(double) * (data_width + sizeFilter));
 	bufI = (double *) malloc(sizeof(double) * sizeFilter);
 	bufQ = (double *) malloc(sizeof(double) * sizeFilter);
@@ -4816,7 +6094,7 @@ static PyObject * get_filter(PyObject * self, PyObject * args)
 
 	for (i = 0; i < data_width; i++)	// multiply by window
 		samples[i] *= fft_window[i];
-	fftw_execute(plan);		// Calculate FFT
+	fftw_execute_dft(plan, samples, samples);		// Calculate FFT
 	// Normalize and convert to log10
 	scale = 1. / data_width;
 	for (k = 0; k < data_width; k++) {
@@ -4841,7 +6119,6 @@ static PyObject * get_filter(PyObject * self, PyObject * args)
 	free(bufQ);
 	free(bufI);
 	free(average);
-	fftw_destroy_plan(plan);
 	fftw_free(samples);
 
 	return tuple2;
@@ -4865,7 +6142,7 @@ static void measure_freq(complex double * cSamples, int nSamples, int srate)
 
 	if ( ! cSamples) {		// malloc new space and initialize
 		samples = (fftw_complex *) fftw_malloc(sizeof(fftw_complex) * fft_size);
-		planA = fftw_plan_dft_1d(fft_size, samples, samples, FFTW_FORWARD, FFTW_MEASURE);
+		planA = quisk_plan_dft(fft_size, samples, samples, FFTW_FORWARD);
 		fft_window = (double *) malloc(sizeof(double) * (fft_size + 1));
 		fft_average = (double *) malloc(sizeof(double) * fft_size);
 		memset(fft_average, 0, sizeof(double) * fft_size);
@@ -4884,7 +6161,7 @@ static void measure_freq(complex double * cSamples, int nSamples, int srate)
 		return;		// wait for a full array of samples
 	for (i = 0; i < fft_size; i++)	// multiply by window
 		samples[i] *= fft_window[i];
-	fftw_execute(planA);		// Calculate FFT
+	fftw_execute_dft(planA, samples, samples);		// Calculate FFT
 	index = 0;
 	fft_count++;
 	// Average the fft data into the graph in order of frequency
@@ -4942,15 +6219,13 @@ static PyObject * Xdft(PyObject * pyseq, int inverse, int window)
 		return PyTuple_New(0);
 	if (size != fft_size) {		// Change in previous size; malloc new space
 		if (fft_size > 0) {
-			fftw_destroy_plan(planF);
-			fftw_destroy_plan(planB);
 			fftw_free(samples);
 			free (fft_window);
 		}
 		fft_size = size;	// Create space for one fft
 		samples = (fftw_complex *) fftw_malloc(sizeof(fftw_complex) * fft_size);
-		planF = fftw_plan_dft_1d(fft_size, samples, samples, FFTW_FORWARD, FFTW_MEASURE);
-		planB = fftw_plan_dft_1d(fft_size, samples, samples, FFTW_BACKWARD, FFTW_MEASURE);
+		planF = quisk_plan_dft(fft_size, samples, samples, FFTW_FORWARD);
+		planB = quisk_plan_dft(fft_size, samples, samples, FFTW_BACKWARD);
 		fft_window = (double *) malloc(sizeof(double) * (fft_size + 1));
 		for (i = 0; i <= size/2; i++) {
 			if (1)	// Blackman window
@@ -4987,7 +6262,7 @@ static PyObject * Xdft(PyObject * pyseq, int inverse, int window)
 		Py_XDECREF(obj);
 	}
 	if (inverse) {		// Normalize using 1/N
-		fftw_execute(planB);		// Calculate inverse FFT / N
+		fftw_execute_dft(planB, samples, samples);		// Calculate inverse FFT / N
 		if (window) {
 			for (i = 0; i < fft_size; i++)	// multiply by window / N
 				samples[i] *= fft_window[i] / size;
@@ -5002,7 +6277,7 @@ static PyObject * Xdft(PyObject * pyseq, int inverse, int window)
 			for (i = 0; i < fft_size; i++)	// multiply by window
 				samples[i] *= fft_window[i];
 	   }
-		fftw_execute(planF);		// Calculate FFT
+		fftw_execute_dft(planF, samples, samples);		// Calculate FFT
 	}
 	pyseq = PyList_New(fft_size);
 	j = (size - 1) / 2;		// zero frequency in input
@@ -5047,7 +6322,7 @@ static PyObject * idft(PyObject * self, PyObject * args)
 
 static PyObject * record_app(PyObject * self, PyObject * args)
 {  // Record the Python object for the application instance, malloc space for fft's.
-	int i, j, rate;
+	int i, rate;
 	unsigned long handle;
 	fftw_complex * pt;
 
@@ -5067,6 +6342,11 @@ static PyObject * record_app(PyObject * self, PyObject * args)
 	rx_udp_clock = QuiskGetConfigDouble("rx_udp_clock", 122.88e6);
 	graph_refresh = QuiskGetConfigInt("graph_refresh", 7);
 	quisk_use_rx_udp = QuiskGetConfigInt("use_rx_udp", 0);
+	fast_filter_taps = QuiskGetConfigInt("rx_fast_filter_taps", 256);
+	rx_worker_threads = QuiskGetConfigInt("rx_worker_threads", 0);
+	fft_window_type = QuiskGetConfigInt("fft_window", 0);
+	spectrum_thread = QuiskGetConfigInt("spectrum_thread", 0);
+	udp_capture = QuiskGetConfigInt("udp_capture_thread", 0);
 	quisk_sound_state.sample_rate = rate;
 	fft_sample_rate = rate;
 	is_little_endian = 1;	// Test machine byte order
@@ -5075,6 +6355,7 @@ static PyObject * record_app(PyObject * self, PyObject * args)
 	else
 		is_little_endian = 0;
 	strncpy (quisk_sound_state.err_msg, CLOSED_TEXT, QUISK_SC_SIZE);
+	PlanWisdomLoad(QuiskGetConfigString("fftw_wisdom_file", ""));
 	// Initialize space for the FFTs
 	for (i = 0; i < FFT_ARRAY_SIZE; i++) {
 		fft_data_array[i].filled = 0;
@@ -5083,21 +6364,17 @@ static PyObject * record_app(PyObject * self, PyObject * args)
 		fft_data_array[i].samples = (fftw_complex *) fftw_malloc(sizeof(fftw_complex) * fft_size);
 	}
 	pt = fft_data_array[0].samples;
-	quisk_fft_plan = fftw_plan_dft_1d(fft_size, pt, pt, FFTW_FORWARD, FFTW_MEASURE);
+	quisk_fft_plan = quisk_plan_dft(fft_size, pt, pt, FFTW_FORWARD);
 	// Create space for the fft average and window
 	if (fft_window)
 		free(fft_window);
 	fft_window = (double *) malloc(sizeof(double) * fft_size);
-	for (i = 0, j = -fft_size / 2; i < fft_size; i++, j++) {
-		if (0)	// Hamming
-			fft_window[i] = 0.54 + 0.46 * cos(2. * M_PI * j / fft_size);
-		else	// Hanning
-			fft_window[i] = 0.5 + 0.5 * cos(2. * M_PI * j / fft_size);
-	}
+	MakeFftWindow(fft_window, fft_size, fft_window_type);
+	SetFftOverlap(QuiskGetConfigInt("fft_overlap", 0));
 	// Initialize plan for multirx FFT
 	multirx_fft_width = multirx_data_width * MULTIRX_FFT_MULT;		// Use larger FFT than graph size
 	multirx_fft_next_samples = (fftw_complex *)malloc(multirx_fft_width * sizeof(fftw_complex));
-	multirx_fft_next_plan = fftw_plan_dft_1d(multirx_fft_width, multirx_fft_next_samples, multirx_fft_next_samples, FFTW_FORWARD, FFTW_MEASURE);
+	multirx_fft_next_plan = quisk_plan_dft(multirx_fft_width, multirx_fft_next_samples, multirx_fft_next_samples, FFTW_FORWARD);
 	if (current_graph)
 		free(current_graph);
 	current_graph = (double *) malloc(sizeof(double) * data_width);
@@ -5105,6 +6382,7 @@ static PyObject * record_app(PyObject * self, PyObject * args)
 	dAutoNotch(NULL, 0, 0, 0);
 	quisk_process_decimate(NULL, 0, 0, 0);
 	quisk_process_demodulate(NULL, NULL, 0, 0, 0, 0);
+	PlanWisdomSave();
 #if DEBUG_IO
 	QuiskPrintTime(NULL, 0);
 #endif
@@ -5167,15 +6445,17 @@ static PyMethodDef QuiskMethods[] = {
 	{"idft", idft, METH_VARARGS, "Calculate the inverse discrete Fourier transform."},
 	{"is_key_down", is_key_down, METH_VARARGS, "Check whether the key is down; return 0 or 1."},
 	{"get_state", get_state, METH_VARARGS, "Return a count of read and write errors."},
-	{"get_graph", get_graph, METH_VARARGS, "Return a tuple of graph data."},
-	{"get_bandscope", get_bandscope, METH_VARARGS, "Return a tuple of bandscope data."},
+	{"get_graph", get_graph, METH_VARARGS, "Return a tuple of graph data, or fill an optional buffer."},
+	{"get_bandscope", get_bandscope, METH_VARARGS, "Return a tuple of bandscope data, or fill an optional buffer."},
+	{"waterfall_row", waterfall_row, METH_VARARGS, "Convert a row of graph data to RGBA pixels using a palette."},
 	{"set_multirx_mode", set_multirx_mode, METH_VARARGS, "Select demodulation mode for sub-receivers."},
 	{"set_multirx_freq", set_multirx_freq, METH_VARARGS, "Select how to play audio from sub-receivers."},
 	{"set_multirx_play_method", set_multirx_play_method, METH_VARARGS, "Select how to play audio from sub-receivers."},
 	{"set_multirx_play_channel", set_multirx_play_channel, METH_VARARGS, "Select which sub-receiver to play audio."},
-	{"get_multirx_graph", get_multirx_graph, METH_VARARGS, "Return a tuple of sub-receiver graph data."},
+	{"get_multirx_graph", get_multirx_graph, METH_VARARGS, "Return a tuple of sub-receiver graph data, or fill an optional buffer."},
 	{"get_filter", get_filter, METH_VARARGS, "Return the frequency response of the receive filter."},
 	{"get_filter_rate", get_filter_rate, METH_VARARGS, "Return the sample rate used for the filters."},
+	{"process_iq", process_iq, METH_VARARGS, "Demodulate I/Q samples without the sound system."},
 	{"get_tx_filter", quisk_get_tx_filter, METH_VARARGS, "Return the frequency response of the transmit filter."},
 	{"get_audio_graph", get_audio_graph, METH_VARARGS, "Return a tuple of the audio graph data."},
 	{"measure_frequency", measure_frequency, METH_VARARGS, "Set the method, return the measured frequency."},
@@ -5253,6 +6533,7 @@ static PyMethodDef QuiskMethods[] = {
 	{"open_rx_udp", open_rx_udp, METH_VARARGS, "Open a UDP port for capture."},
 	{"close_rx_udp", close_rx_udp, METH_VARARGS, "Close the UDP port used for capture."},
 	{"add_rx_samples", add_rx_samples, METH_VARARGS, "Record the Rx samples received by Python code."},
+	{"get_py_sample_status", get_py_sample_status, METH_VARARGS, "Return the statistics for Rx samples received by Python code."},
 	{"add_bscope_samples", add_bscope_samples, METH_VARARGS, "Record the bandscope samples received by Python code."},
 	{"set_key_down", set_key_down, METH_VARARGS, "Change the key up/down state."},
 	{"set_PTT", set_PTT, METH_VARARGS, "Change the PTT button state."},
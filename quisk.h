@@ -282,6 +282,13 @@ void quisk_check_freedv_mode(void);
 void quisk_calc_audio_graph(double, complex double *, double *, int, int);
 int QuiskDeltaMsec(int);
 
+#ifdef FFTW3_H
+// Cached FFTW plans; see quisk.c.  Execute them with the new-array execute functions, and do not destroy them.
+fftw_plan quisk_plan_dft(int, fftw_complex *, fftw_complex *, int);
+fftw_plan quisk_plan_r2c(int, double *, fftw_complex *);
+fftw_plan quisk_plan_c2r(int, fftw_complex *, double *);
+#endif
+
 // Functions supporting digital voice codecs
 typedef int  (* ty_dvoice_codec_rx)(complex double *, double *, int, int);
 typedef int  (* ty_dvoice_codec_tx)(complex double *, double *, int);
@@ -318,6 +325,13 @@ To add a function, declare it twice, use the next array index, and add it to QUI
 Be very careful; here be dragons!
 */
 
+// Flags for quisk_unpack_iq()
+#define QUISK_UNPACK_BIG_ENDIAN		1	// samples are big-endian
+#define QUISK_UNPACK_QI			2	// the Q sample is before the I sample
+#define QUISK_UNPACK_FLOAT		4	// samples are IEEE float32 with full scale 1.0
+
+struct quisk_fHB45Filter;	// defined in filter.h
+
 #ifdef IMPORT_QUISK_API
 // For use by modules that import the _quisk symbols
 extern void ** Quisk_API;	// array of pointers to functions and variables from module _quisk
@@ -333,6 +347,8 @@ int import_quisk_api(void);	// used to initialize Quisk_API
 #define quisk_dvoice_freedv	(*(	void	(*)	(ty_dvoice_codec_rx, ty_dvoice_codec_tx)	)Quisk_API[8])
 #define quisk_is_key_down	(*(	int	(*)	(void)			)Quisk_API[9])
 #define quisk_sample_source4	(*(	void	(*)	(ty_sample_start, ty_sample_stop, ty_sample_read, ty_sample_write)	)Quisk_API[10])
+#define quisk_unpack_iq		(*(	int	(*)	(complex double *, const unsigned char *, int, int, int, int, double)	)Quisk_API[11])
+#define quisk_fDecim2HB45	(*(	int	(*)	(complex float *, int, struct quisk_fHB45Filter *)	)Quisk_API[12])
 
 #else
 // Used to export symbols from _quisk in quisk.c
@@ -347,11 +363,13 @@ void	quisk_sample_source(ty_sample_start, ty_sample_stop, ty_sample_read);
 void	quisk_dvoice_freedv(ty_dvoice_codec_rx, ty_dvoice_codec_tx);
 int	quisk_is_key_down(void);
 void	quisk_sample_source4(ty_sample_start, ty_sample_stop, ty_sample_read, ty_sample_write);
+int	quisk_unpack_iq(complex double *, const unsigned char *, int, int, int, int, double);
+int	quisk_fDecim2HB45(complex float *, int, struct quisk_fHB45Filter *);
 
 #define QUISK_API_INIT	{ \
  &quisk_sound_state, &QuiskGetConfigInt, &QuiskGetConfigDouble, &QuiskGetConfigString, &QuiskTimeSec, \
  &QuiskSleepMicrosec, &QuiskPrintTime, &quisk_sample_source, &quisk_dvoice_freedv, &quisk_is_key_down, \
- &quisk_sample_source4 \
+ &quisk_sample_source4, &quisk_unpack_iq, &quisk_fDecim2HB45 \
  }
 
 #endif
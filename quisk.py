@@ -18,23 +18,21 @@ from __future__ import division
 # Change to the directory of quisk.py.  This is necessary to import Quisk packages,
 # to load other extension modules that link against _quisk.so, to find shared libraries *.dll and *.so,
 # and to find ./__init__.py and ./help.html.
-import sys, os
+import sys, os, time
+StartTime = time.time()		# Startup times are printed relative to this time with the --timing option
 os.chdir(os.path.normpath(os.path.dirname(__file__)))	# change directory to the location of this script
 if sys.path[0] != '':		# Make sure the current working directory is on path
   sys.path.insert(0, '')
 
-import wx, wx.html, wx.lib.stattext, wx.lib.colourdb, wx.grid, wx.richtext
-import math, cmath, time, traceback, string, select, subprocess
-import threading, pickle, webbrowser
-try:
-  from xmlrpc.client import ServerProxy
-except ImportError:
-  from xmlrpclib import ServerProxy
+# Rarely used modules wx.richtext, xmlrpc and dxcluster are imported when they are needed.
+import wx, wx.html, wx.lib.stattext, wx.lib.colourdb, wx.grid
+import math, cmath, traceback, string, select, subprocess
+import threading, pickle, webbrowser, bisect
 import _quisk as QS
 from quisk_widgets import *
 from filters import Filters
-import dxcluster
 import configure
+import quisk_utils
 
 DEBUGSHELL = False
 if DEBUGSHELL:
@@ -67,6 +65,8 @@ parser.add_option('-a', '--ask', action="store_true", dest='AskMe', default=Fals
 		help='Ask which radio to use when starting')
 parser.add_option('', '--local', dest='local_option', default='',
 		help='Specify a custom option that you have programmed yourself')
+parser.add_option('', '--timing', action="store_true", dest='timing', default=False,
+		help='Print the time taken by each step of the startup')
 argv_options = parser.parse_args()[0]
 ConfigPath = argv_options.config_file_path	# Get config file path
 ConfigPath2 = argv_options.config_file_path2
@@ -118,6 +118,12 @@ for f2 in range(1, 13):
         fftPreferedSizes.append(x)
 fftPreferedSizes.sort()
 
+def StartupTime(text):		# Print the time since startup if the --timing option was given
+  if argv_options.timing:
+    print ("%8.3f  %s" % (time.time() - StartTime, text))
+
+StartupTime("Import modules")
+
 def round(x):	# round float to nearest integer
   if x >= 0:
     return int(x + 0.5)
@@ -825,6 +831,7 @@ class SoundThread(threading.Thread):
   """Create a second (non-GUI) thread to read, process and play sound."""
   def __init__(self, samples_from_python):
     self.samples_from_python = samples_from_python
+    self.pending_samples = None	# samples from GetRxSamples() not yet accepted by add_rx_samples()
     self.do_init = 1
     self.config_text = ''
     threading.Thread.__init__(self)
@@ -837,12 +844,20 @@ class SoundThread(threading.Thread):
       if self.samples_from_python:
         self.config_text = Hardware.StartSamples()
       QS.start_sound()
+      StartupTime("Start sound")
       wx.CallAfter(application.PostStartup)
     while not self.doQuit.isSet():
       if self.samples_from_python:
-        samples = Hardware.GetRxSamples()
+        if self.pending_samples:	# send the rest of the last samples before asking for more
+          samples = self.pending_samples
+        else:
+          samples = Hardware.GetRxSamples()
         if samples:
-          QS.set_params(rx_samples=samples)
+          n = QS.add_rx_samples(samples)	# None if the samples are invalid
+          if n is not None and n < len(samples):
+            self.pending_samples = samples[n:]
+          else:
+            self.pending_samples = None
       QS.read_sound()
       wx.CallAfter(application.OnReadSound)
     if self.samples_from_python:
@@ -1023,12 +1038,12 @@ class ConfigStatus(wx.ScrolledWindow):
     self.MakeRow2("Sample interrupts", self.interupts, cfile)
     self.MakeRow2("Microphone or DGT level dB", level, application.config_text)
     self.MakeRow2("FFT number of points", self.fft_size, err_msg)
-    if conf.dxClHost:		# connection to dx cluster
-      nSpots = len(application.dxCluster.dxSpots)
+    if application.dxCluster:		# connection to dx cluster
+      nSpots = application.dxCluster.getCount()
       if nSpots > 0:
         msg = str(nSpots) + ' DX spot' + ('' if nSpots==1 else 's') + ' received from ' + application.dxCluster.getHost()
       else:
-        msg = "No DX Cluster data from %s" % conf.dxClHost
+        msg = "No DX Cluster data from %s" % (conf.dxClHost or conf.dxClReplayFile)
       self.MakeRow2("FFT number of errors", self.fft_error, msg)
     else:
       self.MakeRow2("FFT number of errors", self.fft_error)
@@ -1049,6 +1064,10 @@ class ConfigStatus(wx.ScrolledWindow):
       self.MakeRow2("Capture radio samples", "UDP", application.sample_rate, self.latencyCapt, self.read_error)
     elif conf.use_soapy:
       self.MakeRow2("Capture radio samples", "SoapySDR", application.sample_rate, self.latencyCapt, self.read_error)
+      if hasattr(Hardware, 'GetRxStatus'):
+        text = Hardware.GetRxStatus()
+        if text:
+          self.MakeRow2("SoapySDR reader", text)
     for use, name, rate, latency, errors, level in QS.sound_errors():
       level = math.sqrt(level) / 2**31
       if level < 1.1E-5:
@@ -1342,6 +1361,8 @@ class ConfigFavorites(wx.grid.Grid):
     wx.grid.Grid.__init__(self, parent)
     self.changed = False
     self.RepeaterDict = {}
+    self.stationFreqs = []	# sorted frequencies of the favorites in stationList
+    self.stationList = []	# the favorites sorted by frequency as (freq, name, mode, description)
     font = wx.Font(conf.favorites_font_size, wx.FONTFAMILY_SWISS, wx.NORMAL,
           wx.FONTWEIGHT_BOLD, False, conf.quisk_typeface)
     self.SetFont(font)
@@ -1442,16 +1463,14 @@ class ConfigFavorites(wx.grid.Grid):
         if col <= 5:
           self.SetCellValue(row, col, fields[col].strip())
     self.MakeRepeaterDict()
+    self.MakeStationList()
   def WriteOut(self):
     ncols = self.GetNumberCols()
     if ncols != 6:
       print ("Bad logic in favorites WriteOut()")
       return
     self.changed = False
-    try:
-      fp = open(self.init_path, 'w')
-    except:
-      return
+    lines = []
     for row in range(self.GetNumberRows()):
       out = []
       for col in range(0, ncols):
@@ -1459,8 +1478,8 @@ class ConfigFavorites(wx.grid.Grid):
         cell = cell.replace('|', ';')
         out.append(cell)
       t = "%20s | %10s | %10s | %30s | %10s | %10s\n" % tuple(out)
-      fp.write(t)
-    fp.close()
+      lines.append(t)
+    configure.SaveStateFile(self.init_path, ''.join(lines))
   def AddNewFavorite(self):
     self.InsertRows(0)
     self.SetCellValue(0, 0, 'New station');
@@ -1530,6 +1549,24 @@ class ConfigFavorites(wx.grid.Grid):
     mode = mode.upper()
     application.OnBtnMode(None, mode)
     application.screenBtnGroup.SetLabel(conf.default_screen, do_cmd=True)
+  def MakeStationList(self):
+    # Make a list of the favorites sorted by frequency for the station screen
+    self.stationList = []
+    for row in range(self.GetNumberRows()):
+      freq = self.GetCellValue(row, 1)
+      if freq:
+        try:
+          freq = str2freq(freq)
+        except ValueError:
+          continue
+        self.stationList.append((freq, self.GetCellValue(row, 0), self.GetCellValue(row, 2), self.GetCellValue(row, 3)))
+    self.stationList.sort()
+    self.stationFreqs = [x[0] for x in self.stationList]
+  def GetStations(self, freq1, freq2):
+    # Return a list of the favorites with freq1 < frequency < freq2
+    lo = bisect.bisect_right(self.stationFreqs, freq1)
+    hi = bisect.bisect_left(self.stationFreqs, freq2)
+    return self.stationList[lo:hi]
   def MakeRepeaterDict(self):
     self.RepeaterDict = {}
     for row in range(self.GetNumberRows()):
@@ -1554,6 +1591,7 @@ class ConfigFavorites(wx.grid.Grid):
         self.RepeaterDict[freq * 1000] = (offset, tone)
   def OnChange(self, event=None):
     self.MakeRepeaterDict()
+    self.MakeStationList()
     self.changed = True
     if self.timer.IsRunning():
       self.timer.Stop()
@@ -2206,6 +2244,8 @@ class StationScreen(wx.Window):		# This code was contributed by Christof, DJ4CM.
     self.lines = lines
     self.mouse_x = 0
     self.stationList = []
+    self.stationFreqs = []	# the frequencies of stationList
+    self.textWidth = {}		# cache of the text width of labels
     graph = self.graph = application.graph
     height = lines * (graph.GetCharHeight() + self.lineMargin)	# The height may be zero
     wx.Window.__init__(self, parent, size=(graph.width, height), style = wx.NO_BORDER)
@@ -2220,8 +2260,9 @@ class StationScreen(wx.Window):		# This code was contributed by Christof, DJ4CM.
       self.Bind(wx.EVT_MOTION, self.OnMotion)
       self.Bind(wx.EVT_LEAVE_WINDOW, self.OnLeaveWindow)
       # handle station info
+      from wx import richtext
       self.stationWindow = wx.PopupWindow (parent)
-      self.stationInfo = wx.richtext.RichTextCtrl(self.stationWindow)
+      self.stationInfo = richtext.RichTextCtrl(self.stationWindow)
       self.stationInfo.SetFont(wx.Font(conf.status_font_size, wx.FONTFAMILY_SWISS, wx.NORMAL,
           wx.FONTWEIGHT_NORMAL, False, conf.quisk_typeface))
       self.stationWindow.Hide(); 
@@ -2247,55 +2288,66 @@ class StationScreen(wx.Window):		# This code was contributed by Christof, DJ4CM.
     for i in range (self.lines):
       dc.DrawLine(originX, y, endX, y)
       y += hl + self.lineMargin
-    # create a sorted list of favorites in the frequency range  
+    # create a sorted list of stations in the frequency range  
     freq1 = VFO - sample_rate // 2
     freq2 = VFO + sample_rate // 2
-    self.stationList = []
-    fav = application.config_screen.favorites
-    for row in range (fav.GetNumberRows()):
-      fav_f = fav.GetCellValue(row, 1) 
-      if fav_f:
-        try:
-          fav_f = str2freq(fav_f)
-          if freq1 < fav_f < freq2:
-            self.stationList.append((fav_f, conf.Xsym_stat_fav, fav.GetCellValue(row, 0),
-                fav.GetCellValue(row, 2), fav.GetCellValue(row, 3)))
-        except ValueError:
-          pass            
-    # add memory stations
-    for mem_f, mem_band, mem_vfo, mem_txfreq, mem_mode in application.memoryState:
-      if freq1 < mem_f < freq2:
-        self.stationList.append((mem_f, conf.Xsym_stat_mem, '', mem_mode, ''))
-    #add dx spots
-    if application.dxCluster:
-      for entry in application.dxCluster.dxSpots:
-        if freq1 < entry.getFreq() < freq2:
-          for i in range (0, entry.getLen()):
-            descr = entry.getSpotter(i) + '\t' + entry.getTime(i) + '\t' + entry.getLocation(i) + '\n' + entry.getComment(i)
-            if i < entry.getLen()-1:
-              descr += '\n'
-          self.stationList.append((entry.freq, conf.Xsym_stat_dx, entry.dx, '', descr))           
+    self.MakeStationList(freq1, freq2)
     # draw stations on graph
-    self.stationList.sort()
     lastX = []
     line = 0
     for i in range (0, self.lines):
       lastX.append(graph.width)
     for statFreq, symbol, statName, statMode, statDscr in reversed (self.stationList):
-      ws = dc.GetTextExtent(symbol)[0]
+      ws = self.TextWidth(dc, symbol)
       statX = graph.x0 + int(float(statFreq - VFO) / sample_rate * graph.data_width)
-      w, h = dc.GetTextExtent(statName)
+      w = self.TextWidth(dc, statName)
       # shorten name until it fits into remaining space
       maxLen = 25
       tName = statName 
       while (w > lastX[line] - statX - ws - 4) and maxLen > 0:
         maxLen -= 1
         tName = statName[:maxLen] + '..'
-        w, h = dc.GetTextExtent(tName)
+        w = self.TextWidth(dc, tName)
       dc.DrawLine(statX, line * (hl+self.lineMargin), statX, line * (hl+self.lineMargin) + 4)                    
       dc.DrawText(symbol + ' ' + tName, statX - ws//2, line * (hl+self.lineMargin) + self.lineMargin//2+1)
       lastX[line] = statX
       line = (line+1)%self.lines
+  def MakeStationList(self, freq1, freq2):
+    # Make a list of the favorites, memories and DX spots with freq1 < frequency < freq2, sorted by frequency.
+    # Each source is sorted by frequency, so only the stations in range are examined.
+    stations = []
+    for freq, name, mode, dscr in application.config_screen.favorites.GetStations(freq1, freq2):
+      stations.append((freq, conf.Xsym_stat_fav, name, mode, dscr))
+    # add memory stations
+    memory = application.memoryState	# sorted by frequency
+    index = bisect.bisect_left(memory, (freq1,))
+    end = bisect.bisect_left(memory, (freq2,))
+    for mem_f, mem_band, mem_vfo, mem_txfreq, mem_mode in memory[index:end]:
+      if mem_f > freq1:
+        stations.append((mem_f, conf.Xsym_stat_mem, '', mem_mode, ''))
+    #add dx spots
+    if application.dxCluster:
+      for entry in application.dxCluster.getSpots(freq1, freq2):
+        info = entry.info	# the cluster thread replaces the info list, but does not change it
+        for i in range (0, len(info)):
+          spotter, sTime, locator, comment = info[i]
+          descr = spotter + '\t' + sTime + '\t' + locator + '\n' + comment
+          if i < len(info)-1:
+            descr += '\n'
+        stations.append((entry.freq, conf.Xsym_stat_dx, entry.dx, '', descr))           
+    stations.sort()
+    self.stationList = stations
+    self.stationFreqs = [x[0] for x in stations]
+  def TextWidth(self, dc, text):
+    # Return the width of the text, using a cache of widths
+    try:
+      return self.textWidth[text]
+    except KeyError:
+      pass
+    if len(self.textWidth) > 5000:
+      self.textWidth.clear()
+    w = self.textWidth[text] = dc.GetTextExtent(text)[0]
+    return w
   def OnLeftDown(self, event):
     if self.firstStationInRange != None:
       # tune to station
@@ -2319,7 +2371,12 @@ class StationScreen(wx.Window):		# This code was contributed by Christof, DJ4CM.
     sample_rate = int(graph.sample_rate * graph.zoom)
     VFO = graph.VFO + graph.zoom_deltaf
     if abs(x) > 5: # ignore small mouse moves
-      for index in range (0, len(self.stationList)):
+      # Find the stations within about 10 pixels of the mouse
+      freq = VFO + float(mouse_x - graph.x0) * sample_rate / graph.data_width
+      dfreq = 11.0 * sample_rate / graph.data_width
+      start = bisect.bisect_left(self.stationFreqs, freq - dfreq)
+      end = bisect.bisect_right(self.stationFreqs, freq + dfreq)
+      for index in range (start, end):
         statFreq, symbol, statName, statMode, statDscr = self.stationList[index]
         statX = graph.x0 + int(float(statFreq - VFO) / sample_rate * graph.data_width)
         if abs(mouse_x-statX) < 10: 
@@ -2423,13 +2480,21 @@ class WaterfallDisplay(wx.Window):
     self.red = red
     self.green = green
     self.blue = blue
-    row = bytearray(4)
-    if wxVersion in ('2', '3'):
-      bmp = wx.BitmapFromBufferRGBA(1, 1, row)
-    else:
-      bmp = wx.Bitmap().FromBufferRGBA(1, 1, row)
-    bmp.x_origin = 0
-    self.bitmaps = [bmp] * application.screen_height
+    # Make a lookup table of 256 RGBA colors for QS.waterfall_row()
+    lut = bytearray()
+    for i in range(256):
+      lut += bytearray((red[i], green[i], blue[i], 255))
+    self.palette_lut = bytes(lut)
+    # The waterfall history is one bitmap used as a ring buffer of rows.  The newest row is at
+    # self.ring_index and older rows follow it.  Each row has its own x_origin.
+    self.ring_rows = application.screen_height
+    self.ring_index = 0
+    self.ring_origin = [0] * self.ring_rows
+    self.ring_bitmap = EmptyBitmap(graph_width, self.ring_rows)
+    self.ring_dc = wx.MemoryDC()
+    self.ring_dc.SelectObject(self.ring_bitmap)
+    self.ring_dc.SetBackground(wx.Brush('Black'))
+    self.ring_dc.Clear()
     if sys.platform == 'win32':
       self.Bind(wx.EVT_ENTER_WINDOW, self.OnEnter)
   def OnEnter(self, event):
@@ -2445,21 +2510,29 @@ class WaterfallDisplay(wx.Window):
     dc.SetLogicalFunction(wx.COPY)
     x_origin = int(float(self.VFO) / sample_rate * self.data_width + 0.5)
     y = self.margin
-    index = 0
+    index = self.ring_index
+    rows = self.ring_rows
+    origins = self.ring_origin
     if conf.waterfall_scroll_mode:	# Draw the first few lines multiple times
       for i in range(self.top_key, 1, -1):
-        b = self.bitmaps[index]
-        x = b.x_origin - x_origin
+        x = origins[index] - x_origin
         for j in range(0, i):
-          dc.DrawBitmap(b, x, y)
+          dc.Blit(x, y, self.graph_width, 1, self.ring_dc, 0, index)
           y += 1
-        index += 1
+        index = (index + 1) % rows
+    # Draw runs of rows with the same x_origin.  Unless the VFO changed recently, there are
+    # only two runs, before and after the end of the ring buffer.
     while y < self.height:
-      b = self.bitmaps[index]
-      x = b.x_origin - x_origin
-      dc.DrawBitmap(b, x, y)
-      y += 1
-      index += 1
+      origin = origins[index]
+      count = min(self.height - y, rows - index)
+      if origins[index:index + count].count(origin) != count:
+        n = 1
+        while origins[index + n] == origin:
+          n += 1
+        count = n
+      dc.Blit(origin - x_origin, y, self.graph_width, count, self.ring_dc, 0, index)
+      y += count
+      index = (index + count) % rows
     dc.SetPen(self.tuningPen)
     dc.SetLogicalFunction(wx.XOR)
     dc.DrawLine(self.tune_tx, self.margin, self.tune_tx, self.height)
@@ -2493,29 +2566,16 @@ class WaterfallDisplay(wx.Window):
   def OnGraphData(self, data, y_zero, y_scale):
     sample_rate = int(self.sample_rate * self.zoom)
     #T('graph start')
-    row = bytearray(0)		# Make a new row of pixels for a one-line image
-    gain = self.rf_gain
-    # y_scale and y_zero range from zero to 160.
-    # y_zero controls the center position of the colors. Set to a bit over the noise level.
-    # y_scale controls how much the colors change when the sample deviates from y_zero.
-    for x in data:	# x is -130 to 0, or so (dB)
-      yz = 40.0 + y_zero * 0.69		# -yz is the color center in dB
-      l = int((x - gain + yz) * (y_scale + 10) * 0.10 + 128)
-      l = max(l, 0)
-      l = min(l, 255)
-      row.append(self.red[l])
-      row.append(self.green[l])
-      row.append(self.blue[l])
-      row.append(255)
-    #print ('OnGraphData yz %.0f, slope %.3f, l %4d' % (yz, (y_scale + 10) * 0.10, l))
+    # Make a new row of pixels for a one-line image.  The data x is -130 to 0, or so (dB).
+    row = QS.waterfall_row(data, self.palette_lut, self.rf_gain, y_zero, y_scale)
     #T('graph string')
     if wxVersion in ('2', '3'):
       bmp = wx.BitmapFromBufferRGBA(len(row) // 4, 1, row)
     else:
       bmp = wx.Bitmap().FromBufferRGBA(len(row) // 4, 1, row)
-    bmp.x_origin = int(float(self.VFO) / sample_rate * self.data_width + 0.5)
-    self.bitmaps.insert(0, bmp)
-    del self.bitmaps[-1]
+    self.ring_index = (self.ring_index - 1) % self.ring_rows
+    self.ring_dc.DrawBitmap(bmp, 0, self.ring_index)
+    self.ring_origin[self.ring_index] = int(float(self.VFO) / sample_rate * self.data_width + 0.5)
     #self.ScrollWindow(0, 1, None)
     #self.Refresh(False, (0, 0, self.graph_width, self.top_size + self.margin))
     self.Refresh(False)
@@ -3540,6 +3600,7 @@ class App(wx.App):
           setattr(conf, k, v)
     else:
       setattr(conf, 'config_file_exists', False)
+    StartupTime("Read config file")
     QS.set_params(quisk_is_vna=0)	# We are not the VNA program
     # Read in configuration from the selected radio
     if self.main_frame:
@@ -3699,6 +3760,10 @@ class App(wx.App):
     self.fldigi_new_freq = None
     self.fldigi_freq = None
     if conf.digital_xmlrpc_url:
+      try:
+        from xmlrpc.client import ServerProxy
+      except ImportError:
+        from xmlrpclib import ServerProxy
       self.fldigi_server = ServerProxy(conf.digital_xmlrpc_url)
     else:
       self.fldigi_server = None
@@ -3894,6 +3959,8 @@ The new code supports multiple corrections per band.""")
       h = self.main_frame.GetHandle()
     else:
       h = 0
+    if not conf.fftw_wisdom_file:
+      conf.fftw_wisdom_file = os.path.join(os.path.dirname(self.local_conf.StatePath), "quisk_fftw_wisdom.txt")
     QS.record_app(self, conf, self.data_width, self.graph_width, self.fft_size,
                  self.multi_rx_screen.rx_data_width, self.sample_rate, h)
     #print ('data_width %d, FFT size %d, FFT mult %d, average_count %d, rate %d, Refresh %.2f Hz' % (
@@ -3901,24 +3968,25 @@ The new code supports multiple corrections per band.""")
     #    float(self.sample_rate) / self.fft_size / average_count))
     QS.record_graph(0, 0, 1.0)
     QS.set_tx_audio(vox_level=20, vox_time=self.timeVOX)	# Turn off VOX, set VOX time
-    # Make all the screens and hide all but one.  MultiReceiver creates the graph and waterfall screens.
+    # Make the config and graph screens and hide all but one.  MultiReceiver creates the graph and waterfall screens.
+    # The other screens are made by GetScreen() the first time they are shown.
     self.screen = self.multi_rx_screen
     self.graph = self.multi_rx_screen.graph
     self.waterfall = self.multi_rx_screen.waterfall
     width = self.multi_rx_screen.graph.width
     self.config_screen = ConfigScreen(frame, width, self.fft_size)
     self.config_screen.Hide()
-    self.scope = ScopeScreen(frame, width, self.data_width, self.graph_width)
-    self.scope.Hide()
-    self.bandscope_screen = BandscopeScreen(frame, width, self.graph_width, self.graph_width, self.bandscope_clock)
-    self.bandscope_screen.Hide()
-    self.filter_screen = FilterScreen(frame, self.data_width, self.graph_width)
-    self.filter_screen.Hide()
-    if self.rate_audio_fft:
-      self.audio_fft_screen = AudioFFTScreen(frame, self.data_width, self.graph_width, self.rate_audio_fft)
-      self.audio_fft_screen.Hide()
-    self.help_screen = HelpScreen(frame, width, self.screen_height // 10)
-    self.help_screen.Hide()
+    self.scope = None
+    self.bandscope_screen = None
+    self.filter_screen = None
+    self.help_screen = None
+    self.screen_makers = {		# Functions to make each screen, indexed by attribute name
+      'scope' : lambda: ScopeScreen(frame, width, self.data_width, self.graph_width),
+      'bandscope_screen' : lambda: BandscopeScreen(frame, width, self.graph_width, self.graph_width, self.bandscope_clock),
+      'filter_screen' : lambda: FilterScreen(frame, self.data_width, self.graph_width),
+      'audio_fft_screen' : lambda: AudioFFTScreen(frame, self.data_width, self.graph_width, self.rate_audio_fft),
+      'help_screen' : lambda: HelpScreen(frame, width, self.screen_height // 10),
+      }
     self.station_screen = StationScreen(frame, width, conf.station_display_lines)
     self.station_screen.Hide()
     # Make a vertical box to hold all the screens and the bottom box
@@ -3927,12 +3995,6 @@ The new code supports multiple corrections per band.""")
     # Add the screens
     vertBox.Add(self.config_screen, 1, wx.EXPAND)
     vertBox.Add(self.multi_rx_screen, 1)
-    vertBox.Add(self.scope, 1)
-    vertBox.Add(self.bandscope_screen, 1)
-    vertBox.Add(self.filter_screen, 1)
-    if self.rate_audio_fft:
-      vertBox.Add(self.audio_fft_screen, 1)
-    vertBox.Add(self.help_screen, 1)
     vertBox.Add(self.station_screen)
     # Add the spacer
     vertBox.Add(Spacer(frame), 0, wx.EXPAND)
@@ -3946,6 +4008,7 @@ The new code supports multiple corrections per band.""")
     vertBox.AddSpacer(5)		# Thanks to Christof, DJ4CM
     # End of vertical box.
     self.MakeButtons(frame, gbs)
+    StartupTime("Make screens and buttons")
     minw = width = self.graph.width
     maxw = maxh = -1
     minh = 100
@@ -3971,26 +4034,28 @@ The new code supports multiple corrections per band.""")
         item = gbs.FindItemAtPosition((0, i))
         item.SetSpan((rows, 1))
     self.OpenHardware()
+    StartupTime("Open hardware")
     if QS.open_key(conf.key_method):
       print('open_key failed for name "%s"' % conf.key_method)
     self.OpenSound()
+    StartupTime("Open sound")
     tune, vfo = Hardware.ReturnFrequency()	# Request initial frequency
     if tune is None or vfo is None:		# Set last-used frequency
       self.bandBtnGroup.SetLabel(self.lastBand, do_cmd=True, direction=0)
     else:			# Set requested frequency
       self.BandFromFreq(tune)
       self.ChangeDisplayFrequency(tune - vfo, vfo)
-    # Record filter rate for the filter screen
-    self.filter_screen.sample_rate = QS.get_filter_rate(-1, -1)
     self.config_screen.InitBitmap()
     self.screenBtnGroup.SetLabel(conf.default_screen, do_cmd=True)
     frame.Show()
     self.Yield()
+    StartupTime("Show main window")
     self.sound_thread = SoundThread(self.samples_from_python)
     self.sound_thread.start()
-    if conf.dxClHost:
+    if conf.dxClHost or conf.dxClReplayFile:
       # create DX Cluster and register listener for change notification
-      self.dxCluster = dxcluster.DxCluster()
+      import dxcluster
+      self.dxCluster = dxcluster.DxCluster(conf.dxClReplayFile)
       self.dxCluster.setListener(self.OnDxClChange)
       self.dxCluster.start()
     # Create shortcut keys for buttons
@@ -4096,6 +4161,7 @@ The new code supports multiple corrections per band.""")
     Hardware.close()
     self.SaveState()
     self.local_conf.SaveState()
+    configure.FlushStateFiles()
     if self.hamlib_com1_handler:
       self.hamlib_com1_handler.close()
     if self.hamlib_com2_handler:
@@ -4105,6 +4171,7 @@ The new code supports multiple corrections per band.""")
     if event.GetEventObject().GetValue():	# Start samples
       self.SaveState()
       self.local_conf.SaveState()
+      configure.FlushStateFiles()	# OnInit() reads the state files
       self.OnInit()
     else:	# Stop samples
       try:
@@ -4141,12 +4208,7 @@ The new code supports multiple corrections per band.""")
       for n in self.StateNames:
         d[n] = v = getattr(self, n)
         self.savedState[n] = v
-      try:
-        fp = open(self.init_path, "wb")		# Pickle requires a bytes object
-        pickle.dump(d, fp)
-        fp.close()
-      except:
-        pass #traceback.print_exc()
+      configure.SaveStateFile(self.init_path, pickle.dumps(d), True)	# Pickle requires a bytes object
   def Mode2Filters(self, mode):		# return the list of filter bandwidths for each mode
     if mode in ('CWL', 'CWU'):
       return conf.FilterBwCW
@@ -4749,56 +4811,7 @@ The new code supports multiple corrections per band.""")
         buttons[i].Enable(0)
   def MakeFilterCoef(self, rate, N, bw, center):
     """Make an I/Q filter with rectangular passband."""
-    center = abs(center)
-    lowpass = bw * 24000 // rate // 2
-    if lowpass in Filters:
-      filtD = Filters[lowpass]
-      #print ("Custom filter key %d rate %d bandwidth %d size %d" % (lowpass, rate, bw, len(filtD)))
-    else:
-      #print ("Window filter key %d rate %d bandwidth %d" % (lowpass, rate, bw))
-      if N is None:
-        shape = 1.5       # Shape factor at 88 dB
-        trans = (bw / 2.0 / rate) * (shape - 1.0)     # 88 dB atten
-        N = int(4.0 / trans)
-        if N > 1000:
-          N = 1000
-        N = (N // 2) * 2 + 1
-      K = bw * N // rate
-      filtD = []
-      pi = math.pi
-      sin = math.sin
-      cos = math.cos
-      for k in range(-N//2, N//2 + 1):
-        # Make a lowpass filter
-        if k == 0:
-          z = float(K) / N
-        else:
-          z = 1.0 / N * sin(pi * k * K / N) / sin(pi * k / N)
-        # Apply a windowing function
-        if 1:	# Blackman window
-          w = 0.42 + 0.5 * cos(2. * pi * k / N) + 0.08 * cos(4. * pi * k / N)
-        elif 0:	# Hamming
-          w = 0.54 + 0.46 * cos(2. * pi * k / N)
-        elif 0:	# Hanning
-          w = 0.5 + 0.5 * cos(2. * pi * k / N)
-        else:
-          w = 1
-        z *= w
-        filtD.append(z)
-    if center:
-      # Make a bandpass filter by tuning the low pass filter to new center frequency.
-      # Make two quadrature filters.
-      filtI = []
-      filtQ = []
-      tune = -1j * 2.0 * math.pi * center / rate
-      NN = len(filtD)
-      D = (NN - 1.0) / 2.0
-      for i in range(NN):
-        z = 2.0 * cmath.exp(tune * (i - D)) * filtD[i]
-        filtI.append(z.real)
-        filtQ.append(z.imag)
-      return filtI, filtQ
-    return filtD, filtD
+    return quisk_utils.MakeFilterCoef(rate, N, bw, center)
   def SetFilterByMode(self, mode):
     index = self.modeFilter[mode]
     try:
@@ -4807,27 +4820,7 @@ The new code supports multiple corrections per band.""")
       bw = int(self.filterButns.buttons[0].GetLabel())
     self.OnBtnFilter(None, bw)
   def GetFilterCenter(self, mode, bandwidth):
-    if mode in ('CWU', 'CWL'):
-      center = max(conf.cwTone, bandwidth // 2)
-    elif mode in ('LSB', 'USB'):
-      center = 300 + bandwidth // 2
-    elif mode in ('AM',):
-      center = 0
-    elif mode in ('FM',):
-      center = 0
-    elif mode in ('DGT-U', 'DGT-L'):
-      center = max(1500, bandwidth // 2)
-    elif mode in ('DGT-IQ', 'DGT-FM'):
-      center = 0
-    elif mode in ('FDV-U', 'FDV-L'):
-      center = max(1500, bandwidth // 2)
-    elif mode in ('IMD',):
-      center = 300 + bandwidth // 2
-    else:
-      center = 300 + bandwidth // 2
-    if mode in ('CWL', 'LSB', 'DGT-L', 'FDV-L'):
-      center = - center
-    return center
+    return quisk_utils.GetFilterCenter(mode, bandwidth, conf.cwTone)
   def OnBtnAdjFilter(self, event):
     btn = event.GetEventObject()
     bw = int(btn.GetLabel())
@@ -4907,6 +4900,16 @@ The new code supports multiple corrections per band.""")
       self.OnBtnScreen(None, 'Help')
     else:
       self.OnBtnScreen(None, self.screenBtnGroup.GetLabel())
+  def GetScreen(self, attr):
+    """Return the screen self.<attr>, and make it the first time it is used."""
+    screen = getattr(self, attr)
+    if screen is None:
+      screen = self.screen_makers[attr]()
+      screen.Hide()
+      self.vertBox.Insert(2, screen, 1)	# Insert after the config and graph screens
+      setattr(self, attr, screen)
+      StartupTime("Make %s" % attr)
+    return screen
   def OnBtnScreen(self, event, name=None):
     if event is not None:
       win = event.GetEventObject()
@@ -4931,23 +4934,23 @@ The new code supports multiple corrections per band.""")
       sash = self.screen.GetSashPosition()
       self.station_screen.Show()
     elif name == 'Scope':
+      self.screen = self.GetScreen('scope')
       if win.direction:				# Another push on the same button
         self.scope.running = 1 - self.scope.running		# Toggle run state
       else:				# Initial push of button
         self.scope.running = 1
-      self.screen = self.scope
     elif name == 'RX Filter':
-      self.screen = self.filter_screen
+      self.screen = self.GetScreen('filter_screen')
       self.freqDisplay.Display(self.screen.txFreq)
       self.screen.NewFilter()
     elif name == 'Bscope':
-      self.screen = self.bandscope_screen
+      self.screen = self.GetScreen('bandscope_screen')
       self.screen.SetTxFreq(self.txFreq, self.rxFreq)
     elif name == 'Audio FFT':
-      self.screen = self.audio_fft_screen
+      self.screen = self.GetScreen('audio_fft_screen')
       self.freqDisplay.Display(self.screen.txFreq)
     elif name == 'Help':
-      self.screen = self.help_screen
+      self.screen = self.GetScreen('help_screen')
     self.screen.Show()
     self.vertBox.Layout()	# This destroys the initialized sash position!
     self.sliderYs.SetValue(self.screen.y_scale)
@@ -5734,6 +5737,7 @@ The new code supports multiple corrections per band.""")
     phas = (d1 * lst[i2][3] + d2 * lst[i1][3]) / dx
     return ampl, phas
   def PostStartup(self):	# called once after sound attempts to start
+    StartupTime("First audio")
     self.config_screen.OnGraphData(None)	# update config in case sound is not running
     txt = self.sound_thread.config_text		# change config_text if StartSamples() returns a string
     if txt:
@@ -5902,7 +5906,10 @@ The new code supports multiple corrections per band.""")
         self.SetPTT(False)
     self.timer = time.time()
     if self.bandscope_clock:		# Hermes UDP protocol
-      data = QS.get_bandscope(self.bandscope_clock, self.bandscope_screen.zoom, float(self.bandscope_screen.zoom_deltaf))
+      if self.bandscope_screen:
+        data = QS.get_bandscope(self.bandscope_clock, self.bandscope_screen.zoom, float(self.bandscope_screen.zoom_deltaf))
+      else:
+        data = QS.get_bandscope(self.bandscope_clock, 1.0, 0.0)
       if data and self.screen == self.bandscope_screen:
         self.screen.OnGraphData(data)
     if self.screen == self.scope:
@@ -1319,6 +1319,47 @@ dc_remove_bw = 100
 #dc_remove_bw = 200
 #dc_remove_bw = 400
 
+## rx_fast_filter_taps		FFT filter taps, integer
+# Receive filters with at least this many coefficients are calculated with FFT convolution instead of
+# one sample at a time.  This saves a lot of processor time for the sharp filters used for narrow CW,
+# but adds a small delay of one FFT block.  Enter zero to never use FFT convolution.
+rx_fast_filter_taps = 256
+#rx_fast_filter_taps = 0
+#rx_fast_filter_taps = 512
+
+## rx_worker_threads		Sub-receiver threads, integer choice
+# The split receiver, the sub-receiver played with the main receiver, and the sub-receiver sent to a
+# digital output device are normally demodulated one after another on the sound thread.  Enter 1 to
+# demodulate them on separate threads at the same time as the main receiver.  This helps when several
+# sub-receivers are in use on a multi-core computer.  FreeDV is always demodulated on the sound thread.
+# This option is not available on Windows.
+rx_worker_threads = 0
+#rx_worker_threads = 1
+
+## spectrum_thread		Graph FFT thread, integer choice
+# The FFTs for the graph and waterfall are normally calculated on the GUI thread when it asks for new
+# graph data.  Enter 1 to calculate them on a separate thread as soon as the samples arrive.  The GUI
+# then only copies the finished graph, and FFT blocks are not lost when the GUI is busy.
+# This option is not available on Windows.
+spectrum_thread = 0
+#spectrum_thread = 1
+
+## udp_capture_thread		UDP capture thread, integer choice
+# For hardware that sends samples with UDP, the samples are normally read from the socket one
+# datagram at a time by the sound thread.  Enter 1 to read them on a separate capture thread that
+# reads many datagrams with each system call into a buffer.  This reduces the processor load at high
+# sample rates, and delays on the network do not delay the sound thread.  This option is only available on Linux.
+udp_capture_thread = 0
+#udp_capture_thread = 1
+
+## soapy_rx_buffers		SoapySDR Rx buffers, integer choice
+# For SoapySDR hardware, the samples are normally read from the device by the sound thread.  Enter a number of
+# buffers to read them on a separate reader thread that keeps that many device buffers in flight.  Delays in the
+# sound thread then do not cause the device to overflow.  The maximum is 64.  This option is not available on Windows.
+soapy_rx_buffers = 0
+#soapy_rx_buffers = 8
+#soapy_rx_buffers = 32
+
 
 
 
@@ -1356,6 +1397,14 @@ dxClPassword = ''
 # dxClExpireTime is the time in minutes until DX Cluster entries are removed.
 dxClExpireTime = 20
 
+## dxClReplayFile       Dx cluster replay file, text
+# The Dx cluster options log into a Dx cluster server, and put station information
+# on the station window under the graph and waterfall screens.
+# dxClReplayFile is the path of a file of captured Dx cluster text.  If it is not blank,
+# the spots are read from this file instead of the server.  This is used for testing.
+dxClReplayFile = ''
+#dxClReplayFile = '/home/jim/dx_cluster_log.txt'
+
 ## IQ_Server_IP         Pulse server IP address, text
 #IP Adddress for remote PulseAudio IQ server.
 IQ_Server_IP = ""
@@ -1560,6 +1609,12 @@ waterfall_graph_size = 80
 settings_file_path = ''
 #settings_file_path = /path/to/my/file/quisk_settings.json
 
+# Quisk saves the FFTW wisdom in a file so that FFT plans are made quickly the next time Quisk starts.
+# The default is quisk_fftw_wisdom.txt in the same directory as the settings file.  You can set a
+# different name here.
+fftw_wisdom_file = ''
+#fftw_wisdom_file = /path/to/my/file/quisk_fftw_wisdom.txt
+
 
 
 
@@ -1610,6 +1665,24 @@ keyupDelay = 23
 # refresh rate.
 fft_size_multiplier = 0
 
+## fft_window			FFT window, integer choice
+# This is the window function applied to the samples before the FFT for the graph and waterfall.
+# Hanning is a good general choice.  Blackman and Blackman-Harris have lower side lobes and show weak
+# signals near strong signals better.  Flat top gives the most accurate signal levels but wide peaks.
+# Levels are scaled so the graph and S-meter read the same for all windows.
+# Values are 0 Hanning, 1 Hamming, 2 Blackman, 3 Blackman-Harris, 4 flat top, 5 rectangular (no window).
+fft_window = 0
+#fft_window = 3
+#fft_window = 4
+
+## fft_overlap			FFT overlap percent, integer choice
+# Successive FFT blocks for the graph can share samples with the previous block.  An overlap of 50 or 75
+# percent averages more FFTs for each graph, and gives a smoother graph without increasing the FFT size.
+# It requires more processor power.  This does not apply to hardware that sends scanned FFT blocks.
+fft_overlap = 0
+#fft_overlap = 50
+#fft_overlap = 75
+
 ## graph_refresh			Graph refresh Hertz, integer
 # The graph_refresh is the frequency at which the graph is updated,
 # and should be about 5 to 10 Hertz.  Higher rates require more processor power.
@@ -97,11 +97,12 @@ class Hardware:
   # Quisk calls all methods in the hardware file from the GUI thread except for StartSamples(),
   #   GetRxSamples() and StopSamples() which are called from the sound thread.
   # The sound thread starts with StartSamples() and is not running during the calls to pre_open() and open().
-  def InitSamples(self, int_size, endian):	# Rx sample initialization; you must call this from your hardware __init__().
+  def InitSamples(self, int_size, endian, is_float=False):	# Rx sample initialization; you must call this from your hardware __init__().
     # int_size is the number of bytes in each I or Q sample: 1, 2, 3, or 4
     # endian is the order of bytes in the sample: 0 == little endian; 1 == big endian
+    # is_float is True for IEEE float32 samples with full scale 1.0; int_size must be 4
     # This can be called again to change the format. For example, a different number of bytes for different sample rates.
-    QS.set_params(rx_bytes=int_size, rx_endian=endian)
+    QS.set_params(rx_bytes=int_size, rx_endian=endian, rx_float=int(is_float))
     self.application.samples_from_python = True
   def InitBscope(self, int_size, endian, clock, length):	# Bandscope initialization; accept raw samples from the ADC
     # You may call this once from your hardware __init__() after calling InitSamples(). The bandscope format can not be changed.
@@ -124,7 +125,10 @@ class Hardware:
     # For Python 3, "samples" must be a byte array or bytes; use s = bytearray(2), or s = b"\x55\x44" or similar.
     # For Python 2, "samples" must be a byte array or bytes or a string.
     # The byte length must represent a whole number of samples. No partial records.
-    QS.add_rx_samples(samples)
+    # Return the number of bytes accepted.  If the sample ring is full, only the first part of "samples" is
+    # accepted, and the rest is dropped unless you keep it and send it again before any new samples, as the
+    # SDR-IQ hardware file does.  Return None if "samples" is invalid.
+    return QS.add_rx_samples(samples)
   def AddBscopeSamples(self, samples):	# Call this from within GetRxSamples() to record the bandscope samples.
     # "samples" is the whole block of integer samples from the ADC.
     # For Python 3, "samples" must be a byte array or bytes; use s = bytearray(2), or s = b"\x55\x44" or similar.
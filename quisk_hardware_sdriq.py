@@ -133,6 +133,7 @@ class Sdriq:
     self.sdr_name = ''			# name as reported by the hardware
     self.sdr_serial = ''		# serial number as reported by the hardware
     self.sdr_data = bytearray(0)	# the data block sent by the SDR-IQ
+    self.rx_pending = None		# Rx samples not yet accepted by AddRxSamples()
     self.sdr_state = 0
     if not serial:
       self.port = None
@@ -281,6 +282,12 @@ class Sdriq:
     # Be sure to empty out the ft245 frequently so its buffer does not overflow.
     if not self.port:
       return
+    if self.rx_pending:		# send the rest of the last samples before reading more
+      n = self.hardware.AddRxSamples(self.rx_pending)
+      if n is not None and n < len(self.rx_pending):
+        self.rx_pending = self.rx_pending[n:]
+        return
+      self.rx_pending = None
     data = self.port.read(8192)		# this is a blocking read for SDRIQ_READ_TIME seconds
     if isinstance(data, Q3StringTypes):
       data = bytearray(data)
@@ -342,7 +349,12 @@ class Sdriq:
               self.sdriq_idle = self.sdr_data[3]
               if (DEBUG): print("sdriq_idle", self.sdriq_idle)
           elif self.sdr_type == 4 and self.sdr_length == 8192:	# ADC sample block
-            self.hardware.AddRxSamples(self.sdr_data)
+            if self.rx_pending:		# keep the samples in order after the sample ring was full
+              self.rx_pending += self.sdr_data
+            else:
+              n = self.hardware.AddRxSamples(self.sdr_data)
+              if n is not None and n < len(self.sdr_data):
+                self.rx_pending = self.sdr_data[n:]
       elif self.sdr_state == 9:		# out of sync; try to re-synchronize
         # look for the start of data blocks "\x00\x80"
         byte = data[index]
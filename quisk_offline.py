@@ -0,0 +1,158 @@
+#! /usr/bin/python
+
+# All QUISK software is Copyright (C) 2006-2018 by James C. Ahlstrom.
+# This free software is licensed for use under the GNU General Public
+# License (GPL), see http://www.opensource.org.
+# Note that there is NO WARRANTY AT ALL.  USE AT YOUR OWN RISK!!
+
+"""Demodulate recorded I/Q samples with the Quisk receive chain, without hardware or sound devices.
+
+Usage:  python quisk_offline.py [options] input.wav output.wav
+The input is a stereo WAV file of I/Q samples, and the output is a stereo WAV file of
+16-bit audio at 48000 sps.  The samples are processed faster than real time.
+
+From Python, make a Demodulator and call Demodulate() with blocks of samples:
+  demod = quisk_offline.Demodulator(192000, 'USB', 2700, tune=12000)
+  audio = demod.Demodulate(samples)
+The samples are a numpy array of complex I/Q samples with full scale 1.0, or bytes of packed samples.
+The filter and AGC state continue from one block to the next.  The sound must not be running.
+All Demodulators share one receive chain.  Each call uses its own filter, but the filter and AGC history
+is shared, so finish one recording before starting the next rather than interleaving calls.
+"""
+
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+
+import struct
+try:
+  import numpy		# Optional; used to pass arrays of samples
+except ImportError:
+  numpy = None
+import _quisk as QS
+import quisk_utils
+
+Mode2Index = {'CWL':0, 'CWU':1, 'LSB':2, 'USB':3, 'AM':4, 'FM':5, 'DGT-U':7, 'DGT-L':8, 'DGT-IQ':9,
+      'IMD':10, 'DGT-FM':13}	# modes that can be processed offline; not EXT or FreeDV
+
+class Demodulator:
+  """Demodulate blocks of I/Q samples and return audio at 48000 sps."""
+  def __init__(self, sample_rate, mode='USB', bandwidth=2700, tune=0, cw_tone=600):
+    # sample_rate is the I/Q sample rate, at least 48000 sps
+    # mode is the receive mode such as 'USB'; see Mode2Index
+    # bandwidth is the filter bandwidth in Hertz
+    # tune is the frequency in Hertz of the signal relative to the center of the samples
+    if mode not in Mode2Index:
+      raise ValueError("Unsupported mode %s" % mode)
+    self.sample_rate = int(sample_rate)
+    self.mode = mode
+    self.tune = float(tune)
+    frate = QS.get_filter_rate(Mode2Index[mode], bandwidth, self.sample_rate)
+    self.bandwidth = min(bandwidth, frate // 2)
+    center = quisk_utils.GetFilterCenter(mode, self.bandwidth, cw_tone)
+    self.filter_I, self.filter_Q = quisk_utils.MakeFilterCoef(frate, None, self.bandwidth, center)
+    self.reset = 1
+  def Demodulate(self, samples, sample_bytes=0, is_float=False):
+    """Return the audio for this block of samples.
+
+    If sample_bytes is zero, the samples are complex with full scale 1.0.  Otherwise the samples
+    are bytes of little-endian integers or float32 with sample_bytes each for I and then Q.
+    The audio is a numpy complex array if numpy is available, or else bytes of complex double.
+    The left channel is the real part and the right channel is the imaginary part, with full scale 1.0.
+    """
+    if numpy is not None and isinstance(samples, numpy.ndarray):
+      samples = numpy.ascontiguousarray(samples, dtype=numpy.complex128)
+      sample_bytes = 0
+    audio = QS.process_iq(samples, self.sample_rate, Mode2Index[self.mode], self.tune,
+        self.filter_I, self.filter_Q, self.bandwidth, sample_bytes, int(is_float), self.reset)
+    self.reset = 0
+    if numpy is not None:
+      return numpy.frombuffer(audio, dtype=numpy.complex128)
+    return audio
+
+class WavReader:
+  """Read the samples from a stereo PCM or float WAV file of I/Q samples."""
+  def __init__(self, path):
+    self.fp = open(path, 'rb')
+    riff, size, wave = struct.unpack('<4sI4s', self.fp.read(12))
+    if riff != b'RIFF' or wave != b'WAVE':
+      raise ValueError("%s is not a WAV file" % path)
+    self.data_bytes = None
+    while self.data_bytes is None:
+      header = self.fp.read(8)
+      if len(header) < 8:
+        raise ValueError("%s has no data chunk" % path)
+      name, size = struct.unpack('<4sI', header)
+      if name == b'fmt ':
+        fmt = self.fp.read(size)
+        tag, self.channels, self.sample_rate = struct.unpack('<HHI', fmt[0:8])
+        self.sample_bytes = struct.unpack('<H', fmt[14:16])[0] // 8
+        if tag == 0xFFFE:		# WAVE_FORMAT_EXTENSIBLE; the format is at the start of the GUID
+          tag = struct.unpack('<H', fmt[24:26])[0]
+        self.is_float = tag == 3
+        if size % 2:
+          self.fp.read(1)
+      elif name == b'data':
+        self.data_bytes = size
+      else:
+        self.fp.seek(size + size % 2, 1)
+    if self.channels != 2:
+      raise ValueError("%s must have two channels for I and Q" % path)
+    if self.is_float and self.sample_bytes != 4:
+      raise ValueError("%s must have float32 samples" % path)
+    if not self.is_float and self.sample_bytes not in (2, 3, 4):
+      raise ValueError("%s must have 16, 24 or 32 bit samples" % path)
+  def Read(self, count):
+    """Return bytes for up to count I/Q samples, or an empty string at the end."""
+    nbytes = min(count * self.sample_bytes * 2, self.data_bytes)
+    nbytes -= nbytes % (self.sample_bytes * 2)
+    self.data_bytes -= nbytes
+    return self.fp.read(nbytes)
+  def close(self):
+    self.fp.close()
+
+def DemodulateWav(in_path, out_path, mode='USB', bandwidth=2700, tune=0, cw_tone=600, block=48000):
+  """Demodulate an I/Q WAV file and write the audio to a stereo 16-bit WAV file at 48000 sps."""
+  import wave
+  reader = WavReader(in_path)
+  demod = Demodulator(reader.sample_rate, mode, bandwidth, tune, cw_tone)
+  writer = wave.open(out_path, 'wb')
+  writer.setnchannels(2)
+  writer.setsampwidth(2)
+  writer.setframerate(48000)
+  try:
+    while True:
+      data = reader.Read(block)
+      if not data:
+        break
+      audio = demod.Demodulate(data, reader.sample_bytes, reader.is_float)
+      if numpy is not None:
+        stereo = numpy.empty(len(audio) * 2)
+        stereo[0::2] = audio.real
+        stereo[1::2] = audio.imag
+        writer.writeframes(numpy.clip(stereo * 32767, -32767, 32767).astype('<i2').tobytes())
+      else:
+        stereo = struct.unpack('<%dd' % (len(audio) // 8), audio)
+        writer.writeframes(struct.pack('<%dh' % len(stereo), *[int(max(-1.0, min(1.0, x)) * 32767) for x in stereo]))
+  finally:
+    reader.close()
+    writer.close()
+
+def main():
+  from optparse import OptionParser
+  parser = OptionParser(usage="usage: %prog [options] input.wav output.wav")
+  parser.add_option('-m', '--mode', dest='mode', default='USB',
+		help='Receive mode: ' + ', '.join(sorted(Mode2Index)))
+  parser.add_option('-b', '--bandwidth', dest='bandwidth', type='int', default=2700,
+		help='Filter bandwidth in Hertz')
+  parser.add_option('-t', '--tune', dest='tune', type='float', default=0.0,
+		help='Frequency of the signal relative to the center of the samples in Hertz')
+  parser.add_option('', '--cw-tone', dest='cw_tone', type='int', default=600,
+		help='CW tone frequency in Hertz')
+  options, args = parser.parse_args()
+  if len(args) != 2:
+    parser.error("Enter the input and output file names")
+  DemodulateWav(args[0], args[1], options.mode, options.bandwidth, options.tune, options.cw_tone)
+
+if __name__ == '__main__':
+  main()
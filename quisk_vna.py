@@ -23,6 +23,10 @@ if sys.path[0] != '':		# Make sure the current working directory is on path
 import wx, wx.html, wx.lib.stattext, wx.lib.colourdb
 import math, cmath, time, traceback, string, pickle
 import threading, webbrowser
+try:
+  import numpy		# Optional; used to calculate the whole sweep with array operations
+except ImportError:
+  numpy = None
 import _quisk as QS
 from quisk_widgets import *
 import configure
@@ -38,6 +42,22 @@ parser.add_option('', '--config2', dest='config_file_path2', default='',
 		help='Specify a second configuration file to read after the first')
 parser.add_option('-a', '--ask', action="store_true", dest='AskMe', default=False,
 		help='Ask which radio to use when starting')
+parser.add_option('', '--average', dest='average', type='int', default=1,
+		help='Average this many sweeps')
+parser.add_option('', '--sweeps', dest='sweeps', type='int', default=0,
+		help='Measure this many sweeps without the GUI and write them to files')
+parser.add_option('', '--mode', dest='mode', default='reflection', choices=('reflection', 'transmission'),
+		help='The sweep mode without the GUI, reflection or transmission')
+parser.add_option('', '--start', dest='start', type='float', default=1.0,
+		help='The start frequency in MHz without the GUI')
+parser.add_option('', '--stop', dest='stop', type='float', default=30.0,
+		help='The stop frequency in MHz without the GUI')
+parser.add_option('', '--points', dest='points', type='int', default=0,
+		help='The number of points in each sweep without the GUI')
+parser.add_option('', '--output', dest='output', default='quisk_vna',
+		help='The path and file name prefix of the sweep files')
+parser.add_option('', '--s2p', action="store_true", dest='s2p', default=False,
+		help='Write transmission sweeps to .s2p files with zero for the unmeasured parameters instead of .csv files')
 argv_options = parser.parse_args()[0]
 ConfigPath = argv_options.config_file_path	# Get config file path
 ConfigPath2 = argv_options.config_file_path2
@@ -119,6 +139,147 @@ class SoundThread(threading.Thread):
     """Set a flag to indicate that the sound thread should end."""
     self.doQuit.set()
 
+def SweepFrequencies(start, stop, width):
+  """Return a list of the frequency in Hertz for each point of a sweep."""
+  return [int(start + float(stop - start) * i / (width - 1) + 0.5) for i in range(width)]
+
+def MakeErrorTerms(mode, cal, data_freq, correct_delta, correct_width):
+  """Return the error terms A, B and C for each frequency as lists of complex.
+
+  The corrected reflection or transmission is (V - A) / (B * V + C).  The calibration
+  lists are the attributes reflection_short, etc. of "cal".
+  """
+  A = []
+  B = []
+  C = []
+  for freq in data_freq:
+    # Find the corresponding index into the correction array
+    i = int(freq / correct_delta)
+    if i > correct_width - 2:
+      i = correct_width - 2
+    dd = float(freq - i * correct_delta) / correct_delta	# fractional part of next index for linear interpolation
+    def Interp(correct):	# linear interpolation
+      if correct is None:
+        return None
+      return correct[i] + (correct[i+1] - correct[i]) * dd
+    if mode == 'Reflection':
+      Vs = Interp(cal.reflection_short)
+      Vo = Interp(cal.reflection_open)
+      Vl = Interp(cal.reflection_load)
+      if Vs is not None and Vo is not None and Vl is not None:
+        S11 = Vl
+        VVop = Vo - S11
+        VVsh = Vs - S11
+        try:
+          S12S21 = 2.0 * VVop * VVsh / (VVsh - VVop)
+          S22 = (VVop + VVsh) / (VVop - VVsh)
+        except ZeroDivisionError:	# Mark the point as bad
+          A.append(0j)
+          B.append(0j)
+          C.append(0j)
+          continue
+        #print ('Vs Vo Vl', abs(Vs), abs(Vo), abs(Vl), 'S22', abs(S22), 'S1221', abs(S12S21))
+        A.append(S11)
+        B.append(S22)
+        C.append(S12S21 - S22 * S11)
+      else:
+        if Vo is not None:
+          correct = Vo
+          if Vs is not None:
+            correct = (correct - Vs) / 2.0
+        else:		# Use Short
+          correct = - Vs
+        A.append(0j)
+        B.append(0j)
+        C.append(correct)
+    else:	# Mode is transmission
+      Vo = Interp(cal.transmission_open)
+      if Vo is None:
+        A.append(0j)
+      else:
+        A.append(Vo)
+      B.append(0j)
+      C.append(Interp(cal.transmission_short))
+  return A, B, C
+
+def CorrectSweep(volts, terms):
+  """Return a list of the corrected value (V - A) / (B * V + C) for each point of a sweep."""
+  bad = (50E3 - 50) / (50E3 + 50)	# the reflection of a bad point, as in the graph
+  A, B, C = terms
+  if numpy:
+    volts = numpy.asarray(volts, dtype=complex)
+    with numpy.errstate(all='ignore'):
+      value = (volts - numpy.asarray(A)) / (numpy.asarray(B) * volts + numpy.asarray(C))
+    value[~ numpy.isfinite(value)] = bad
+    return value.tolist()
+  value = []
+  for x in range(len(volts)):
+    try:
+      value.append((volts[x] - A[x]) / (B[x] * volts[x] + C[x]))
+    except ZeroDivisionError:
+      value.append(bad)
+  return value
+
+class SweepAverage:
+  """Average the sweep voltages with a running mean.
+
+  The first "count" sweeps are averaged equally, and later sweeps continue as a moving average
+  with the same time constant.  Only the mean is kept, not the sweep history.
+  """
+  def __init__(self, count):
+    self.count = max(1, count)
+    self.Reset()
+  def Reset(self):
+    self.number = 0	# the number of sweeps in the mean
+    self.mean = None
+  def Add(self, volts):
+    if self.count == 1:
+      self.number = 1
+      return volts
+    if self.mean is None or len(self.mean) != len(volts):
+      self.number = 0
+    self.number = min(self.number + 1, self.count)
+    if self.number == 1:
+      if numpy:
+        self.mean = numpy.array(volts, dtype=complex)
+      else:
+        self.mean = list(volts)
+    elif numpy:
+      self.mean += (volts - self.mean) / self.number
+    else:
+      mean = self.mean
+      for x in range(len(mean)):
+        mean[x] += (volts[x] - mean[x]) / self.number
+    return self.mean
+
+class TouchstoneWriter:
+  """Write one sweep to a Touchstone or CSV file a point at a time.
+
+  Reflection is written as S11 in a ".s1p" file.  Transmission is written as S21 in a ".csv" file
+  with columns freq_hz, s21_re and s21_im.  If ext is "s2p", transmission is written as S21 in a
+  ".s2p" file instead, and the other parameters are written as zero because they are not measured.
+  """
+  def __init__(self, path, mode, ext):
+    self.mode = mode
+    self.ext = ext
+    self.fp = open(path, "w")
+    if ext == 'csv':
+      self.fp.write("freq_hz,s21_re,s21_im\n")
+      return
+    self.fp.write("! Quisk VNA %s sweep %s\n" % (mode, time.asctime()))
+    if ext == 's2p':
+      self.fp.write("! Only S21 is measured; S11, S12 and S22 are written as zero\n")
+    self.fp.write("# HZ S RI R 50\n")
+  def Write(self, freq, value):
+    if self.ext == 'csv':
+      self.fp.write("%d,%.9g,%.9g\n" % (freq, value.real, value.imag))
+    elif self.ext == 's2p':
+      self.fp.write("%d 0 0 %.9g %.9g 0 0 0 0\n" % (freq, value.real, value.imag))
+    else:
+      self.fp.write("%d %.9g %.9g\n" % (freq, value.real, value.imag))
+  def Close(self):
+    self.fp.close()
+
 class GraphDisplay(wx.Window):
   """Display the graph within the graph screen."""
   def __init__(self, parent, x, y, graph_width, height, chary):
@@ -259,6 +420,9 @@ class GraphScreen(wx.Window):
     self.data_impedance = []
     self.data_reflect = []
     self.data_freq = [0] * data_width
+    self.data_freq_range = None	# the start and stop frequency of data_freq
+    self.error_terms = None	# the calibration error terms for the current mode and sweep
+    self.error_terms_key = None
     self.tick = max(2, h * 3 // 10)
     self.originX = w * 5
     self.offsetY = h + self.tick
@@ -469,6 +633,9 @@ class GraphScreen(wx.Window):
   def OnGraphData(self, volts):
     # SWR = (1 + rho) / (1 - rho)
     # Create graph lines
+    if numpy:
+      self.OnGraphArray(volts)
+      return
     mode = self.mode
     del self.display.line_mag[:]
     del self.display.line_phase[:]
@@ -499,46 +666,15 @@ class GraphScreen(wx.Window):
         y = int(y)
         self.display.line_phase.append(y)
     elif mode == 'Reflection':
+      A, B, C = self.GetErrorTerms()
       for x in range(self.graph_width):
-        delta = self.correct_delta
-        # Find the frequency for this pixel
-        freq = self.data_freq[x]
-        # Find the corresponding index into the correction array
-        i = int(freq / delta)
-        if i > self.correct_width - 2:
-          i = self.correct_width - 2
-        dd = float(freq - i * delta) / delta	# fractional part of next index for linear interpolation
         Vx = volts[x]
-        # linear interpolation
-        if application.reflection_short is not None and application.reflection_open is not None and application.reflection_load is not None:
-          Vs = application.reflection_short[i] + (application.reflection_short[i+1] - application.reflection_short[i]) * dd
-          Vo = application.reflection_open[i] + (application.reflection_open[i+1] - application.reflection_open[i]) * dd
-          Vl = application.reflection_load[i] + (application.reflection_load[i+1] - application.reflection_load[i]) * dd
-          S11 = Vl
-          VVop = Vo - S11
-          VVsh = Vs - S11
-          try:
-            S12S21 = 2.0 * VVop * VVsh / (VVsh - VVop)
-            S22 = (VVop + VVsh) / (VVop - VVsh)
-            reflect = (Vx - S11) / (S12S21 + S22 * (Vx - S11))
-            Z = 50.0 * (1.0 + reflect) / (1.0 - reflect)
-          except:
-            Z = 50E3
-            reflect = (Z - 50) / (Z + 50)
-          #print ('Vs Vo Vl', abs(Vs), abs(Vo), abs(Vl), 'S22', abs(S22), 'S1221', abs(S12S21))
-        else:
-          if application.reflection_open is not None:
-            correct = application.reflection_open[i] + (application.reflection_open[i+1] - application.reflection_open[i]) * dd
-            if application.reflection_short is not None:
-              correct = (correct - (application.reflection_short[i] + (application.reflection_short[i+1] - application.reflection_short[i]) * dd)) / 2.0
-          else:		# Use Short
-            correct = - (application.reflection_short[i] + (application.reflection_short[i+1] - application.reflection_short[i]) * dd)
-          try:
-            reflect = volts[x] / correct
-            Z = 50.0 * (1.0 + reflect) / (1.0 - reflect)
-          except:
-            Z = 50E3
-            reflect = (Z - 50) / (Z + 50)
+        try:
+          reflect = (Vx - A[x]) / (B[x] * Vx + C[x])
+          Z = 50.0 * (1.0 + reflect) / (1.0 - reflect)
+        except:
+          Z = 50E3
+          reflect = (Z - 50) / (Z + 50)
         self.data_reflect.append(reflect)
         self.data_impedance.append(Z)
         magn = abs(reflect)
@@ -560,19 +696,9 @@ class GraphScreen(wx.Window):
         y = self.swrZero - int( - swr * self.swrSlope / 360.0 + 0.5)
         self.display.line_swr.append((x,y))
     else:	# Mode is transmission
+      A, B, C = self.GetErrorTerms()
       for x in range(self.graph_width):
-        delta = self.correct_delta
-        # Find the frequency for this pixel
-        freq = self.data_freq[x]
-        # Find the corresponding index into the correction array
-        i = int(freq / delta)
-        if i > self.correct_width - 2:
-          i = self.correct_width - 2
-        dd = float(freq - i * delta) / delta	# fractional part of next index for linear interpolation
-        trans = volts[x]
-        if application.transmission_open is not None:
-          trans -= application.transmission_open[i] + (application.transmission_open[i+1] - application.transmission_open[i]) * dd
-        trans /= application.transmission_short[i] + (application.transmission_short[i+1] - application.transmission_short[i]) * dd
+        trans = (volts[x] - A[x]) / C[x]
         self.data_reflect.append(trans)
         self.data_impedance.append(50)
         magn = abs(trans)
@@ -589,13 +715,82 @@ class GraphScreen(wx.Window):
         y = int(y)
         self.display.line_phase.append(y)
     self.display.Refresh()
+  def GetErrorTerms(self):
+    # Return the error terms A, B and C for each pixel.  The corrected reflection is (V - A) / (B * V + C).
+    # The terms depend only on the calibration and the sweep, so they are calculated once and saved with the calibration.
+    mode = self.mode
+    key = (self.freq_start, self.freq_stop, self.data_width, application.calibrate_time)
+    if self.error_terms is not None and self.error_terms_key == (mode, key):
+      return self.error_terms
+    saved = application.error_terms.get(mode)
+    if saved and saved[0] == key:
+      terms = saved[1]
+    else:
+      terms = MakeErrorTerms(mode, application, self.data_freq[0:self.graph_width], self.correct_delta, self.correct_width)
+      application.error_terms[mode] = (key, terms)
+      application.state_dirty = True		# saved when the program exits
+    if numpy:
+      terms = tuple([numpy.array(t, dtype=complex) for t in terms])
+    self.error_terms = terms
+    self.error_terms_key = (mode, key)
+    return terms
+  def OnGraphArray(self, volts):
+    # This is OnGraphData() for a numpy array of volts.  The whole sweep is calculated at once.
+    mode = self.mode
+    width = self.graph_width
+    pixels = numpy.arange(width)
+    if mode == 'Calibrate':
+      self.calibrate_tmp += volts
+      self.calibrate_count += 1
+      values = volts[pixels * self.correct_width // self.data_width]
+      reflect = numpy.zeros(width, dtype=complex)
+      Z = numpy.full(width, 50.0, dtype=complex)
+    else:
+      A, B, C = self.GetErrorTerms()
+      Vx = volts[0:width]
+      with numpy.errstate(all='ignore'):
+        reflect = (Vx - A) / (B * Vx + C)
+        if mode == 'Reflection':
+          Z = 50.0 * (1.0 + reflect) / (1.0 - reflect)
+          bad = ~ (numpy.isfinite(Z) & numpy.isfinite(reflect))
+          Z[bad] = 50E3
+          reflect[bad] = (50E3 - 50) / (50E3 + 50)
+        else:	# Mode is transmission
+          Z = numpy.full(width, 50.0, dtype=complex)
+      values = reflect
+    magn = numpy.abs(values)
+    db = numpy.full(width, -120.0)
+    big = magn >= 1e-6
+    db[big] = 20.0 * numpy.log10(magn[big])
+    phase = numpy.angle(values, deg=True)
+    self.data_mag = db.tolist()
+    self.data_phase = phase.tolist()
+    self.data_reflect = reflect.tolist()
+    self.data_impedance = Z.tolist()
+    x = pixels.tolist()
+    # The int() of the scalar code truncates toward zero
+    y = self.leftZero - numpy.trunc(- db * self.leftSlope / 360.0 + 0.5).astype(int)
+    self.display.line_mag = list(zip(x, y.tolist()))
+    y = self.rightZero - numpy.trunc(- phase * self.rightSlope / 360.0 + 0.5).astype(int)
+    self.display.line_phase = y.tolist()
+    if mode == 'Reflection':
+      magn = numpy.abs(reflect)
+      with numpy.errstate(all='ignore'):
+        swr = (1.0 + magn) / (1.0 - magn)
+      swr[~ ((swr >= 0.999) & (swr <= 99))] = 99.0
+      y = self.swrZero - numpy.trunc(- swr * self.swrSlope / 360.0 + 0.5).astype(int)
+      self.display.line_swr = list(zip(x, y.tolist()))
+    else:
+      self.display.line_swr = []
+    self.display.Refresh()
   def NewFreq(self, start, stop):
     if self.freq_start != start or self.freq_stop != stop:
       self.ClearGraph()
     self.freq_start = start
     self.freq_stop = stop
-    for i in range(self.data_width):	# The frequency in Hertz for every graph pixel
-      self.data_freq[i] = int(start + float(stop - start) * i / (self.data_width - 1) + 0.5)
+    if self.data_freq_range != (start, stop):
+      self.data_freq_range = (start, stop)
+      self.data_freq = SweepFrequencies(start, stop, self.data_width)	# The frequency in Hertz for every graph pixel
     self.SetTxFreq(index=self.display.tune_tx)
     self.doResize = True
   def SetTxFreq(self, freq=None, index=None):
@@ -792,6 +987,7 @@ class CalibrateDialog(wx.Dialog):
       app.transmission_short = self.correct_short
       app.transmission_open = self.correct_open
     app.calibrate_time = time.asctime()
+    app.error_terms = {}
     app.EnableButtons()
     app.SetCalText()
     app.SaveState()
@@ -831,8 +1027,11 @@ class CalibrateDialog(wx.Dialog):
       elif self.mode == "Load":
         self.txt_load.SetLabel("Not done")
       return
-    for i in range(application.correct_width):
-      data[i] /= count
+    if numpy:		# save the calibration as a list of complex
+      data = (data / count).tolist()
+    else:
+      for i in range(application.correct_width):
+        data[i] /= count
     if self.mode == "Short":
       self.txt_short.SetLabel("Done")
       self.correct_short = data
@@ -843,25 +1042,11 @@ class CalibrateDialog(wx.Dialog):
       self.txt_load.SetLabel("Done")
       self.correct_load = data
 
-class App(wx.App):
-  """Class representing the application."""
+class VnaCommon:
+  """The parts of the VNA program that do not need the GUI.  They are shared by App and HeadlessApp."""
   StateNames = ['transmission_open', 'transmission_short', 'reflection_open', 'reflection_short', 'reflection_load', 'calibrate_time',
-    'calibrate_version']
-  def __init__(self):
-    global application
-    application = self
-    self.bottom_widgets = None
-    self.is_vna_program = None
-    if sys.stdout.isatty():
-      wx.App.__init__(self, redirect=False)
-    else:
-      wx.App.__init__(self, redirect=True)
-  def OnInit(self):
-    """Perform most initialization of the app here (called by wxPython on startup)."""
-    wx.lib.colourdb.updateColourDB()	# Add additional color names
-    import quisk_widgets		# quisk_widgets needs the application object
-    quisk_widgets.application = self
-    del quisk_widgets
+    'calibrate_version', 'error_terms']
+  def ReadConfig(self, headless=False):
     global conf		# conf is the module for all configuration data
     import quisk_conf_defaults as conf
     setattr(conf, 'config_file_path', ConfigPath)
@@ -880,31 +1065,18 @@ class App(wx.App):
     else:
       setattr(conf, 'config_file_exists', False)
     # Read in configuration from the selected radio
-    if configure: self.local_conf = configure.Configuration(self, argv_options.AskMe)
+    if configure: self.local_conf = configure.Configuration(self, argv_options.AskMe, headless)
     if configure: self.local_conf.UpdateConf()
-    # Choose whether to use Unicode or text symbols
-    for k in ('sym_stat_mem', 'sym_stat_fav', 'sym_stat_dx',
-        'btn_text_range_dn', 'btn_text_range_up', 'btn_text_play', 'btn_text_rec', 'btn_text_file_rec', 
-		'btn_text_file_play', 'btn_text_fav_add',
-        'btn_text_fav_recall', 'btn_text_mem_add', 'btn_text_mem_next', 'btn_text_mem_del'):
-      if conf.use_unicode_symbols:
-        setattr(conf, 'X' + k, getattr(conf, 'U' + k))
-      else:
-        setattr(conf, 'X' + k, getattr(conf, 'T' + k))
-    MakeWidgetGlobals()
-    self.BtnRfGain = None
-    self.graph_freq = 7e6
-    self.graph_index = 50
+  def InitState(self):
     self.transmission_open = None
     self.transmission_short = None
     self.reflection_open = None
     self.reflection_short = None
     self.reflection_load = None
-    self.reflection_cal = "Cal x"
-    self.transmission_cal = "Cal x"
     self.calibrate_time = time.asctime()
     self.calibrate_version = 1
-    QS.set_params(quisk_is_vna=1)	# Call this only if we are the VNA program
+    self.error_terms = {}		# For each mode, the sweep key and the lists of error terms A, B, C
+  def MakeHardware(self):
     # Open hardware file
     self.firmware_version = None
     global Hardware
@@ -930,23 +1102,7 @@ class App(wx.App):
     Hardware = self.Hardware
     # Initialization
     if configure: self.local_conf.Initialize()
-    # get the screen size
-    x, y, self.screen_width, self.screen_height = wx.Display().GetGeometry()
-    self.Bind(wx.EVT_QUERY_END_SESSION, self.OnEndSession)
-    self.sample_rate = 48000
-    self.timer = time.time()		# A seconds clock
-    self.time0 = 0			# timer to display fields
-    self.clip_time0 = 0			# timer to display a CLIP message on ADC overflow
-    self.heart_time0 = self.timer	# timer to call HeartBeat at intervals
-    self.running = False
-    self.startup = True
-    self.save_data = []
-    self.frequency = 0
-    self.main_frame = frame = QMainFrame(10, 10)
-    self.SetTopWindow(frame)
-    # Find the data width, the width of returned graph data.
-    width = self.screen_width * conf.graph_width
-    width = int(width)
+  def SetDataWidth(self, width):
     self.data_width = width
     # correct_delta is the spacing of correction points in Hertz
     if conf.use_rx_udp == 10:		# Hermes UDP protocol
@@ -963,10 +1119,12 @@ class App(wx.App):
     else:
       self.has_SetVNA = False
       self.correct_delta = 1
+  def RestoreState(self):
     # Restore persistent program state
     self.init_path = os.path.join(os.path.dirname(ConfigPath), '.quisk_vna_init.pkl')
+    self.state_dirty = False		# the state changed and must be saved
     try:
-      fp = open(self.init_path, "r")
+      fp = open(self.init_path, "rb")
       d = pickle.load(fp)
       fp.close()
       for k in d:
@@ -975,15 +1133,146 @@ class App(wx.App):
           setattr(self, k, v)
     except:
       pass #traceback.print_exc()
+  def RecordApp(self, h):
+    QS.set_enable_bandscope(0)
+    if not conf.fftw_wisdom_file:
+      if conf.settings_file_path:
+        conf.fftw_wisdom_file = os.path.join(os.path.dirname(conf.settings_file_path), "quisk_fftw_wisdom.txt")
+      else:
+        conf.fftw_wisdom_file = os.path.join(conf.DefaultConfigDir, "quisk_fftw_wisdom.txt")
+    # FFT size must equal the data_width so that all data points are returned!
+    QS.record_app(self, conf, self.data_width, self.data_width, self.data_width,
+                 1, self.sample_rate, h)
+  def OpenHardware(self):
+    if hasattr(Hardware, 'pre_open'):       # pre_open() is called before open()
+      Hardware.pre_open()
+    if conf.use_rx_udp == 10:		# Hermes UDP protocol
+      self.add_version = False
+      conf.tx_ip = Hardware.hermes_ip
+      conf.tx_audio_port = conf.rx_udp_port
+    elif conf.use_rx_udp:
+      self.add_version = True		# Add firmware version to config text
+      conf.rx_udp_decimation = 8 * 8 * 8
+      if not conf.tx_ip:
+        conf.tx_ip = conf.rx_udp_ip
+      if not conf.tx_audio_port:
+        conf.tx_audio_port = conf.rx_udp_port + 2
+    else:
+      self.add_version = False
+    # Open the hardware.  This must be called before open_sound().
+    self.config_text = Hardware.open()
+    self.status_error = "No hardware response"	# possible error messages
+    if self.config_text:
+      self.SetConfigText(self.config_text)
+      if conf.use_rx_udp == 10:		# Hermes UDP protocol
+        if self.config_text[0:12] == "Capture from":
+          self.status_error = ''
+    else:
+      self.config_text = "Missing config_text"
+    # Note: Subsequent calls to set channels must not name a higher channel number.
+    #       Normally, these calls are only used to reverse the channels.
+    QS.open_sound(conf.name_of_sound_capt, '', self.sample_rate,
+                conf.data_poll_usec, conf.latency_millisecs,
+                '', conf.tx_ip, conf.tx_audio_port,
+                48000, 0, 0, 1.0, '', 48000)
+  def SaveState(self):
+    if self.init_path:		# save current program state
+      d = {}
+      for n in self.StateNames:
+        d[n] = getattr(self, n)
+      configure.SaveStateFile(self.init_path, pickle.dumps(d), True)	# Pickle requires a bytes object
+      self.state_dirty = False
+  def ReadGraphList(self):
+    # Return a block of normalized graph data ending at the zero marker, or None
+    dat = QS.get_graph(0, 1.0, 0)
+    if not dat or not self.running:
+      return None
+    try:
+      start = dat.index(0)
+    except ValueError:
+      self.save_data.append(dat)
+      return None
+    self.save_data.append(dat[0:start])
+    data = [x / 2147483647.0 for part in self.save_data for x in part]
+    self.save_data = [dat[start+1:]]
+    return data
+  def ReadGraphArray(self):
+    # Return a numpy array of normalized graph data ending at the zero marker, or None
+    buf = numpy.empty(self.data_width * 2)
+    if not QS.get_graph(0, 1.0, 0, buf) or not self.running:
+      return None
+    dat = buf.view(complex)
+    zeros = numpy.flatnonzero(dat == 0)
+    if len(zeros) == 0:
+      self.save_data.append(dat)
+      return None
+    start = zeros[0]
+    self.save_data.append(dat[0:start])
+    data = numpy.concatenate(self.save_data) / 2147483647.0
+    self.save_data = [dat[start+1:]]
+    return data
+
+class App(wx.App, VnaCommon):
+  """Class representing the application."""
+  def __init__(self):
+    global application
+    application = self
+    self.bottom_widgets = None
+    self.is_vna_program = None
+    if sys.stdout.isatty():
+      wx.App.__init__(self, redirect=False)
+    else:
+      wx.App.__init__(self, redirect=True)
+  def OnInit(self):
+    """Perform most initialization of the app here (called by wxPython on startup)."""
+    wx.lib.colourdb.updateColourDB()	# Add additional color names
+    import quisk_widgets		# quisk_widgets needs the application object
+    quisk_widgets.application = self
+    del quisk_widgets
+    self.ReadConfig()
+    # Choose whether to use Unicode or text symbols
+    for k in ('sym_stat_mem', 'sym_stat_fav', 'sym_stat_dx',
+        'btn_text_range_dn', 'btn_text_range_up', 'btn_text_play', 'btn_text_rec', 'btn_text_file_rec', 
+		'btn_text_file_play', 'btn_text_fav_add',
+        'btn_text_fav_recall', 'btn_text_mem_add', 'btn_text_mem_next', 'btn_text_mem_del'):
+      if conf.use_unicode_symbols:
+        setattr(conf, 'X' + k, getattr(conf, 'U' + k))
+      else:
+        setattr(conf, 'X' + k, getattr(conf, 'T' + k))
+    MakeWidgetGlobals()
+    self.BtnRfGain = None
+    self.graph_freq = 7e6
+    self.graph_index = 50
+    self.InitState()
+    self.reflection_cal = "Cal x"
+    self.transmission_cal = "Cal x"
+    QS.set_params(quisk_is_vna=1)	# Call this only if we are the VNA program
+    self.MakeHardware()
+    # get the screen size
+    x, y, self.screen_width, self.screen_height = wx.Display().GetGeometry()
+    self.Bind(wx.EVT_QUERY_END_SESSION, self.OnEndSession)
+    self.sample_rate = 48000
+    self.timer = time.time()		# A seconds clock
+    self.time0 = 0			# timer to display fields
+    self.clip_time0 = 0			# timer to display a CLIP message on ADC overflow
+    self.heart_time0 = self.timer	# timer to call HeartBeat at intervals
+    self.running = False
+    self.startup = True
+    self.save_data = []
+    self.sweep_average = SweepAverage(argv_options.average)
+    self.frequency = 0
+    self.main_frame = frame = QMainFrame(10, 10)
+    self.SetTopWindow(frame)
+    # Find the data width, the width of returned graph data.
+    width = self.screen_width * conf.graph_width
+    self.SetDataWidth(int(width))
+    self.RestoreState()
     # Record the basic application parameters
     if sys.platform == 'win32':
       h = self.main_frame.GetHandle()
     else:
       h = 0
-    QS.set_enable_bandscope(0)
-    # FFT size must equal the data_width so that all data points are returned!
-    QS.record_app(self, conf, self.data_width, self.data_width, self.data_width,
-                 1, self.sample_rate, h)
+    self.RecordApp(h)
     # Make all the screens and hide all but one
     self.graph = GraphScreen(frame, self.data_width, self.data_width, self.correct_width, self.correct_delta)
     self.screen = self.graph
@@ -1092,37 +1381,7 @@ class App(wx.App):
     self.main_frame.SetClientSize(wx.Size(self.graph.width, self.screen_height * 5 // 10))
     w, h = self.main_frame.GetSize().Get()
     self.main_frame.SetSizeHints(w, 1, w)
-    if hasattr(Hardware, 'pre_open'):       # pre_open() is called before open()
-      Hardware.pre_open()
-    if conf.use_rx_udp == 10:		# Hermes UDP protocol
-      self.add_version = False
-      conf.tx_ip = Hardware.hermes_ip
-      conf.tx_audio_port = conf.rx_udp_port
-    elif conf.use_rx_udp:
-      self.add_version = True		# Add firmware version to config text
-      conf.rx_udp_decimation = 8 * 8 * 8
-      if not conf.tx_ip:
-        conf.tx_ip = conf.rx_udp_ip
-      if not conf.tx_audio_port:
-        conf.tx_audio_port = conf.rx_udp_port + 2
-    else:
-      self.add_version = False
-    # Open the hardware.  This must be called before open_sound().
-    self.config_text = Hardware.open()
-    self.status_error = "No hardware response"	# possible error messages
-    if self.config_text:
-      self.main_frame.SetConfigText(self.config_text)
-      if conf.use_rx_udp == 10:		# Hermes UDP protocol
-        if self.config_text[0:12] == "Capture from":
-          self.status_error = ''
-    else:
-      self.config_text = "Missing config_text"
-    # Note: Subsequent calls to set channels must not name a higher channel number.
-    #       Normally, these calls are only used to reverse the channels.
-    QS.open_sound(conf.name_of_sound_capt, '', self.sample_rate,
-                conf.data_poll_usec, conf.latency_millisecs,
-                '', conf.tx_ip, conf.tx_audio_port,
-                48000, 0, 0, 1.0, '', 48000)
+    self.OpenHardware()
     self.Bind(wx.EVT_IDLE, self.graph.OnIdle)
     frame.Show()
     self.NewFreq(1000000, 30000000)
@@ -1134,21 +1393,15 @@ class App(wx.App):
     self.sound_thread = SoundThread()
     self.sound_thread.start()
     return True
+  def SetConfigText(self, text):
+    self.main_frame.SetConfigText(text)
   def OnExit(self):
     QS.close_rx_udp()
     ##self.local_conf.SaveState()	# to save default radio selection
+    if self.state_dirty:
+      self.SaveState()
+    configure.FlushStateFiles()
     return 0
-  def SaveState(self):
-    if self.init_path:		# save current program state
-      d = {}
-      for n in self.StateNames:
-        d[n] = getattr(self, n)
-      try:
-        fp = open(self.init_path, "w")
-        pickle.dump(d, fp)
-        fp.close()
-      except:
-        pass #traceback.print_exc()
   def OnEndSession(self, event):
     event.Skip()
     self.OnBtnClose(event)
@@ -1171,7 +1424,10 @@ class App(wx.App):
     self.freq_start_ctrl.SetValue(str(start))
     self.freq_stop_ctrl.SetValue(str(stop))
   def Calibrate(self):
-    self.graph.calibrate_tmp = [0] * self.correct_width
+    if numpy:
+      self.graph.calibrate_tmp = numpy.zeros(self.correct_width, dtype=complex)
+    else:
+      self.graph.calibrate_tmp = [0] * self.correct_width
     self.graph.calibrate_count = 0
     self.graph.SetMode("Calibrate")
     self.NewFreq(0, self.max_freq)
@@ -1197,6 +1453,7 @@ class App(wx.App):
       self.help_screen.Hide()
       self.graph.Show()
       self.graph.SetMode(self.screen_name)
+      self.sweep_average.Reset()
     self.vertBox.Layout()
     self.EnableButtons()
   def OnBtnRun(self, event):
@@ -1210,6 +1467,7 @@ class App(wx.App):
       for b in self.buttons1:
         b.Enable(True)
     self.graph.SetMode(self.screen_name)
+    self.sweep_average.Reset()
     if not self.running and not self.OnNewFreq():
       return
     if self.has_SetVNA:
@@ -1266,6 +1524,7 @@ class App(wx.App):
   def NewFreq(self, start, stop):
     if application.has_SetVNA:
       start, stop = Hardware.SetVNA(vna_start=start, vna_stop=stop)
+    self.sweep_average.Reset()
     self.graph.NewFreq(start, stop)
   def SetCalText(self):
     text = ''
@@ -1354,16 +1613,11 @@ class App(wx.App):
     pass
   def OnReadSound(self):	# called at frequent intervals
     self.timer = time.time()
-    dat = QS.get_graph(0, 1.0, 0)
-    if dat and self.running:
-      dat = list(dat)
-      try:
-        start = dat.index(0)
-      except ValueError:
-        self.save_data += dat
-        return
-      data = self.save_data + dat[0:start]
-      self.save_data = dat[start+1:]
+    if numpy:
+      data = self.ReadGraphArray()
+    else:
+      data = self.ReadGraphList()
+    if data is not None:
       if self.graph.mode == 'Calibrate':
         if len(data) != self.correct_width:
           if DEBUG: print('  bad calibrate array', len(data), self.correct_width)
@@ -1372,12 +1626,12 @@ class App(wx.App):
         if len(data) != self.data_width:
           if DEBUG: print('  bad data array', len(data), self.data_width)
           return
-      for i in range(len(data)):
-        data[i] /= 2147483647.0
       if self.startup:		# always skip the first block of data
         self.startup = False
-      else:
+      elif self.graph.mode == 'Calibrate':
         self.graph.OnGraphData(data)
+      else:
+        self.graph.OnGraphData(self.sweep_average.Add(data))
     if QS.get_overrange() and self.running:
       self.clip_time0 = self.timer
       self.status_error = "      *** CLIP ***"
@@ -1406,8 +1660,115 @@ class App(wx.App):
       #  abs(zzz), cmath.phase(zzz) * 360. / (2.0 * math.pi))
       self.WriteFields()
 
+class HeadlessApp(VnaCommon):
+  """Measure sweeps without the GUI and write them to Touchstone files.
+
+  This is used for scripted batch measurement.  It uses the calibration saved by the GUI program.
+  """
+  def __init__(self):
+    global application
+    application = self
+    self.bottom_widgets = None
+    self.is_vna_program = None
+    self.main_frame = None
+    self.sample_rate = 48000
+    self.running = False
+    self.startup = True
+    self.save_data = []
+    self.ReadConfig(True)		# there is no wx.App, so configure must not show dialogs
+    self.InitState()
+    QS.set_params(quisk_is_vna=1)	# Call this only if we are the VNA program
+    self.MakeHardware()
+    self.RestoreState()
+    self.mode = argv_options.mode.capitalize()
+    if self.mode == 'Reflection':
+      self.calibration = self.reflection_short or self.reflection_open
+    else:
+      self.calibration = self.transmission_short
+    width = argv_options.points
+    if width <= 0:
+      if conf.use_rx_udp == 10 and self.calibration:	# Hermes calibration has one point for each data point
+        width = len(self.calibration)
+      else:
+        width = 1000
+    self.SetDataWidth(width)
+  def SetConfigText(self, text):
+    print(text)
+  def Run(self):
+    if not self.calibration:
+      print("There is no %s calibration.  Please calibrate with the GUI program." % self.mode)
+      return 1
+    if len(self.calibration) != self.correct_width:
+      print("The calibration has %d points, but %d are needed.  Use --points %d." % (
+          len(self.calibration), self.correct_width, len(self.calibration)))
+      return 1
+    start = int(argv_options.start * 1e6 + 0.5)
+    stop = int(min(argv_options.stop * 1e6, self.max_freq) + 0.5)
+    if self.has_SetVNA:
+      start, stop = Hardware.SetVNA(vna_start=start, vna_stop=stop)
+    data_freq = SweepFrequencies(start, stop, self.data_width)
+    key = (start, stop, self.data_width, self.calibrate_time)
+    saved = self.error_terms.get(self.mode)
+    if saved and saved[0] == key:
+      terms = saved[1]
+    else:
+      terms = MakeErrorTerms(self.mode, self, data_freq, self.correct_delta, self.correct_width)
+    if self.mode == 'Reflection':
+      ext = 's1p'
+    elif argv_options.s2p:
+      ext = 's2p'
+    else:
+      ext = 'csv'
+    average = SweepAverage(argv_options.average)
+    self.RecordApp(0)
+    self.OpenHardware()
+    QS.set_fdx(1)
+    QS.set_rx_mode(0)
+    QS.start_sound()
+    if self.has_SetVNA:
+      Hardware.SetVNA(key_down=1)
+    self.running = True
+    heart_time0 = time.time()
+    number = 0
+    try:
+      while number < argv_options.sweeps:
+        QS.read_sound()
+        if time.time() - heart_time0 > 0.10:		# call hardware to perform background tasks
+          heart_time0 = time.time()
+          Hardware.HeartBeat()
+        if numpy:
+          data = self.ReadGraphArray()
+        else:
+          data = self.ReadGraphList()
+        if data is None or len(data) != self.data_width:
+          continue
+        if self.startup:		# always skip the first block of data
+          self.startup = False
+          continue
+        volts = average.Add(data)
+        if average.number < average.count:
+          continue
+        average.Reset()
+        number += 1
+        path = "%s_%04d.%s" % (argv_options.output, number, ext)
+        writer = TouchstoneWriter(path, self.mode, ext)
+        for freq, value in zip(data_freq, CorrectSweep(volts, terms)):
+          writer.Write(freq, value)
+        writer.Close()
+        print(path)
+    finally:
+      self.running = False
+      if self.has_SetVNA:
+        Hardware.SetVNA(key_down=0, do_tx=True)
+      QS.close_sound()
+      Hardware.close()
+      QS.close_rx_udp()
+    return 0
+
 def main():
   """If quisk is installed as a package, you can run it with quisk.main()."""
+  if argv_options.sweeps > 0:
+    sys.exit(HeadlessApp().Run())
   App()
   application.MainLoop()
 
@@ -388,6 +388,24 @@ start_here:
 	else if (state == 5) {		// read available samples into samp
 		//ptimer(4096);
 		while (navail >= 4 && sample_count && nSamples < sampsize) {			// samples are 16-bit little-endian
+			// convert the samples up to the end of the circular buffer
+			k = (SDRIQ_BUF_SIZE - iread) / 4;
+			if (k > navail / 4)
+				k = navail / 4;
+			if (k > sample_count)
+				k = sample_count;
+			if (k > sampsize - nSamples)
+				k = sampsize - nSamples;
+			if (k > 0) {
+				nSamples += quisk_unpack_iq(samp + nSamples, buf + iread, k, 2, 0, 0, 1.0);
+				iread += k * 4;
+				if (iread >= SDRIQ_BUF_SIZE)
+					iread -= SDRIQ_BUF_SIZE;
+				navail -= k * 4;
+				sample_count -= k;
+				continue;
+			}
+			// this sample wraps around the end of the circular buffer
 			ii = buf[iread];	// assumes a short is two bytes
 			INC_IREAD
 			ii |= buf[iread] << 8;
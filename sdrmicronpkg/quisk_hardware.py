@@ -80,6 +80,7 @@ class Hardware(BaseHardware):
   def __init__(self, app, conf):
     BaseHardware.__init__(self, app, conf)
     self.device = None
+    self.rx_pending = None	# Rx samples not yet accepted by AddRxSamples()
     self.usb = None
     self.rf_gain_labels = ('RF +10', 'RF 0', 'RF -10', 'RF -20')
     self.index = 1
@@ -242,6 +243,12 @@ class Hardware(BaseHardware):
   def GetRxSamples(self): # Read all data from the SDR Micron and process it.
     if self.device == None:
       return
+    if self.rx_pending:		# send the rest of the last samples before reading more
+      n = self.AddRxSamples(self.rx_pending)
+      if n is not None and n < len(self.rx_pending):
+        self.rx_pending = self.rx_pending[n:]
+        return
+      self.rx_pending = None
     while (self.usb.getQueueStatus() >= 508):
       data = self.usb.read(508)
       data = bytearray(data)
@@ -252,7 +259,10 @@ class Hardware(BaseHardware):
           self.fw_ver = chr(data[11]) + '.' + chr(data[12])
           self.frame_msg += '   F/W version - ' + self.fw_ver
           self.application.main_frame.SetConfigText(self.frame_msg)
-        self.AddRxSamples(data[16:])
+        n = self.AddRxSamples(data[16:])
+        if n is not None and n < len(data) - 16:	# the sample ring is full
+          self.rx_pending = data[16 + n:]
+          break
       elif data[8:11] == bytearray(b'BS0'):		# bandscope data
         packet_number = data[14]
         if packet_number == 0:			# start of a block of data
@@ -53,11 +53,32 @@ class Hardware(BaseHardware):
         if name == 'soapy_setSampleRate_tx':
           value = int(value + 0.1)
           QS.set_tx_audio(tx_sample_rate=value)
+    self.set_parameter('soapy_float_stages', '', float(self.GetFloatDecimation()[0]))
     self.ChangeGain('_rx')
     self.ChangeGain('_tx')
     #for name in ('soapy_getSampleRate_rx', 'soapy_getSampleRate_tx', 'soapy_getBandwidth_rx', 'soapy_getBandwidth_tx'):
     #  print ('Get ***', name, soapy.get_parameter(name, 1))
     return txt
+  def GetFloatDecimation(self):	# Return the number of single precision decimation stages, and the decimation
+    radio_dict = self.application.local_conf.GetRadioDict()
+    try:
+      decim = int(radio_dict.get('soapy_float_decim_rx', '1'))
+    except:
+      decim = 1
+    rate = self.GetRxRate()
+    stages = 0	# Quisk needs a rate of at least 48000 after decimation
+    while (1 << stages) < decim and stages < 5 and rate >> (stages + 1) >= 48000:
+      stages += 1
+    return stages, 1 << stages
+  def GetRxRate(self):	# Return the Rx sample rate before single precision decimation
+    radio_dict = self.application.local_conf.GetRadioDict()
+    rate = radio_dict.get('soapy_setSampleRate_rx', 48)	# this is in KHz
+    try:
+      rate = float(rate) * 1E3
+      rate = int(rate + 0.1)
+    except:
+      rate = 48000
+    return rate
   def ChangeGain(self, rxtx):	# rxtx is '_rx' or '_tx'
     if not soapy:
       return
@@ -123,6 +144,17 @@ class Hardware(BaseHardware):
       self.transverter_offset = 0
   def HeartBeat(self):	# Called at about 10 Hz by the main
     pass
+  def GetRxStatus(self):	# Return a line of text for the Rx reader thread status, or None if it is not used
+    if not soapy or not self.conf.soapy_rx_buffers:
+      return None
+    status = soapy.get_rx_status()
+    if not status['running']:
+      return "Rx reader thread is not running"
+    text = "Rx overflows %d, dropped buffers %d, time gaps %d" % (
+        status['overflows'], status['dropped'], status['time_gaps'])
+    if status['time_ns']:
+      text += ", hardware time %.3f s" % (status['time_ns'] * 1E-9)
+    return text
   def ImmediateChange(self, name, value):
     if name in ('soapy_gain_mode_rx', 'soapy_gain_mode_tx'):
       self.ChangeGain(name[-3:])
@@ -139,9 +171,11 @@ class Hardware(BaseHardware):
           value = int(value + 0.1)
           QS.set_tx_audio(tx_sample_rate=value)
         elif name == 'soapy_setSampleRate_rx':
-          value = int(value + 0.1)
-          self.application.OnBtnDecimation(rate=value)
+          self.application.OnBtnDecimation(rate=self.VarDecimSet())
           self.set_parameter('soapy_setFrequency_rx', '', self.fVFO)	# driver Lime requires reset of Rx freq on sample rate change
+    elif name == 'soapy_float_decim_rx':
+      self.set_parameter('soapy_float_stages', '', float(self.GetFloatDecimation()[0]))
+      self.application.OnBtnDecimation(rate=self.VarDecimSet())
   # The "VarDecim" methods are used to change the hardware decimation rate.
   # If VarDecimGetChoices() returns any False value, no other methods are called.
   def VarDecimGetChoices(self):	# Not used to set sample rate
@@ -151,14 +185,6 @@ class Hardware(BaseHardware):
   def VarDecimGetIndex(self):	# Return the index 0, 1, ... of the current decimation.
     return 0
   def VarDecimSet(self, index=None):	# Called when the control is operated; if index==None, called on startup.
-    name = 'soapy_setSampleRate_rx'
-    radio_dict = self.application.local_conf.GetRadioDict()
-    rate = radio_dict.get(name, 48)	# this is in KHz
-    try:
-      rate = float(rate) * 1E3
-      rate = int(rate + 0.1)
-    except:
-      rate = 48000
-    return rate
+    return self.GetRxRate() // self.GetFloatDecimation()[1]	# the rate after single precision decimation
   def VarDecimRange(self):  # Return the lowest and highest sample rate.
     return 48000, 192000
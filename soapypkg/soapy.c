@@ -1,5 +1,9 @@
 #include <Python.h>
 #include <complex.h>
+#ifndef MS_WINDOWS
+#include <pthread.h>
+#define SOAPY_RX_THREAD	1		// Samples can be read on a separate reader thread
+#endif
 #include <SoapySDR/Device.h>
 #include <SoapySDR/Formats.h>
 
@@ -32,6 +36,167 @@ static int soapy_KeyWasDown;				// Previous key state
 static size_t numTxChannels;				// number of Tx channels
 static size_t txMTU;					// maximum transmission unit of Tx stream
 
+// The Rx samples can be decimated by 2, 4, ... in single precision before they are converted to double.
+#define MAX_FLOAT_STAGES	5
+static int float_stages;				// number of decimate by 2 stages, changed by the GUI thread
+static int float_stages_used;				// number of stages in use by the sound thread
+static struct quisk_fHB45Filter float_filters[MAX_FLOAT_STAGES];
+
+// If soapy_rx_buffers is not zero, a reader thread calls readStream() and fills a pool of buffers.  The pool is
+// a queue with one writer and one reader, and the sound thread takes the filled buffers in order.
+#define MAX_RX_BUFFERS		64
+struct rx_buffer {
+	complex float * samples;
+	int count;			// number of samples in the buffer
+} ;
+static int rx_buffer_count;			// number of buffers in the pool, or zero to read on the sound thread
+static int rx_buffer_size;			// samples in each buffer; the stream MTU
+static struct rx_buffer rx_pool[MAX_RX_BUFFERS];
+static struct rx_buffer rx_discard;		// used for reads when the pool is full
+static unsigned int rx_pool_head;		// count of buffers filled, changed only by the reader thread
+static unsigned int rx_pool_tail;		// count of buffers used, changed only by the sound thread
+static int rx_pool_offset;			// samples already used from the buffer at the tail
+static unsigned long rx_overflows;		// number of overflows reported by the device
+static unsigned long rx_dropped;		// number of buffers dropped because the pool was full
+static unsigned long rx_time_gaps;		// number of gaps in the hardware time
+static long long rx_last_timeNs;		// hardware time of the latest buffer
+#ifdef SOAPY_RX_THREAD
+static pthread_t rx_thread;
+static int rx_thread_running;
+static volatile int rx_thread_stop;
+
+static void * rx_reader_thread(void * arg)
+{
+	int ret, flags, full, has_time;
+	unsigned int head, tail;
+	long long timeNs, next_timeNs;
+	struct rx_buffer * buf;
+	void * buffs[1];
+
+	has_time = 0;
+	next_timeNs = 0;
+	while ( ! rx_thread_stop) {
+		head = rx_pool_head;
+		tail = __atomic_load_n(&rx_pool_tail, __ATOMIC_ACQUIRE);
+		full = head - tail >= (unsigned int)rx_buffer_count;
+		if (full)
+			buf = &rx_discard;
+		else
+			buf = rx_pool + head % rx_buffer_count;
+		buffs[0] = buf->samples;
+		flags = 0;
+		timeNs = 0;
+		ret = SoapySDRDevice_readStream(soapy_sample_device, rxStream, buffs, rx_buffer_size, &flags, &timeNs, 100000);
+		if (ret == SOAPY_SDR_TIMEOUT)
+			continue;
+		if (ret == SOAPY_SDR_OVERFLOW) {
+			rx_overflows++;
+			has_time = 0;
+			continue;
+		}
+		if (ret < 0) {
+			pt_quisk_sound_state->read_error++;
+			QuiskSleepMicrosec(1000);
+			continue;
+		}
+		if (flags & SOAPY_SDR_HAS_TIME) {	// check for missing samples
+			if (has_time && llabs(timeNs - next_timeNs) > 2E9 / rx_sample_rate)
+				rx_time_gaps++;
+			has_time = 1;
+			next_timeNs = timeNs + (long long)(ret * 1E9 / rx_sample_rate);
+			rx_last_timeNs = timeNs;
+		}
+		if (full) {
+			rx_dropped++;
+			continue;
+		}
+		buf->count = ret;
+		__atomic_store_n(&rx_pool_head, head + 1, __ATOMIC_RELEASE);
+	}
+	return NULL;
+}
+
+static void rx_reader_free(void)
+{	// Free the buffer pool.
+	int i;
+
+	for (i = 0; i < rx_buffer_count; i++) {
+		free(rx_pool[i].samples);
+		rx_pool[i].samples = NULL;
+	}
+	free(rx_discard.samples);
+	rx_discard.samples = NULL;
+}
+
+static void rx_reader_start(void)
+{	// Make the buffer pool and start the reader thread.  On failure, the sound thread reads the samples.
+	int i;
+
+	rx_buffer_size = SoapySDRDevice_getStreamMTU(soapy_sample_device, rxStream);
+	if (rx_buffer_size <= 0 || rx_buffer_size > RX_BUF_SIZE)
+		rx_buffer_size = RX_BUF_SIZE;
+	rx_pool_head = rx_pool_tail = 0;
+	rx_pool_offset = 0;
+	rx_overflows = rx_dropped = rx_time_gaps = 0;
+	rx_last_timeNs = 0;
+	for (i = 0; i < rx_buffer_count; i++) {
+		rx_pool[i].samples = (complex float *)malloc(rx_buffer_size * sizeof(complex float));
+		if ( ! rx_pool[i].samples)
+			break;
+	}
+	rx_discard.samples = (complex float *)malloc(rx_buffer_size * sizeof(complex float));
+	if (i < rx_buffer_count || ! rx_discard.samples) {
+		printf("Soapy failure to allocate the Rx buffers; reading samples on the sound thread\n");
+		rx_reader_free();
+		return;
+	}
+	rx_thread_stop = 0;
+	if (pthread_create(&rx_thread, NULL, rx_reader_thread, NULL) == 0) {
+		rx_thread_running = 1;
+	}
+	else {
+		printf("Soapy failure to start the reader thread; reading samples on the sound thread\n");
+		rx_reader_free();
+	}
+}
+
+static void rx_reader_stop(void)
+{	// Stop the reader thread and free the buffer pool.
+	if ( ! rx_thread_running)
+		return;
+	rx_thread_stop = 1;
+	pthread_join(rx_thread, NULL);
+	rx_thread_running = 0;
+	rx_reader_free();
+}
+
+static int rx_reader_read(void)
+{	// Copy samples from the filled buffers to rx_stream_buffer, and return the number of samples.
+	int n, nSamples;
+	unsigned int head, tail;
+	struct rx_buffer * buf;
+
+	nSamples = 0;
+	tail = rx_pool_tail;
+	head = __atomic_load_n(&rx_pool_head, __ATOMIC_ACQUIRE);
+	while (tail != head && nSamples < RX_BUF_SIZE) {
+		buf = rx_pool + tail % rx_buffer_count;
+		n = buf->count - rx_pool_offset;
+		if (n > RX_BUF_SIZE - nSamples)
+			n = RX_BUF_SIZE - nSamples;
+		memcpy(rx_stream_buffer + nSamples, buf->samples + rx_pool_offset, n * sizeof(complex float));
+		nSamples += n;
+		rx_pool_offset += n;
+		if (rx_pool_offset >= buf->count) {
+			rx_pool_offset = 0;
+			tail++;
+		}
+	}
+	__atomic_store_n(&rx_pool_tail, tail, __ATOMIC_RELEASE);
+	return nSamples;
+}
+#endif
+
 // Start sample capture; called from the sound thread.
 static void quisk_start_samples(void)
 {
@@ -48,12 +213,19 @@ static void quisk_start_samples(void)
 		txMTU = SoapySDRDevice_getStreamMTU(soapy_sample_device, txStream);
 	}
 	SoapySDRDevice_activateStream(soapy_sample_device, rxStream, 0, 0, 0); //start streaming
+#ifdef SOAPY_RX_THREAD
+	if (rx_buffer_count > 0)
+		rx_reader_start();
+#endif
 }
 
 // Stop sample capture; called from the sound thread.
 static void quisk_stop_samples(void)
 {
 	shutdown_sample_device = 1;
+#ifdef SOAPY_RX_THREAD
+	rx_reader_stop();		// stop the reader before the stream is closed
+#endif
 	if (rxStream) {
 		SoapySDRDevice_deactivateStream(soapy_sample_device, rxStream, 0, 0); //stop streaming
 		SoapySDRDevice_closeStream(soapy_sample_device, rxStream);
@@ -92,8 +264,17 @@ static int quisk_read_samples(complex double * cSamples)
 			cSamples[i] = 0;
 	}
 	else if (rxStream) {
+#ifdef SOAPY_RX_THREAD
+		if (rx_thread_running)
+			nSamples = rx_reader_read();
+		else
+#endif
 		nSamples = SoapySDRDevice_readStream(soapy_sample_device, rxStream, rx_stream_buffs, num_samp, &flags, &timeNs, data_poll_usec * 2);
-		if (nSamples == -1) {	// Timeout
+		if (nSamples == SOAPY_SDR_TIMEOUT) {
+			nSamples = 0;
+		}
+		else if (nSamples == SOAPY_SDR_OVERFLOW) {
+			rx_overflows++;
 			nSamples = 0;
 		}
 		else if (nSamples < 0) {	// Some other error
@@ -101,6 +282,16 @@ static int quisk_read_samples(complex double * cSamples)
 			nSamples = 0;
 		}
 		pt_quisk_sound_state->latencyCapt = 0;
+		if (float_stages_used != float_stages) {	// Number of stages changed; reset the filters
+			float_stages_used = float_stages;
+			for (i = 0; i < MAX_FLOAT_STAGES; i++) {
+				float_filters[i].toggle = 0;
+				memset(float_filters[i].samples, 0, sizeof(float_filters[i].samples));
+				memset(float_filters[i].center, 0, sizeof(float_filters[i].center));
+			}
+		}
+		for (i = 0; i < float_stages_used; i++)
+			nSamples = quisk_fDecim2HB45(rx_stream_buffer, nSamples, float_filters + i);
 		for (i = 0; i < nSamples; i++)
 			cSamples[i] = rx_stream_buffer[i] * CLIP32;
 	}
@@ -196,6 +387,11 @@ static PyObject * open_device(PyObject * self, PyObject * args)
 			shutdown_sample_device = 0;
 			soapy_sample_device = sdev;
 			data_poll_usec = poll;
+#ifdef SOAPY_RX_THREAD
+			rx_buffer_count = QuiskGetConfigInt("soapy_rx_buffers", 0);
+			if (rx_buffer_count > MAX_RX_BUFFERS)
+				rx_buffer_count = MAX_RX_BUFFERS;
+#endif
 			quisk_sample_source4(&quisk_start_samples, &quisk_stop_samples, &quisk_read_samples, &quisk_write_samples);
 			numTxChannels = SoapySDRDevice_getNumChannels(sdev, SOAPY_SDR_TX);
 			if (sample_device == 3)		// disable transmit
@@ -267,6 +463,14 @@ static PyObject * set_parameter(PyObject * self, PyObject * args)	// Called from
 		}
 		//else if (direction == SOAPY_SDR_TX) {
 		//}
+		else if ( ! strcmp(param, "soapy_float_stages")) {
+			if (datum < 0)
+				float_stages = 0;
+			else if (datum > MAX_FLOAT_STAGES)
+				float_stages = MAX_FLOAT_STAGES;
+			else
+				float_stages = (int)datum;
+		}
 		else if ( ! strcmp(param, "soapy_FDX")) {
 			if (datum)
 				soapy_FDX = 1;
@@ -463,6 +667,20 @@ static PyObject * get_parameter(PyObject * self, PyObject * args)	// Called from
 	return Py_None;
 }
 
+static PyObject * get_rx_status(PyObject * self, PyObject * args)	// Called from GUI thread
+{  // Return whether the reader thread is running, the counts of overflows, dropped buffers and time gaps,
+   // and the latest hardware time.
+	int running = 0;
+
+	if (!PyArg_ParseTuple (args, ""))
+		return NULL;
+#ifdef SOAPY_RX_THREAD
+	running = rx_thread_running;
+#endif
+	return Py_BuildValue("{s:i,s:k,s:k,s:k,s:L}", "running", running, "overflows", rx_overflows, "dropped", rx_dropped,
+		"time_gaps", rx_time_gaps, "time_ns", rx_last_timeNs);
+}
+
 // Functions callable from Python are listed here:
 static PyMethodDef QuiskMethods[] = {
 	{"open_device", open_device, METH_VARARGS, "Open the hardware."},
@@ -470,6 +688,7 @@ static PyMethodDef QuiskMethods[] = {
 	{"get_device_list", get_device_list, METH_VARARGS, "Return a list of SoapySDR devices"},
 	{"get_parameter", get_parameter, METH_VARARGS, "Get a SoapySDR parameter"},
 	{"set_parameter", set_parameter, METH_VARARGS, "Set a SoapySDR parameter"},
+	{"get_rx_status", get_rx_status, METH_VARARGS, "Return the Rx overflow and time status"},
 	{NULL, NULL, 0, NULL}		/* Sentinel */
 };
 
@@ -246,3 +246,143 @@ void QuiskMeasureRate(const char * msg, int count)
 		printf("%s count %d, time %.3lf, rate %.3lf\n", msg, total, tm - time0, total / (tm - time0));
 	}
 }
+
+// Convert interleaved I/Q integer samples from hardware to complex double.  The samples are moved to
+// the most significant bits of a 32-bit integer, so all sample sizes have the same scale.  There is
+// a conversion function for each sample size and byte order.  The loops have no branches, so the
+// compiler can vectorize them.
+typedef void (* ty_unpack_iq)(complex double *, const unsigned char *, const unsigned char *, int, int, double);
+
+static void unpack_iq_8(complex double * samp, const unsigned char * re, const unsigned char * im, int count, int stride, double gain)
+{
+	int k;
+
+	for (k = 0; k < count; k++, re += stride, im += stride)
+		samp[k] = ((int)((unsigned int)re[0] << 24) + (int)((unsigned int)im[0] << 24) * I) * gain;
+}
+
+static void unpack_iq_16le(complex double * samp, const unsigned char * re, const unsigned char * im, int count, int stride, double gain)
+{
+	int k;
+
+	for (k = 0; k < count; k++, re += stride, im += stride)
+		samp[k] = ((int)((unsigned int)re[0] << 16 | (unsigned int)re[1] << 24) +
+			(int)((unsigned int)im[0] << 16 | (unsigned int)im[1] << 24) * I) * gain;
+}
+
+static void unpack_iq_16be(complex double * samp, const unsigned char * re, const unsigned char * im, int count, int stride, double gain)
+{
+	int k;
+
+	for (k = 0; k < count; k++, re += stride, im += stride)
+		samp[k] = ((int)((unsigned int)re[1] << 16 | (unsigned int)re[0] << 24) +
+			(int)((unsigned int)im[1] << 16 | (unsigned int)im[0] << 24) * I) * gain;
+}
+
+static void unpack_iq_24le(complex double * samp, const unsigned char * re, const unsigned char * im, int count, int stride, double gain)
+{
+	int k;
+
+	for (k = 0; k < count; k++, re += stride, im += stride)
+		samp[k] = ((int)((unsigned int)re[0] << 8 | (unsigned int)re[1] << 16 | (unsigned int)re[2] << 24) +
+			(int)((unsigned int)im[0] << 8 | (unsigned int)im[1] << 16 | (unsigned int)im[2] << 24) * I) * gain;
+}
+
+static void unpack_iq_24be(complex double * samp, const unsigned char * re, const unsigned char * im, int count, int stride, double gain)
+{
+	int k;
+
+	for (k = 0; k < count; k++, re += stride, im += stride)
+		samp[k] = ((int)((unsigned int)re[2] << 8 | (unsigned int)re[1] << 16 | (unsigned int)re[0] << 24) +
+			(int)((unsigned int)im[2] << 8 | (unsigned int)im[1] << 16 | (unsigned int)im[0] << 24) * I) * gain;
+}
+
+static void unpack_iq_32le(complex double * samp, const unsigned char * re, const unsigned char * im, int count, int stride, double gain)
+{
+	int k;
+
+	for (k = 0; k < count; k++, re += stride, im += stride)
+		samp[k] = ((int)((unsigned int)re[0] | (unsigned int)re[1] << 8 | (unsigned int)re[2] << 16 | (unsigned int)re[3] << 24) +
+			(int)((unsigned int)im[0] | (unsigned int)im[1] << 8 | (unsigned int)im[2] << 16 | (unsigned int)im[3] << 24) * I) * gain;
+}
+
+static void unpack_iq_32be(complex double * samp, const unsigned char * re, const unsigned char * im, int count, int stride, double gain)
+{
+	int k;
+
+	for (k = 0; k < count; k++, re += stride, im += stride)
+		samp[k] = ((int)((unsigned int)re[3] | (unsigned int)re[2] << 8 | (unsigned int)re[1] << 16 | (unsigned int)re[0] << 24) +
+			(int)((unsigned int)im[3] | (unsigned int)im[2] << 8 | (unsigned int)im[1] << 16 | (unsigned int)im[0] << 24) * I) * gain;
+}
+
+// IEEE float32 samples with full scale 1.0 are scaled to the same range as the integer samples.
+static void unpack_iq_f32le(complex double * samp, const unsigned char * re, const unsigned char * im, int count, int stride, double gain)
+{
+	int k;
+	unsigned int ur, ui;
+	float fr, fi;
+
+	gain *= CLIP32;
+	for (k = 0; k < count; k++, re += stride, im += stride) {
+		ur = (unsigned int)re[0] | (unsigned int)re[1] << 8 | (unsigned int)re[2] << 16 | (unsigned int)re[3] << 24;
+		ui = (unsigned int)im[0] | (unsigned int)im[1] << 8 | (unsigned int)im[2] << 16 | (unsigned int)im[3] << 24;
+		memcpy(&fr, &ur, 4);
+		memcpy(&fi, &ui, 4);
+		samp[k] = (fr + fi * I) * gain;
+	}
+}
+
+static void unpack_iq_f32be(complex double * samp, const unsigned char * re, const unsigned char * im, int count, int stride, double gain)
+{
+	int k;
+	unsigned int ur, ui;
+	float fr, fi;
+
+	gain *= CLIP32;
+	for (k = 0; k < count; k++, re += stride, im += stride) {
+		ur = (unsigned int)re[3] | (unsigned int)re[2] << 8 | (unsigned int)re[1] << 16 | (unsigned int)re[0] << 24;
+		ui = (unsigned int)im[3] | (unsigned int)im[2] << 8 | (unsigned int)im[1] << 16 | (unsigned int)im[0] << 24;
+		memcpy(&fr, &ur, 4);
+		memcpy(&fi, &ui, 4);
+		samp[k] = (fr + fi * I) * gain;
+	}
+}
+
+static const ty_unpack_iq UnpackIQ[5][2] = {	// index by sample bytes and big-endian
+	{NULL, NULL},
+	{unpack_iq_8, unpack_iq_8},
+	{unpack_iq_16le, unpack_iq_16be},
+	{unpack_iq_24le, unpack_iq_24be},
+	{unpack_iq_32le, unpack_iq_32be}
+} ;
+
+static const ty_unpack_iq UnpackFloatIQ[2] = {unpack_iq_f32le, unpack_iq_f32be};
+
+int quisk_unpack_iq(complex double * samp, const unsigned char * buf, int count, int sample_bytes, int stride, int flags, double gain)
+{  // Convert count I/Q samples in buf to complex samples in samp, and multiply by gain.  Each sample
+   // has sample_bytes 1, 2, 3 or 4 bytes for I and then for Q.  The stride is the number of bytes from
+   // one I/Q sample to the next, or zero if the samples are packed.  The flags are QUISK_UNPACK_BIG_ENDIAN
+   // for big-endian samples, QUISK_UNPACK_QI if Q is before I, and QUISK_UNPACK_FLOAT for float32 samples
+   // with sample_bytes 4.  Return the number of samples, or -1 for an invalid sample size.
+	const unsigned char * re, * im;
+
+	if (sample_bytes < 1 || sample_bytes > 4)
+		return -1;
+	if ((flags & QUISK_UNPACK_FLOAT) && sample_bytes != 4)
+		return -1;
+	if (stride <= 0)
+		stride = sample_bytes * 2;
+	if (flags & QUISK_UNPACK_QI) {
+		im = buf;
+		re = buf + sample_bytes;
+	}
+	else {
+		re = buf;
+		im = buf + sample_bytes;
+	}
+	if (flags & QUISK_UNPACK_FLOAT)
+		(*UnpackFloatIQ[(flags & QUISK_UNPACK_BIG_ENDIAN) ? 1 : 0])(samp, re, im, count, stride, gain);
+	else
+		(*UnpackIQ[sample_bytes][(flags & QUISK_UNPACK_BIG_ENDIAN) ? 1 : 0])(samp, re, im, count, stride, gain);
+	return count;
+}